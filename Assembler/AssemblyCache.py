@@ -0,0 +1,172 @@
+import ast
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from opcode_table import opcode_table
+
+ASSEMBLER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def module_path(name: str) -> Optional[str]:
+    """Source file of an assembler module imported as name (Semantic_Analyzer.mem_val -> Semantic_Analyzer/mem_val.py)."""
+    path = os.path.join(ASSEMBLER_DIR, *name.split('.')) + '.py'
+    return path if os.path.isfile(path) else None
+
+def pipeline_modules(root: str = 'ReadWrite.py') -> List[str]:
+    """Every assembler source root imports, directly or not, found by reading the import statements.
+
+    Standard library and third-party imports resolve to no file here and are skipped.
+    """
+    pending = [os.path.join(ASSEMBLER_DIR, root)]
+    modules = []
+    while pending:
+        path = pending.pop()
+        if path in modules:
+            continue
+        modules.append(path)
+        with open(path, 'r') as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                # `from package import module` imports a file too
+                names = [node.module] + [f"{node.module}.{alias.name}" for alias in node.names]
+            else:
+                continue
+            pending.extend(found for found in map(module_path, names) if found is not None)
+    return sorted(os.path.relpath(path, ASSEMBLER_DIR) for path in modules)
+
+# Modules whose behaviour determines the assembled output. Their contents are
+# part of every cache key, so editing the assembler invalidates old entries.
+PIPELINE_MODULES = pipeline_modules()
+
+def assembler_fingerprint() -> str:
+    """Hash of the opcode table and the pipeline sources."""
+    digest = hashlib.sha256(repr(sorted(opcode_table.items())).encode())
+    for module in PIPELINE_MODULES:
+        digest.update(module.encode())
+        with open(os.path.join(ASSEMBLER_DIR, module), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+ASSEMBLER_VERSION = assembler_fingerprint()
+
+class AssemblyCache:
+    """
+    On-disk, content-addressed cache of assembled programs.
+
+    Entries are keyed by a hash of the source text, the options that change
+    the output (such as optimize) and ASSEMBLER_VERSION, and hold the
+    machine code, symbol table, semantic errors and linkage (relocations and
+    symbol declarations, see write_object_file) of one successful assembly;
+    failed ones are not cached.
+    Each entry is one JSON file. The directory is scanned once, when the
+    cache is opened, into an in-memory index kept in least recently used
+    order (mtimes are bumped on hits so the order survives reopening);
+    entries are evicted from the front of the index once the cache exceeds
+    max_bytes or max_entries. Entries other processes add meanwhile are not
+    in this index, so with several writers the caps hold per process.
+    """
+
+    def __init__(self, cache_dir: str = '.asm_cache', max_bytes: int = 64 * 1024 * 1024, max_entries: int = 10000):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index: 'OrderedDict[str, int]' = OrderedDict()     # entry file name -> size, least recently used first
+        self.total_bytes = 0
+        self.load_index()
+
+    def load_index(self):
+        entries = []
+        with os.scandir(self.cache_dir) as scan:
+            for entry in scan:
+                if entry.name.endswith('.json'):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, entry.name, st.st_size))
+        entries.sort()
+        self.index = OrderedDict((name, size) for _, name, size in entries)
+        self.total_bytes = sum(self.index.values())
+
+    def key(self, source: str, options: Dict[str, object] = None) -> str:
+        settings = repr(sorted((options or {}).items()))
+        return hashlib.sha256('\0'.join((ASSEMBLER_VERSION, settings, source)).encode()).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, self.entry_name(key))
+
+    @staticmethod
+    def entry_name(key: str) -> str:
+        return key + '.json'
+
+    def get(self, source: str, options: Dict[str, object] = None) -> Optional[Tuple[List[int], Dict[str, int], List[str], Dict[str, list]]]:
+        """Return (machine_code, symbol_table, errors, linkage) for source assembled with options, or None on a miss."""
+        key = self.key(source, options)
+        path = self.path(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+            os.utime(path)  # mark as most recently used
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        name = self.entry_name(key)
+        if name in self.index:
+            self.index.move_to_end(name)
+        linkage = entry['linkage']
+        linkage['relocations'] = [tuple(relocation) for relocation in linkage['relocations']]
+        return entry['machine_code'], entry['symbol_table'], entry['errors'], linkage
+
+    def put(self, source: str, machine_code: List[int], symbol_table: Dict[str, int], errors: list, linkage: Dict[str, list] = None,
+            options: Dict[str, object] = None):
+        """Store an assembly made with options; diagnostics are stored as their formatted messages."""
+        key = self.key(source, options)
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        linkage = {name: list(values) for name, values in (linkage or {}).items()}
+        linkage.setdefault('relocations', [])
+        with open(tmp_path, 'w') as f:
+            json.dump({'machine_code': machine_code, 'symbol_table': symbol_table, 'errors': [str(error) for error in errors],
+                       'linkage': linkage}, f)
+        os.replace(tmp_path, path)
+        name = self.entry_name(key)
+        size = os.path.getsize(path)
+        self.total_bytes += size - self.index.pop(name, 0)
+        self.index[name] = size
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the size and count caps hold."""
+        while self.index and (self.total_bytes > self.max_bytes or len(self.index) > self.max_entries):
+            name, size = self.index.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            self.evictions += 1
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.cache_dir, name))
+        self.index.clear()
+        self.total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
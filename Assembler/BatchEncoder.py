@@ -0,0 +1,173 @@
+from typing import Dict, Iterable, List, Union
+from Parser import Label, Instruction, InstructionTable, InstructionCursor
+from Operands import Immediate, LabelRef, Register, decode_operand
+from Code_generator import (CodeGenerator, FORMAT_BRANCH, FORMAT_SYSTEM, FORMAT_MOVE, FORMAT_MEMORY, FORMAT_DATA,
+                            TYPE_SHIFT, CONTROL_SHIFT, RD_SHIFT, RM_SHIFT, RN_SHIFT, IMMEDIATE_FLAG, VALUE_MASK)
+
+try:
+    import numpy as np
+except ImportError:     # optional: only the batch encoder needs it
+    np = None
+
+# Per-mnemonic format codes; rows of any other kind (.word, unknown mnemonics) are encoded one by one
+BRANCH, SYSTEM, MOVE, MEMORY, DATA, SCALAR = range(6)
+FORMAT_CODES = {FORMAT_BRANCH: BRANCH, FORMAT_SYSTEM: SYSTEM, FORMAT_MOVE: MOVE, FORMAT_MEMORY: MEMORY, FORMAT_DATA: DATA}
+
+class BatchEncoder:
+    """
+    Whole-program encoder producing a np.uint32 image with numpy.
+
+    Works on the columnar InstructionTable. List ASTs are converted first,
+    and that conversion costs about what the vector path saves, so the
+    speedup over generate_machine_code needs an InstructionTable input.
+    every distinct mnemonic and operand string is decoded once into small
+    lookup arrays, which are gathered into per-row np.uint8 columns (itype,
+    u_ctrl, rd, rm, rn, is_imm) and a np.uint16 value column; the 15-bit
+    immediate check is a vectorized mask and the words are combined in one
+    expression. Rows outside the common shapes (addresses, .word entries,
+    anything that fails to encode) go through CodeGenerator one by one, so
+    the image, relocations and the first exception raised match
+    generate_machine_code.
+    """
+
+    def __init__(self, ast: Union[List[Union[Instruction, Label]], InstructionTable], symbol_table: Dict[str, int],
+                 external_symbols: Iterable[str] = ()):
+        if np is None:
+            raise ImportError("BatchEncoder requires numpy")
+        self.table = ast if isinstance(ast, InstructionTable) else InstructionTable.from_nodes(ast)
+        self.symbol_table = symbol_table
+        self.code_gen = CodeGenerator(self.table, symbol_table, external_symbols)
+        self.image = None
+        # (row, symbol) for every word whose value field holds a symbol's address, as in CodeGenerator
+        self.relocations = []
+
+    def mnemonic_columns(self):
+        """(format code, opcode word) arrays indexed by mnemonic id."""
+        formats = np.full(len(self.table.mnemonic_names), SCALAR, dtype=np.uint8)
+        words = np.zeros(len(self.table.mnemonic_names), dtype=np.uint32)
+        cursor = InstructionCursor()
+        for mnemonic_id, (mnemonic, condition) in enumerate(self.table.mnemonic_names):
+            cursor.mnemonic, cursor.condition = mnemonic, condition
+            try:
+                template = self.code_gen.templates.get((mnemonic, condition)) or self.code_gen.lookup_template(cursor)
+            except ValueError:
+                continue
+            formats[mnemonic_id] = FORMAT_CODES[template.format]
+            words[mnemonic_id] = template.word
+        return formats, words
+
+    def operand_columns(self):
+        """Lookup arrays indexed by operand id: register number (-1 if not one), immediate value and flags, label address.
+
+        One extra entry past the last id stands for a missing operand.
+        """
+        count = len(self.table.operand_names) + 1
+        registers = np.full(count, -1, dtype=np.int8)
+        immediates = np.zeros(count, dtype=np.int64)
+        is_immediate = np.zeros(count, dtype=bool)      # '#' operand with a parsable value
+        labels = np.full(count, -1, dtype=np.int64)     # branch value of a label: its address, 0 if external
+        external_symbols = self.code_gen.external_symbols
+        for operand_id, text in enumerate(self.table.operand_names):
+            operand = decode_operand(text)
+            if isinstance(operand, Immediate):
+                if operand.value is not None and -2**63 <= operand.value < 2**63:
+                    immediates[operand_id] = operand.value
+                    is_immediate[operand_id] = True
+            elif isinstance(operand, Register):
+                try:
+                    registers[operand_id] = self.code_gen.encode_register(operand)
+                except ValueError:
+                    pass
+            elif isinstance(operand, LabelRef):
+                if text in self.symbol_table:
+                    labels[operand_id] = self.symbol_table[text] & VALUE_MASK
+                elif text in external_symbols:
+                    labels[operand_id] = 0      # resolved by the linker
+        return registers, immediates, is_immediate, labels
+
+    def encode(self) -> 'np.ndarray':
+        """Encode the program into self.image and return it."""
+        table = self.table
+        rows = len(table)
+        formats, words = self.mnemonic_columns()
+        registers, immediates, is_immediate, labels = self.operand_columns()
+
+        mnemonic_ids = np.frombuffer(table.mnemonics, dtype=np.uint8, count=rows)
+        offsets = np.frombuffer(table.operand_offsets, dtype=np.uint32, count=rows + 1).astype(np.intp)
+        pool = np.frombuffer(table.operand_pool, dtype=np.uint32, count=len(table.operand_pool)).astype(np.intp)
+        counts = offsets[1:] - offsets[:-1]
+        fmt = formats[mnemonic_ids]
+        word = words[mnemonic_ids]
+
+        def operand(k):
+            """Operand id at position k of every row, or the missing-operand entry where the row is shorter."""
+            missing = len(table.operand_names)
+            if not pool.size:
+                return np.full(rows, missing, dtype=np.intp)
+            return np.where(counts > k, pool[np.minimum(offsets[:-1] + k, pool.size - 1)], missing)
+
+        first, second, third = operand(0), operand(1), operand(2)
+        # The operand that may be an immediate, and the register operands in front of it
+        two_fields = (fmt == MOVE) | (fmt == MEMORY) | ((fmt == DATA) & (counts == 2))
+        three_fields = (fmt == DATA) & (counts == 3)
+        one_field = (fmt == BRANCH) | (fmt == SYSTEM)
+        source = np.where(three_fields, third, np.where(two_fields, second, first))
+        source_is_immediate = is_immediate[source]
+        source_register = registers[source]
+
+        branch = fmt == BRANCH
+        branch_label = branch & ~source_is_immediate & (labels[source] >= 0)
+        simple = (
+            (one_field & (counts >= 1) | two_fields & (counts >= 2) | three_fields)
+            & (one_field | (registers[first] >= 0))
+            & (~three_fields | (registers[second] >= 0))
+            & (source_is_immediate | branch_label | (source_register >= 0))
+        )
+
+        u32 = np.uint32
+        itype = (word >> TYPE_SHIFT).astype(np.uint8)
+        u_ctrl = ((word >> CONTROL_SHIFT) & 0x3F).astype(np.uint8)
+        rd = np.where(fmt == SYSTEM, np.where(source_is_immediate, 0, source_register),
+                      np.where(one_field, 0, registers[first])).astype(np.uint8)
+        rn = np.where(three_fields, registers[second], 0).astype(np.uint8)
+        rm = np.where(source_is_immediate | branch_label | (fmt == SYSTEM), 0, source_register).astype(np.uint8)
+        is_imm = (source_is_immediate | branch_label).astype(np.uint8)
+        raw = np.where(source_is_immediate, immediates[source], np.where(branch_label, labels[source], 0))
+        out_of_range = simple & source_is_immediate & ((raw < 0) | (raw > VALUE_MASK))
+        value = (raw & VALUE_MASK).astype(np.uint16)
+
+        image = ((itype.astype(u32) << TYPE_SHIFT) | (u_ctrl.astype(u32) << CONTROL_SHIFT)
+                 | (rd.astype(u32) << RD_SHIFT) | (rm.astype(u32) << RM_SHIFT) | (rn.astype(u32) << RN_SHIFT)
+                 | (is_imm.astype(u32) * IMMEDIATE_FLAG) | value)
+
+        names = table.operand_names
+        relocations = [(row, names[source[row]]) for row in np.flatnonzero(simple & branch_label).tolist()]
+
+        # Rows the vector path does not cover, in order; the first failure is raised unless a range error comes first
+        bad = np.flatnonzero(out_of_range)
+        first_bad = bad[0] if bad.size else rows
+        scalar_rows = np.flatnonzero(~simple)
+        if scalar_rows.size:
+            cursor = InstructionCursor()
+            scalar_relocations = self.code_gen.relocations
+            for row in scalar_rows.tolist():
+                if row > first_bad:
+                    break
+                cursor.mnemonic, cursor.condition = table.mnemonic_names[table.mnemonics[row]]
+                cursor.operands = table.operands(row)
+                cursor._decoded = None
+                image[row] = self.code_gen.encode_instruction(cursor)
+                # CodeGenerator records the index of its own next word; this word is row
+                relocations.extend((row, symbol) for _, symbol in scalar_relocations)
+                scalar_relocations.clear()
+            relocations.sort()
+        if bad.size:
+            raise ValueError(f"Invalid immediate value: {names[source[first_bad]]}")
+        self.image = image
+        self.relocations = relocations
+        return image
+
+    def tofile(self, path: str):
+        """Write the image as raw little-endian 32-bit words."""
+        image = self.encode() if self.image is None else self.image
+        image.astype('<u4').tofile(path)
@@ -0,0 +1,117 @@
+from array import array
+from itertools import compress
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Sequence, Tuple
+
+BRANCH_MNEMONICS = frozenset({
+    'b', 'bl', 'bx', 'blx',
+    'bal', 'beq', 'bne', 'bpl', 'bmi', 'bcc', 'blo', 'bcs', 'bhs', 'bvc', 'bvs',
+    'bgt', 'bge', 'blt', 'ble', 'bhi', 'bls',
+})
+UNCONDITIONAL_BRANCHES = frozenset({'b', 'bal', 'bx'})
+CALL_MNEMONICS = frozenset({'bl', 'blx'})
+REGISTER_BRANCHES = frozenset({'bx', 'blx'})
+# Instructions whose first operand is read, not written
+NO_DESTINATION = frozenset({
+    'cmp', 'cmn', 'tst', 'teq', 'str', 'strb', 'strh', 'strd', 'stm', 'msr', 'swi', 'svc', 'bkpt',
+}) | BRANCH_MNEMONICS
+PC_NAMES = frozenset({'pc', 'r15'})
+
+def ends_block(mnemonic: str, operands: Sequence) -> bool:
+    """True for branches and for anything that writes pc."""
+    if mnemonic in BRANCH_MNEMONICS:
+        return True
+    return bool(operands) and str(operands[0]) in PC_NAMES and mnemonic not in NO_DESTINATION
+
+class ControlFlowGraph:
+    """
+    Basic blocks of one program, built once and shared by the analyses.
+
+    Holds the instruction-index -> address array, the first instruction of
+    every block, the block each label starts and every block's successors. Blocks start at instruction 0, at labelled
+    instructions and after branches or writes to pc. Instructions are given
+    as parallel mnemonic and operand-token lists, so building the graph
+    needs no operand decoding.
+    A graph over part of a program starts at base_address; labels outside
+    the part are not block targets.
+    """
+
+    def __init__(self, mnemonics: List[str], operands: List[Sequence[str]], symbol_table: Dict[str, int],
+                 base_address: int = 0):
+        self.mnemonics = mnemonics
+        self.operands = operands
+        self.symbol_table = symbol_table
+        count = len(mnemonics)
+        self.addresses = array('I', range(base_address, base_address + count * 4, 4))     # every instruction is one word
+        self.starts = array('I')                                # first instruction of each block
+        self.label_blocks: Dict[str, int] = {}                  # label -> block it starts
+        self.successors: List[Tuple[int, ...]] = []
+        self.build()
+
+    def __len__(self):
+        return len(self.starts)
+
+    def index_of(self, address: int) -> Optional[int]:
+        """Instruction at address, or None if no instruction starts there."""
+        index = bisect_left(self.addresses, address)
+        if index < len(self.addresses) and self.addresses[index] == address:
+            return index
+        return None
+
+    def block_of(self, index: int) -> int:
+        """Block containing instruction index."""
+        return bisect_right(self.starts, index) - 1
+
+    def block_range(self, block: int) -> Tuple[int, int]:
+        """[start, end) instruction indices of block."""
+        end = self.starts[block + 1] if block + 1 < len(self.starts) else len(self.mnemonics)
+        return self.starts[block], end
+
+    def branch_target(self, index: int) -> Optional[int]:
+        """Block a branch at index jumps to, or None for register, external or unknown targets."""
+        operands = self.operands[index]
+        if self.mnemonics[index] not in BRANCH_MNEMONICS or not operands:
+            return None
+        return self.label_blocks.get(operands[0])
+
+    def build(self):
+        count = len(self.mnemonics)
+        if not count:
+            return
+        leaders = bytearray(count)
+        leaders[0] = 1
+        label_index = {}
+        for name, address in self.symbol_table.items():
+            index = self.index_of(address)
+            if index is not None:
+                leaders[index] = 1
+                label_index[name] = index
+        mnemonics = self.mnemonics
+        all_operands = self.operands
+        for index in compress(range(1, count), map(BRANCH_MNEMONICS.__contains__, mnemonics)):
+            leaders[index] = 1      # instruction after a branch
+        for index, operands in enumerate(all_operands):
+            if operands and operands[0] in PC_NAMES and mnemonics[index] not in NO_DESTINATION and index + 1 < count:
+                leaders[index + 1] = 1
+
+        starts = list(compress(range(count), leaders))
+        self.starts = array('I', starts)
+        block_at = {start: block for block, start in enumerate(starts)}
+        self.label_blocks = {name: block_at[index] for name, index in label_index.items()}
+
+        block_count = len(starts)
+        label_blocks = self.label_blocks
+        for block in range(block_count):
+            last = (starts[block + 1] if block + 1 < block_count else count) - 1
+            mnemonic = mnemonics[last]
+            operands = all_operands[last]
+            successors = []
+            if mnemonic in BRANCH_MNEMONICS:
+                target = label_blocks.get(operands[0]) if operands else None
+                if target is not None:
+                    successors.append(target)
+                if mnemonic not in UNCONDITIONAL_BRANCHES and block + 1 < block_count:
+                    successors.append(block + 1)
+            elif not ends_block(mnemonic, operands) and block + 1 < block_count:
+                successors.append(block + 1)
+            self.successors.append(tuple(successors))
@@ -1,146 +1,178 @@
-from typing import List, Dict, Union
+from typing import Iterable, List, Dict, Union
 from opcode_table import opcode_table
-from Parser import Label, Instruction
+from Parser import Label, Instruction, InstructionTable
+from Operands import Immediate, LabelRef, MemOperand, Operand, Register
+
+# Instruction word layout
+TYPE_SHIFT = 30         # bits [30:31] instruction type
+CONTROL_SHIFT = 24      # bits [24:29] control signals
+RD_SHIFT = 20           # bits [20:23] rd register address
+RM_SHIFT = 16           # bits [16:19] rm register address
+RN_SHIFT = 12           # bits [12:15] rn register address
+IMMEDIATE_FLAG = 1 << 15    # bit [15] set when the value field holds an immediate
+VALUE_MASK = 0x7FFF     # bits [0:14] immediate value or address
+
+# Format classes; each lists the field every operand goes to, in operand order.
+# The last operand may be an immediate instead of a register (an address too for FORMAT_MEMORY).
+FORMAT_BRANCH = 'branch'        # label, immediate or register target
+FORMAT_SYSTEM = 'system'
+FORMAT_MOVE = 'move'            # compare and move instructions
+FORMAT_MEMORY = 'memory'
+FORMAT_DATA = 'data'            # field layout depends on the operand count (DATA_FIELDS)
+
+FORMAT_FIELDS = {
+    FORMAT_BRANCH: (RM_SHIFT,),
+    FORMAT_SYSTEM: (RD_SHIFT,),
+    FORMAT_MOVE: (RD_SHIFT, RM_SHIFT),
+    FORMAT_MEMORY: (RD_SHIFT, RM_SHIFT),
+    FORMAT_DATA: None,
+}
+DATA_FIELDS = {2: (RD_SHIFT, RM_SHIFT), 3: (RD_SHIFT, RN_SHIFT, RM_SHIFT)}
+
+MNEMONIC_FORMATS = {
+    **dict.fromkeys(('B', 'BL', 'BLX', 'BX', 'BGT', 'BLT', 'BGE'), FORMAT_BRANCH),
+    **dict.fromkeys(('SWI', 'CLZ', 'MSR', 'MRS'), FORMAT_SYSTEM),
+    **dict.fromkeys(('CMP', 'CMN', 'TEQ', 'TST', 'MOV', 'MVN'), FORMAT_MOVE),
+    **dict.fromkeys(('LDR', 'STR'), FORMAT_MEMORY),
+}
+
+class EncodingTemplate:
+    """Precompiled encoding of one mnemonic: its format class, field layout and opcode word."""
+    __slots__ = ('mnemonic', 'format', 'fields', 'word')
+
+    def __init__(self, mnemonic: str, opcode: int):
+        self.mnemonic = mnemonic
+        self.format = MNEMONIC_FORMATS.get(mnemonic, FORMAT_DATA)
+        self.fields = FORMAT_FIELDS[self.format]
+        # Instruction type (opcode bits 6-7) and control signals (bits 0-5), shifted into place once
+        self.word = ((opcode >> 6) << TYPE_SHIFT) | ((opcode & 0x3F) << CONTROL_SHIFT)
+
+    def __repr__(self):
+        return f"EncodingTemplate({self.mnemonic}, {self.format}, {self.word:#010x})"
+
+ENCODING_TEMPLATES = {mnemonic: EncodingTemplate(mnemonic, opcode) for mnemonic, opcode in opcode_table.items()}
 
 class CodeGenerator:
-    def __init__(self, ast: List[Union[Instruction, Label]], symbol_table: Dict[str, int]):
+    BRANCH_MNEMONICS = tuple(mnemonic for mnemonic, fmt in MNEMONIC_FORMATS.items() if fmt == FORMAT_BRANCH)
+    # (mnemonic, condition) as written -> template, shared by every generator
+    templates: Dict[tuple, EncodingTemplate] = {}
+
+    def __init__(self, ast: Union[List[Union[Instruction, Label]], InstructionTable], symbol_table: Dict[str, int],
+                 external_symbols: Iterable[str] = ()):
         self.ast = ast
         self.symbol_table = symbol_table
+        # Symbols defined by other objects; branches to them are left for the linker
+        self.external_symbols = set(external_symbols)
         self.machine_code = []
+        # (word index, symbol) for every word whose value field holds a symbol's address
+        self.relocations = []
 
     def generate_machine_code(self) -> List[int]:
         """Generate machine code for the entire AST."""
-        for node in self.ast:
+        nodes = self.ast.instructions() if isinstance(self.ast, InstructionTable) else self.ast
+        encode = self.encode_instruction
+        machine_code = self.machine_code
+        for node in nodes:
             if isinstance(node, Instruction):
-                binary_instruction = self.encode_instruction(node)
-                self.machine_code.append(binary_instruction)
-        return self.machine_code
+                machine_code.append(encode(node))
+        return machine_code
 
     def encode_instruction(self, instruction: Instruction) -> int:
         """Encode a single instruction into its binary representation."""
-        mnemonic = instruction.mnemonic.upper()
-        condition = instruction.condition.upper() if instruction.condition else ''
-        full_mnemonic = f"{mnemonic}{condition}"
-        
-        if full_mnemonic not in opcode_table:
-            raise ValueError(f"Unsupported mnemonic: {full_mnemonic}")
+        template = self.templates.get((instruction.mnemonic, instruction.condition))
+        if template is None:
+            if instruction.mnemonic == '.word':
+                return self.encode_word(instruction.decoded[0])
+            template = self.lookup_template(instruction)
+        operands = instruction.decoded
+        fmt = template.format
 
-        opcode = opcode_table[full_mnemonic]
-        operand_count = len(instruction.operands)
-        
-        # Initialize instruction fields
-        itype = opcode >> 6  # Extract instruction type (bits 6-7)
-        u_ctrl = opcode & 0x3F  # Extract control signals (bits 0-5)
-        rd_addr = 0
-        rm_addr = 0
-        rn_addr = 0  # Added for third register in 3-operand instructions
-        is_imm = 0
-        value = 0
-
-        # Branch instructions (B, BL, BLX, BX)
-        if mnemonic in ['B', 'BL', 'BLX', 'BX', 'BGT', 'BLT', 'BGE']:
-            target = instruction.operands[0]
-            if target.startswith('#'):
+        if fmt is FORMAT_BRANCH:
+            target = operands[0]
+            if isinstance(target, Immediate):
                 # Direct immediate value
-                is_imm = 1
-                value = self.encode_immediate(target)
-            else:
-                # Label resolution
-                if target in self.symbol_table:
-                    # Use the address from symbol table
-                    value = self.symbol_table[target] & 0x7FFF
-                    is_imm = 1
-                elif target.startswith('r'):
-                    # Register-based branch
-                    rm_addr = self.encode_register(target)
-                else:
-                    raise ValueError(f"Invalid branch target: {target}")
-
-        # System instructions (SWI, CLZ, MSR, MRS)
-        elif mnemonic in ['SWI', 'CLZ', 'MSR', 'MRS']:
-            if instruction.operands[0].startswith('#'):
-                is_imm = 1
-                value = self.encode_immediate(instruction.operands[0])
-            else:
-                rd_addr = self.encode_register(instruction.operands[0])
-
-        # Compare instructions (CMP, CMN, TEQ, TST)
-        elif mnemonic in ['CMP', 'CMN', 'TEQ', 'TST']:
-            rd_addr = self.encode_register(instruction.operands[0])
-            if instruction.operands[1].startswith('#'):
-                is_imm = 1
-                value = self.encode_immediate(instruction.operands[1])
-            else:
-                rm_addr = self.encode_register(instruction.operands[1])
-
-        # Data movement (MOV, MVN)
-        elif mnemonic in ['MOV', 'MVN']:
-            rd_addr = self.encode_register(instruction.operands[0])
-            if instruction.operands[1].startswith('#'):
-                is_imm = 1
-                value = self.encode_immediate(instruction.operands[1])
-            else:
-                rm_addr = self.encode_register(instruction.operands[1])
-
-        # Memory operations (LDR, STR)
-        elif mnemonic in ['LDR', 'STR']:
-            rd_addr = self.encode_register(instruction.operands[0])
-            if instruction.operands[1].startswith('#'):
-                is_imm = 1
-                value = self.encode_immediate(instruction.operands[1])
-            else:
-                rm_addr = self.encode_register(instruction.operands[1])
-
-        # Basic arithmetic/logic (ADD, SUB, AND, ORR, etc.)
-        else:
-            if operand_count == 2:
-                rd_addr = self.encode_register(instruction.operands[0])
-                if instruction.operands[1].startswith('#'):
-                    is_imm = 1
-                    value = self.encode_immediate(instruction.operands[1])
-                else:
-                    rm_addr = self.encode_register(instruction.operands[1])
-            elif operand_count == 3:
-                rd_addr = self.encode_register(instruction.operands[0])
-                rn_addr = self.encode_register(instruction.operands[1])
-                if instruction.operands[2].startswith('#'):
-                    is_imm = 1
-                    value = self.encode_immediate(instruction.operands[2])
-                else:
-                    rm_addr = self.encode_register(instruction.operands[2])
-            else:
-                raise ValueError(f"{mnemonic} instruction expects 2 or 3 operands")
-            
-        # Combine all fields into final instruction
-        return (
-            (itype << 30) |           # bits [30:31] for instruction type
-            (u_ctrl << 24) |          # bits [24:29] for control signals
-            (rd_addr << 20) |         # bits [20:23] for rd register address
-            (rm_addr << 16) |         # bits [16:19] for rm register address
-            (rn_addr << 12) |         # bits [12:15] for rn register address (added)
-            (is_imm << 15) |          # bit [15] indicates if it's immediate
-            (value & 0x7FFF)           # bits [0:14] for immediate value or address
-        )
-
-    def encode_register(self, reg: str) -> int:
-        """Encode a register name to its binary representation."""
-        if reg.startswith('r') and reg[1:].isdigit():
-            reg_num = int(reg[1:])
-            if 0 <= reg_num < 16:
-                return reg_num
+                return template.word | IMMEDIATE_FLAG | self.encode_immediate(target)
+            if isinstance(target, Register):
+                # Register-based branch
+                return template.word | (self.encode_register(target) << RM_SHIFT)
+            if isinstance(target, LabelRef):
+                if target.name in self.symbol_table:
+                    # Label resolution
+                    self.relocations.append((len(self.machine_code), target.name))
+                    return template.word | IMMEDIATE_FLAG | (self.symbol_table[target.name] & VALUE_MASK)
+                if target.name in self.external_symbols:
+                    # Resolved by the linker
+                    self.relocations.append((len(self.machine_code), target.name))
+                    return template.word | IMMEDIATE_FLAG
+            raise ValueError(f"Invalid branch target: {target}")
+
+        fields = template.fields
+        if fmt is FORMAT_DATA:
+            fields = DATA_FIELDS.get(len(operands))
+            if fields is None:
+                raise ValueError(f"{template.mnemonic} instruction expects 2 or 3 operands")
+
+        # Register fields, then the last operand, which may instead be an immediate (or an address for loads/stores)
+        word = template.word
+        last = len(fields) - 1
+        for position in range(last):
+            word |= self.encode_register(operands[position]) << fields[position]
+        source = operands[last]
+        if isinstance(source, Immediate):
+            return word | IMMEDIATE_FLAG | self.encode_immediate(source)
+        if fmt is FORMAT_MEMORY and isinstance(source, MemOperand):
+            return word | self.encode_address(template.mnemonic, source)
+        return word | (self.encode_register(source) << fields[last])
+
+    def lookup_template(self, instruction: Instruction) -> 'EncodingTemplate':
+        """Template for a (mnemonic, condition) spelling not seen before."""
+        full_mnemonic = f"{instruction.mnemonic.upper()}{instruction.condition.upper() if instruction.condition else ''}"
+        template = ENCODING_TEMPLATES.get(full_mnemonic)
+        if template is None:
+            raise ValueError(f"Unsupported mnemonic: {full_mnemonic}")
+        self.templates[(instruction.mnemonic, instruction.condition)] = template
+        return template
+
+    def encode_address(self, mnemonic: str, address: MemOperand) -> int:
+        """[Rn] or [Rn, #offset] as base register and offset fields; literal-pool loads use [pc, #offset]."""
+        word = self.encode_base_register(address.base) << RM_SHIFT
+        if isinstance(address.offset, Immediate):
+            return word | IMMEDIATE_FLAG | self.encode_offset(address.offset)
+        if address.offset is not None or not address.closed:
+            raise ValueError(f"Unsupported addressing mode in {mnemonic}")
+        return word
+
+    def encode_register(self, reg: Operand) -> int:
+        """Encode a register operand to its binary representation."""
+        if isinstance(reg, Register) and reg.name.startswith('r'):
+            return reg.num
         raise ValueError(f"Invalid register: {reg}")
 
-    def encode_immediate(self, imm: str) -> int:
+    def encode_immediate(self, imm: Operand) -> int:
         """Encode an immediate value to its binary representation."""
-        if imm.startswith('#'):
-            try:
-                value = int(imm[1:], 0)
-                if 0 <= value < 0x8000:  # 15-bit immediate value
-                    return value
-                raise ValueError(f"Immediate value out of range: {imm}")
-            except ValueError:
-                raise ValueError(f"Invalid immediate value: {imm}")
-        raise ValueError(f"Invalid immediate format: {imm}")
+        if not isinstance(imm, Immediate):
+            raise ValueError(f"Invalid immediate format: {imm}")
+        if imm.value is not None and 0 <= imm.value < 0x8000:  # 15-bit immediate value
+            return imm.value
+        raise ValueError(f"Invalid immediate value: {imm}")
+
+    def encode_base_register(self, reg: Operand) -> int:
+        """Encode the base register of an address; unlike operands this may be sp, lr or pc."""
+        if isinstance(reg, Register):
+            return reg.num
+        raise ValueError(f"Invalid base register: {reg}")
+
+    def encode_offset(self, imm: Operand) -> int:
+        """Encode an address offset as a 15-bit two's-complement value."""
+        if isinstance(imm, Immediate) and imm.value is not None and -0x4000 <= imm.value < 0x4000:
+            return imm.value & 0x7FFF
+        raise ValueError(f"Invalid offset: {imm}")
+
+    def encode_word(self, imm: Operand) -> int:
+        """Encode a .word (a literal-pool entry) as the 32-bit value itself."""
+        if isinstance(imm, Immediate) and imm.value is not None:
+            return imm.value & 0xFFFFFFFF
+        raise ValueError(f"Invalid word value: {imm}")
 
     @staticmethod
     def format_binary(num: int, width: int = 32) -> str:
@@ -0,0 +1,146 @@
+from collections import deque
+from typing import Iterator, List, Optional, Sequence, Tuple
+from Operands import Operand, Register, Immediate, MemOperand
+from CFG import ControlFlowGraph, CALL_MNEMONICS, NO_DESTINATION, ends_block
+
+# Known value of r0..r15 before an instruction; None means "not a known constant"
+RegisterState = Tuple[Optional[int], ...]
+UNKNOWN_STATE: RegisterState = (None,) * 16
+
+LOAD_MNEMONICS = frozenset({'ldr', 'ldrb', 'ldrh', 'ldrd'})
+STORE_MNEMONICS = frozenset({'str', 'strb', 'strh', 'strd'})
+LONG_MULTIPLY = frozenset({'umull', 'umlal', 'smull', 'smlal'})
+
+MASK = 0xFFFFFFFF
+
+def operand_value(state: RegisterState, operand: Operand) -> Optional[int]:
+    if isinstance(operand, Immediate):
+        return None if operand.value is None else operand.value & MASK
+    if isinstance(operand, Register) and operand.num != 15:
+        return state[operand.num]
+    return None
+
+def transfer(state: RegisterState, mnemonic: str, operands: Sequence[Operand]) -> RegisterState:
+    """Register state after one instruction. Only mov/add/sub produce constants."""
+    if mnemonic in NO_DESTINATION and mnemonic not in STORE_MNEMONICS:
+        return UNKNOWN_STATE if mnemonic in CALL_MNEMONICS else state     # a callee may change any register
+    if not operands or not isinstance(operands[0], Register):
+        return state
+
+    dest = operands[0].num
+
+    values = list(state)
+    if mnemonic in STORE_MNEMONICS or mnemonic in LOAD_MNEMONICS:
+        if mnemonic in LOAD_MNEMONICS:
+            values[dest] = None
+            if mnemonic == 'ldrd' and dest < 15:
+                values[dest + 1] = None
+        address = next((op for op in operands if isinstance(op, MemOperand)), None)
+        if address is not None and isinstance(address.base, Register):
+            base = address.base.num
+            position = operands.index(address)
+            if address.writeback:
+                offset = 0 if address.offset is None else operand_value(state, address.offset)
+            elif position + 1 < len(operands):
+                offset = operand_value(state, operands[position + 1])
+            else:
+                return tuple(values)
+            known = state[base]
+            values[base] = None if known is None or offset is None else (known + offset) & MASK
+        return tuple(values)
+
+    if mnemonic == 'ldm':
+        for operand in operands[1:]:
+            if isinstance(operand, Register):
+                values[operand.num] = None
+        return tuple(values)
+
+    if mnemonic == 'mov' and len(operands) == 2:
+        values[dest] = operand_value(state, operands[1])
+    elif mnemonic in ('add', 'sub') and len(operands) == 3:
+        left = operand_value(state, operands[1])
+        right = operand_value(state, operands[2])
+        if left is None or right is None:
+            values[dest] = None
+        else:
+            values[dest] = (left + right if mnemonic == 'add' else left - right) & MASK
+    else:
+        values[dest] = None
+        if mnemonic in LONG_MULTIPLY and len(operands) > 1 and isinstance(operands[1], Register):
+            values[operands[1].num] = None
+    return tuple(values)
+
+def meet(old: Optional[RegisterState], new: RegisterState) -> RegisterState:
+    """Registers keep a constant only if every incoming edge agrees on it."""
+    if old is None:
+        return new
+    return tuple([a if a == b else None for a, b in zip(old, new)])
+
+class ConstantPropagation:
+    """
+    Forward constant propagation of register values over the basic blocks of a ControlFlowGraph.
+
+    Only each block's entry state (a 16-tuple) is stored; the state before
+    any instruction is recomputed by replaying its block. A worklist
+    re-queues a block only when its entry state loses a constant, which can
+    happen at most 16 times, so solving is linear in program size. Blocks
+    that are never reached from the entry are treated as unknown.
+    """
+
+    def __init__(self, cfg: ControlFlowGraph, instructions: List[Tuple[str, Tuple[Operand, ...]]]):
+        self.cfg = cfg
+        self.instructions = instructions       # (mnemonic, decoded operands), one per cfg instruction
+        self.entry_states: List[Optional[RegisterState]] = []
+        self.solve()
+
+    def solve(self):
+        cfg = self.cfg
+        block_count = len(cfg)
+        self.entry_states = [None] * block_count
+        if not block_count:
+            return
+        has_predecessor = bytearray(block_count)
+        for successors in cfg.successors:
+            for successor in successors:
+                has_predecessor[successor] = 1
+
+        worklist = deque()
+        queued = bytearray(block_count)
+        for block in range(block_count):
+            if block == 0 or not has_predecessor[block]:
+                self.entry_states[block] = UNKNOWN_STATE
+                worklist.append(block)
+                queued[block] = 1
+
+        while worklist:
+            block = worklist.popleft()
+            queued[block] = 0
+            state = self.entry_states[block]
+            start, end = cfg.block_range(block)
+            for index in range(start, end):
+                state = transfer(state, *self.instructions[index])
+            for successor in cfg.successors[block]:
+                old = self.entry_states[successor]
+                new = meet(old, state)
+                if new != old:
+                    self.entry_states[successor] = new
+                    if not queued[successor]:
+                        queued[successor] = 1
+                        worklist.append(successor)
+
+    def states(self, start: int = 0, end: int = None) -> Iterator[RegisterState]:
+        """Register state before each instruction in [start, end)."""
+        end = len(self.instructions) if end is None else end
+        if start >= end:
+            return
+        block = self.cfg.block_of(start)
+        block_start, next_start = self.cfg.block_range(block)
+        state = self.entry_states[block] or UNKNOWN_STATE
+        for index in range(block_start, end):
+            if index == next_start:
+                block += 1
+                state = self.entry_states[block] or UNKNOWN_STATE
+                next_start = self.cfg.block_range(block)[1]
+            if index >= start:
+                yield state
+            state = transfer(state, *self.instructions[index])
@@ -0,0 +1,93 @@
+from typing import Dict, Optional, Tuple
+
+ERROR = 'Error'
+WARNING = 'Warning'
+
+# code -> (severity, message template); a template is only formatted when its diagnostic is printed
+MESSAGES: Dict[str, Tuple[str, str]] = {
+    'duplicate-label': (ERROR, "Error: Label '{0}' is defined multiple times"),
+    'invalid-mnemonic': (ERROR, "Error: Invalid mnemonic '{0}'"),
+    'unknown-instruction': (WARNING, "Warning: Unknown instruction '{0}'. Unable to validate operands."),
+    'operand-count-1': (ERROR, "Error: '{0}' instruction requires exactly 1 operand"),
+    'operand-count-2': (ERROR, "Error: '{0}' instruction requires exactly 2 operands"),
+    'operand-count-3': (ERROR, "Error: '{0}' instruction requires exactly 3 operands"),
+    'operand-count-4': (ERROR, "Error: '{0}' instruction requires exactly 4 operands"),
+    'operand-count-3-4': (ERROR, "Error: '{0}' instruction requires 3 or 4 operands"),
+    'operand-count-min-2': (ERROR, "Error: '{0}' instruction requires at least 2 operands"),
+    'operand-count-min-3': (ERROR, "Error: '{0}' instruction requires at least 3 operands"),
+    'invalid-destination': (ERROR, "Error: Invalid destination register in '{0}'"),
+    'invalid-transfer-register': (ERROR, "Error: Invalid destination register '{0}' in {1}"),
+    'invalid-source': (ERROR, "Error: Invalid source operand in '{0}'"),
+    'invalid-first-source': (ERROR, "Error: Invalid first source register in '{0}'"),
+    'invalid-second-source': (ERROR, "Error: Invalid second source operand in '{0}'"),
+    'invalid-register': (ERROR, "Error: Invalid register in '{0}'"),
+    'invalid-base-register': (ERROR, "Error: Invalid base register in '{0}'"),
+    'invalid-register-list': (ERROR, "Error: Invalid register list in '{0}'"),
+    'invalid-shift-amount': (ERROR, "Error: Invalid shift amount in '{0}'"),
+    'invalid-status-register': (ERROR, "Error: Invalid status register in '{0}'"),
+    'invalid-immediate': (ERROR, "Error: Invalid immediate value in '{0}'"),
+    'unencodable-immediate': (ERROR, "Error: Immediate value '{0}' in '{1}' is not an 8-bit value rotated by an even amount"),
+    'expected-bracket': (ERROR, "Error: Expected '[' in {0} addressing mode"),
+    'operands-after-writeback': (ERROR, "Error: Unexpected operands after '!' in {0}"),
+    'missing-bracket': (ERROR, "Error: Missing closing ']' in {0} addressing mode"),
+    'invalid-addressing-mode': (ERROR, "Error: Invalid addressing mode in {0}"),
+    'missing-label-operand': (ERROR, "Error: {0} instruction requires a label operand"),
+    'undefined-label': (ERROR, "Error: Undefined label '{0}'"),
+    'branch-out-of-range': (ERROR, "Error: Branch to '{0}' is out of range for {1}"),
+    'conditional-branch-out-of-range': (ERROR, "Error: Conditional branch to '{0}' is out of range for {1}"),
+    'mixed-int-float': (ERROR, "Error: Mixing integer and floating-point operands in '{0}'"),
+    'float-register-in-integer-op': (ERROR, "Error: Using floating-point registers in integer operation '{0}'"),
+    'directive-needs-symbol': (ERROR, "Error: {0} directive requires at least one symbol"),
+    'noreturn-outside-function': (ERROR, "Error: .noreturn directive must be within a function"),
+    'unrecognized-directive': (ERROR, "Error: Unrecognized directive {0}"),
+    'memory-access': (WARNING, "Warning in {0}: {1}"),
+    'unaligned-access': (WARNING, "Warning: Unaligned access in '{0}' at address {1}"),
+    'load-to-pc': (WARNING, "Warning: Loading to PC is discouraged in ARMv8 AArch32 mode"),
+    'ldm-base-in-list': (WARNING, "Warning: Base register in register list for LDM may lead to unpredictable behavior"),
+}
+
+class Diagnostic:
+    """One semantic diagnostic: a message code, the index of the instruction it is about, and the message arguments."""
+    __slots__ = ('code', 'node', 'args')
+
+    def __init__(self, code: str, node: Optional[int], args: tuple = ()):
+        self.code = code
+        self.node = node        # instruction index (a label's diagnostics use the instruction it labels)
+        self.args = args
+
+    @property
+    def severity(self) -> str:
+        return MESSAGES[self.code][0]
+
+    @property
+    def message(self) -> str:
+        return MESSAGES[self.code][1].format(*self.args)
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return f"Diagnostic({self.code}, {self.node}, {self.args})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Diagnostic):
+            return NotImplemented
+        return self.code == other.code and self.node == other.node and self.args == other.args
+
+    def __hash__(self):
+        return hash((self.code, self.node, self.args))
+
+    def __reduce__(self):
+        return (Diagnostic, (self.code, self.node, self.args))
+
+class DiagnosticLimitReached(Exception):
+    """Raised inside the analyzer once max_errors errors have been reported."""
+
+    def __init__(self, diagnostic: Diagnostic, count: int):
+        super().__init__(f"Stopped after {count} error(s); last: {diagnostic}")
+        self.diagnostic = diagnostic
+        self.count = count
+
+def has_errors(diagnostics) -> bool:
+    """True if any of the diagnostics has error (not warning) severity."""
+    return any(MESSAGES[diagnostic.code][0] == ERROR for diagnostic in diagnostics)
@@ -0,0 +1,106 @@
+from typing import Iterable, Iterator, List, Union
+from Tokenize import Tokenizer
+from Parser import Label, Instruction, Parser, ParseError
+
+class FastParser:
+    """
+    Fused tokenize-and-parse front end for the common line shape
+
+        [label:] mnemonic op, op, op [@ comment]
+
+    Such lines are split with str.partition/str.split and checked against
+    frozensets of mnemonics and registers, emitting Label/Instruction nodes
+    with no token list in between. Anything else (memory operands, directives,
+    unusual spacing) falls back to Tokenizer.tokenize_line + Parser for that
+    line, so the resulting AST is identical to Parser(Tokenizer(code).tokenize()).parse().
+    """
+
+    MNEMONICS = frozenset({
+        'add', 'sub', 'rsb', 'adc', 'sbc', 'rsc', 'and', 'orr', 'eor', 'bic', 'mov', 'mvn',
+        'mul', 'mla', 'umull', 'umlal', 'smull', 'smlal',
+        'cmp', 'cmn',
+        'ldr', 'str', 'ldrb', 'strb', 'ldrh', 'strh', 'ldm', 'stm',
+        'b', 'bl', 'bx', 'blx',
+        'bal', 'beq', 'bne', 'bpl', 'bmi', 'bcc', 'blo', 'bcs', 'bhs', 'bvc', 'bgt', 'bge', 'blt', 'ble', 'bhi', 'bls',
+        'lsl', 'lsr', 'asr', 'ror', 'rrx',
+        'mrs', 'msr',
+        'swi', 'svc', 'bkpt',
+    })
+    REGISTERS = frozenset({f'r{i}' for i in range(16)} | {'sp', 'lr', 'pc'})
+
+    def __init__(self, input_code: str = ''):
+        self.input_code = input_code
+        self.fast_lines = 0
+        self.fallback_lines = 0
+        self.operand_cache = {}     # operand text -> True if it is a single IMMEDIATE/LABEL token
+
+    def parse(self) -> List[Union[Label, Instruction]]:
+        return list(self.iter_nodes(self.input_code.split('\n')))
+
+    def iter_nodes(self, lines: Iterable[str]) -> Iterator[Union[Label, Instruction]]:
+        """Yield nodes for an iterable of lines (a file object works too)."""
+        previous = None     # last node yielded, for operands continued from a fallback line
+        for line_num, line in enumerate(lines, 1):
+            if line.endswith('\n'):
+                line = line[:-1]
+            nodes = self.parse_line(line)
+            if nodes is None:
+                self.fallback_lines += 1
+                nodes = self.parse_fallback(line, line_num, previous)
+            else:
+                self.fast_lines += 1
+            for node in nodes:
+                yield node
+                previous = node
+
+    def parse_line(self, line: str):
+        """Return the nodes for one line, or None if the line needs the general path."""
+        code = line.partition('@')[0]
+        nodes = []
+        if ':' in code:
+            head, _, code = code.partition(':')
+            name = head.lstrip()
+            if not self.is_label_name(name) or name in self.REGISTERS:
+                return None
+            nodes.append(Label(name))
+
+        if not code or code.isspace():
+            return nodes
+        parts = code.replace(',', ' ').split()
+        mnemonic = parts[0] if parts else ''
+        if mnemonic not in self.MNEMONICS or not code.lstrip().startswith(mnemonic):
+            return None
+
+        operands = parts[1:]
+        registers = self.REGISTERS
+        for operand in operands:
+            if operand not in registers and not self.is_simple_operand(operand):
+                return None
+        nodes.append(Instruction(mnemonic, '', operands))
+        return nodes
+
+    def is_label_name(self, name: str) -> bool:
+        return name.isidentifier() and name.isascii()
+
+    def is_simple_operand(self, operand: str) -> bool:
+        """True if the tokenizer would read operand as exactly one IMMEDIATE or LABEL token."""
+        simple = self.operand_cache.get(operand)
+        if simple is None:
+            match = Tokenizer.MASTER_REGEX.match(operand)
+            simple = (match is not None and match.end() == len(operand)
+                      and match.lastgroup in ('IMMEDIATE', 'LABEL'))
+            self.operand_cache[operand] = simple
+        return simple
+
+    def parse_fallback(self, line: str, line_num: int, previous):
+        """General regex path for one line, continuing the previous instruction's operands like Parser does."""
+        tokens = Tokenizer.tokenize_line(line, line_num)
+        pos = 0
+        while pos < len(tokens) and (tokens[pos][0] == 'COMMA' or tokens[pos][0] in Parser.OPERAND_TOKENS):
+            if not isinstance(previous, Instruction):
+                token_type, _, token_line = tokens[pos]
+                raise ParseError(f"Unexpected token {token_type} at line {token_line}")
+            if tokens[pos][0] != 'COMMA':
+                previous.operands.append(tokens[pos][1])
+            pos += 1
+        return list(Parser.iter_nodes(tokens[pos:]))
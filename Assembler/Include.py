@@ -0,0 +1,147 @@
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from Tokenize import Tokenizer
+from Parser import Label, Instruction, Parser, ParseError
+
+# .include "file"   (optionally followed by a comment)
+INCLUDE_RE = re.compile(r'^\s*\.include\s+"([^"]+)"\s*(?:@.*)?$')
+
+class IncludeError(ParseError):
+    pass
+
+def check_cycle(path: str, stack: List[str]):
+    if path in stack:
+        chain = ' -> '.join(stack[stack.index(path):] + [path])
+        raise IncludeError(f"Include cycle detected: {chain}")
+
+def include_error(path: str, stack: List[str], line_num: int, error: OSError) -> IncludeError:
+    """IncludeError naming the file and line of the .include that could not be read."""
+    including = stack[-1] if stack else 'the source'
+    return IncludeError(f"Cannot include '{path}' at line {line_num} of {including}: {error.strerror or error}")
+
+class IncludeCache:
+    """
+    Resolves `.include "file"` directives and memoizes the AST of every included file.
+
+    Each file is tokenized and parsed once per run; its nodes are cached by
+    absolute path and reused by every module that includes it, as long as
+    neither it nor anything it includes has changed mtime. Callers get copies
+    of the cached nodes, so one includer's changes never reach another. Paths
+    are resolved relative to the including file; include cycles and missing
+    files raise IncludeError.
+    """
+
+    def __init__(self):
+        # path -> (nodes, [(dependency path, mtime_ns), ...]) including the file itself
+        self.cache: Dict[str, Tuple[List[Union[Label, Instruction]], List[Tuple[str, int]]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def parse_source(self, input_code: str, base_dir: str = '.', source_path: str = None) -> List[Union[Label, Instruction]]:
+        """Parse a top-level source, splicing in the nodes of every included file."""
+        stack = [os.path.abspath(source_path)] if source_path else []
+        nodes, _ = self.parse_lines(input_code.split('\n'), base_dir, stack)
+        return nodes
+
+    def parse_file(self, path: str, stack: List[str] = None,
+                   line_num: int = 0) -> Tuple[List[Union[Label, Instruction]], List[Tuple[str, int]]]:
+        """Cached (nodes, dependencies) of path, included at line_num of stack[-1]; the nodes must not be modified."""
+        path = os.path.abspath(path)
+        stack = stack or []
+        check_cycle(path, stack)
+
+        cached = self.cache.get(path)
+        if cached is not None and self.is_fresh(cached[1]):
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            with open(path, 'r') as f:
+                lines = f.read().split('\n')
+        except OSError as e:
+            raise include_error(path, stack, line_num, e)
+        nodes, dependencies = self.parse_lines(lines, os.path.dirname(path), stack + [path])
+        entry = (nodes, [(path, mtime)] + dependencies)
+        self.cache[path] = entry
+        return entry
+
+    def parse_lines(self, lines: List[str], base_dir: str, stack: List[str]):
+        nodes = []
+        dependencies = []
+        segment = []    # tokens since the last .include
+        for line_num, line in enumerate(lines, 1):
+            match = INCLUDE_RE.match(line)
+            if match:
+                nodes.extend(Parser(segment).parse())
+                segment = []
+                included, included_dependencies = self.parse_file(os.path.join(base_dir, match.group(1)), stack, line_num)
+                nodes.extend(node.copy() for node in included)
+                dependencies.extend(included_dependencies)
+            else:
+                segment.extend(Tokenizer.tokenize_line(line, line_num))
+        nodes.extend(Parser(segment).parse())
+        return nodes, dependencies
+
+    @staticmethod
+    def is_fresh(dependencies: List[Tuple[str, int]]) -> bool:
+        for path, mtime in dependencies:
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+
+def has_includes(input_code: str) -> bool:
+    return '.include' in input_code and any(INCLUDE_RE.match(line) for line in input_code.split('\n'))
+
+def include_sources(input_code: str, base_dir: str = '.') -> List[Tuple[str, Optional[str]]]:
+    """(absolute path, text) of every file reachable through .include, found by scanning lines only.
+
+    Files that cannot be read have None as text; parsing the source reports them.
+    """
+    seen = {}
+    pending = [(input_code, base_dir)]
+    while pending:
+        code, directory = pending.pop()
+        for line in code.split('\n'):
+            match = INCLUDE_RE.match(line)
+            if match:
+                path = os.path.abspath(os.path.join(directory, match.group(1)))
+                if path not in seen:
+                    try:
+                        with open(path, 'r') as f:
+                            seen[path] = f.read()
+                    except OSError:
+                        seen[path] = None
+                        continue
+                    pending.append((seen[path], os.path.dirname(path)))
+    return list(seen.items())
+
+def include_closure(input_code: str, base_dir: str = '.') -> List[str]:
+    """Absolute paths of every file reachable through .include, readable or not."""
+    return [path for path, _ in include_sources(input_code, base_dir)]
+
+def splice_includes(lines: Iterable[str], base_dir: str = '.', stack: List[str] = None) -> Iterator[str]:
+    """Yield lines with every .include replaced by the included file's lines.
+
+    Used when a source also needs macro expansion, which has to see included
+    macro definitions before the lines that invoke them, so no ASTs are cached.
+    """
+    stack = stack or []
+    for line_num, line in enumerate(lines, 1):
+        match = INCLUDE_RE.match(line)
+        if not match:
+            yield line
+            continue
+        path = os.path.abspath(os.path.join(base_dir, match.group(1)))
+        check_cycle(path, stack)
+        try:
+            with open(path, 'r') as f:
+                included = f.read().split('\n')
+        except OSError as e:
+            raise include_error(path, stack, line_num, e)
+        yield from splice_includes(included, os.path.dirname(path), stack + [path])
@@ -0,0 +1,897 @@
+import heapq
+from collections import OrderedDict
+from collections.abc import Mapping
+from functools import reduce
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+from Tokenize import Tokenizer
+from Parser import Label, Instruction, Parser
+from Semantic_Analyzer.Semantic_Analyzer import SemanticAnalyzer
+from Semantic_Analyzer import mem_val
+from CFG import BRANCH_MNEMONICS, UNCONDITIONAL_BRANCHES, ends_block
+from Dataflow import RegisterState, UNKNOWN_STATE, meet, transfer
+from Diagnostics import Diagnostic
+
+BLOCK_LINES = 128           # lines per block; a block is split once it holds twice as many
+CACHE_LINES = 4096          # distinct line texts whose tokens and nodes are kept
+# Conditional branches reach +-1 MB from pc (see validate_label_references); a smaller program cannot
+# put any branch out of range, so its range checks only change when the branch or its label does
+SHORTEST_BRANCH_RANGE = 1048576
+# Instructions that may be inserted or removed before every branch range is checked again; in between,
+# only branches this close to a range limit are (see IncrementalSession.range_margin)
+RANGE_MARGIN = 4096
+
+# Slots of SourceLine.checks, in the order validate_instruction reports them
+BEFORE, MEMORY, LABEL, AFTER = range(4)
+
+# How control reaches the next instruction: program start, falling through from an ordinary
+# instruction, or after a block-ending one with or without a fall-through edge (as ControlFlowGraph)
+START, FALL, LEAD_FALL, LEAD_CUT = range(4)
+
+# Dataflow between two instructions: register constants after the previous one, whether that one is
+# reachable, how control leaves it, and the label lines met since
+Flow = Tuple[RegisterState, bool, int, Tuple['SourceLine', ...]]
+START_FLOW: Flow = (UNKNOWN_STATE, True, START, ())
+
+class FenwickTree:
+    """Prefix sums over a list of counts with O(log n) point updates, prefix queries and searches."""
+    __slots__ = ('tree',)
+
+    def __init__(self, values: List[int]):
+        tree = [0] + list(values)
+        size = len(tree)
+        for index in range(1, size):
+            parent = index + (index & -index)
+            if parent < size:
+                tree[parent] += tree[index]
+        self.tree = tree
+
+    def __len__(self):
+        return len(self.tree) - 1
+
+    def add(self, index: int, delta: int):
+        tree = self.tree
+        index += 1
+        while index < len(tree):
+            tree[index] += delta
+            index += index & -index
+
+    def prefix(self, end: int) -> int:
+        """Sum of values[:end]."""
+        tree = self.tree
+        total = 0
+        while end > 0:
+            total += tree[end]
+            end -= end & -end
+        return total
+
+    def find(self, target: int) -> int:
+        """Index of the value holding item number target (0-based) of the running total; len(self) past the end."""
+        tree = self.tree
+        position = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            following = position + step
+            if following < len(tree) and tree[following] <= target:
+                position = following
+                target -= tree[following]
+            step >>= 1
+        return position
+
+class SourceLine:
+    """One buffer line: its text, tokens and nodes, where it sits, and the diagnostics last found for it."""
+    __slots__ = ('text', 'tokens', 'nodes', 'count', 'label', 'targets', 'externs', 'memory',
+                 'block', 'position', 'offset', 'checks', 'flow', 'exits', 'reach')
+
+    def __init__(self, text: str, tokens: Tuple[Tuple[str, str], ...], nodes: List[Union[Label, Instruction]]):
+        self.text = text
+        self.tokens = tokens
+        self.nodes = nodes
+        instructions = [node for node in nodes if isinstance(node, Instruction)]
+        self.count = len(instructions)
+        # A label definition can only start a line (see Tokenizer), so a line defines at most one
+        self.label: Optional[str] = nodes[0].name if nodes and isinstance(nodes[0], Label) else None
+        self.targets = tuple(node.operands[0] for node in instructions
+                             if node.mnemonic in BRANCH_MNEMONICS and node.operands)
+        self.externs = tuple(symbol for node in instructions if node.mnemonic == '.extern' for symbol in node.operands)
+        self.memory = any(node.mnemonic in mem_val.MEMORY_INSTRUCTIONS for node in instructions)
+        self.block: 'LineBlock' = None      # None once the line is replaced
+        self.position = 0       # index in block.lines
+        self.offset = 0         # instructions in block.lines before this line
+        # Per instruction, diagnostics by slot (BEFORE, MEMORY, LABEL, AFTER) with line-relative indices; None until checked
+        self.checks: Optional[List[List[List[Diagnostic]]]] = None
+        # Dataflow, stored for checkpoint lines only; None until solved
+        self.flow: Optional[Flow] = None
+        self.exits: Optional[Tuple[Tuple[str, Optional[RegisterState]], ...]] = None   # per branch: label, state after it
+        self.reach: Optional['SourceLine'] = None      # last line at or after this one branching to its label
+
+    @property
+    def checkpoint(self) -> bool:
+        """Whether the dataflow into this line is kept: other lines read it to merge or check."""
+        return self.label is not None or bool(self.targets) or self.memory
+
+    def instructions(self) -> Iterator[Instruction]:
+        return (node for node in self.nodes if isinstance(node, Instruction))
+
+class LineBlock:
+    """A run of consecutive lines; the session keeps per-block line and instruction totals in Fenwick trees."""
+    __slots__ = ('lines', 'count', 'index', 'flow', 'reach')
+
+    def __init__(self, lines: List[SourceLine], index: int):
+        self.lines = lines
+        self.index = index
+        self.count = 0
+        self.flow: Optional[Flow] = None            # dataflow into lines[0], if known
+        self.reach: Optional[SourceLine] = None     # latest SourceLine.reach of the block's lines
+        self.renumber()
+
+    def renumber(self):
+        offset = 0
+        for position, line in enumerate(self.lines):
+            line.block = self
+            line.position = position
+            line.offset = offset
+            offset += line.count
+        self.count = offset
+
+def later(first: Optional[SourceLine], second: Optional[SourceLine]) -> Optional[SourceLine]:
+    """Whichever of two lines comes later in the buffer; None stands for no line."""
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return first if IncrementalSession.position(first) >= IncrementalSession.position(second) else second
+
+class ReachTree:
+    """Max segment tree over LineBlock.reach, to find the loops that enclose a line in O(log n)."""
+    __slots__ = ('size', 'tree')
+
+    def __init__(self, values: List[Optional[SourceLine]]):
+        size = 1
+        while size < len(values):
+            size *= 2
+        tree = [None] * (2 * size)
+        tree[size:size + len(values)] = values
+        for index in range(size - 1, 0, -1):
+            tree[index] = later(tree[2 * index], tree[2 * index + 1])
+        self.size = size
+        self.tree = tree
+
+    def update(self, values: Dict[int, Optional[SourceLine]]):
+        """Set several leaves at once; the inner nodes are redone only after all leaves hold current lines."""
+        tree = self.tree
+        nodes = set()
+        for index, value in values.items():
+            tree[self.size + index] = value
+            nodes.add((self.size + index) // 2)
+        nodes.discard(0)            # a single leaf is the root
+        while nodes:
+            for index in nodes:
+                tree[index] = later(tree[2 * index], tree[2 * index + 1])
+            nodes = {index // 2 for index in nodes if index > 1}
+
+    def leftmost(self, end: int, bound: Tuple[int, int]) -> Optional[int]:
+        """First index below end whose line is at or after position bound."""
+        tree, size = self.tree, self.size
+
+        def search(node: int, low: int, high: int) -> Optional[int]:
+            line = tree[node]
+            if low >= end or line is None or IncrementalSession.position(line) < bound:
+                return None
+            if node >= size:
+                return low
+            middle = (low + high) // 2
+            found = search(2 * node, low, middle)
+            return found if found is not None else search(2 * node + 1, middle, high)
+
+        return search(1, 0, size)
+
+class SymbolTableView(Mapping):
+    """The session's symbol table; addresses are read from the line structure when looked up, never stored."""
+
+    def __init__(self, session: 'IncrementalSession'):
+        self.session = session
+
+    def __getitem__(self, name: str) -> int:
+        return self.session.address_of(self.session.labels[name][0])
+
+    def __contains__(self, name) -> bool:
+        return name in self.session.labels
+
+    def __iter__(self):
+        return iter(self.session.labels)
+
+    def __len__(self):
+        return len(self.session.labels)
+
+class ExternalSymbolsView:
+    """The .extern symbols declared before one instruction, as the serial analyzer has collected them when it gets there."""
+
+    def __init__(self, session: 'IncrementalSession', line: SourceLine, index: int):
+        self.session = session
+        self.line = line
+        self.index = index
+
+    def __contains__(self, name) -> bool:
+        lines = self.session.externs.get(name)
+        if not lines:
+            return False
+        if lines[0] is not self.line:
+            return self.session.position(lines[0]) < self.session.position(self.line)
+        return any(node.mnemonic == '.extern' and name in node.operands
+                   for node in islice(self.line.instructions(), self.index))
+
+class IncrementalSession:
+    """
+    Editor-facing assembler session that re-processes only the lines that changed.
+
+    Edits come in through edit_line() and replace_lines(), which cost
+    O(log n) plus the lines replaced. update() takes a whole new buffer and
+    diffs it against the old one, which is O(n) per call; it is there for
+    callers that only have the full text.
+
+    Tokens never span lines, so tokens and AST nodes are built per line and
+    kept in a bounded cache keyed by the line's text; every line gets its own
+    copies of the cached nodes. Lines are held in blocks of about BLOCK_LINES,
+    with Fenwick trees over the blocks' line and instruction counts, so
+    finding a line or its address takes O(log n) plus one block. Labels point
+    at the lines defining them and their addresses are read off that
+    structure on lookup (symbol_table is a live view), so an edit never
+    walks or shifts the labels after it.
+
+    analyze() keeps each line's diagnostics. Mnemonic, operand, type and
+    directive checks depend on the line alone and run once per new line.
+    Label checks are redone for new branches and for branches whose label or
+    .extern declaration was added, removed or moved. Once the program is
+    large enough for a branch to fall out of range, they are also redone for
+    the branches within range_margin() instructions of a range limit, and
+    for every branch after that many instructions were inserted or removed.
+
+    Memory-access checks read the register constants of the dataflow. The
+    flow into every label, branch and memory line is kept, and after an edit
+    it is recomputed forward from the changed lines until it comes out as
+    stored. A loop (the lines from a label to the last branch back to it)
+    with a change inside is solved again as a whole. So an edit costs its
+    lines, the loops around them and the code whose register constants it
+    changes; only memory lines whose incoming flow changed are checked again.
+    The list analyze() returns holds every diagnostic, so building it is
+    O(diagnostics).
+
+    Each line is parsed on its own, so an operand list cannot continue onto
+    the next line (the full Parser would append such operands to the previous
+    instruction).
+    """
+
+    INSTRUCTION_SIZE = 4
+
+    def __init__(self, input_code: str = ''):
+        self.blocks: List[LineBlock] = [LineBlock([], 0)]
+        self.line_totals = FenwickTree([0])                       # lines per block
+        self.instruction_totals = FenwickTree([0])                # instructions per block
+        self.reach_tree: Optional[ReachTree] = None               # rebuilt by analyze() when None
+        self.empty_blocks = 1
+        self.labels: Dict[str, List[SourceLine]] = {}             # label -> lines defining it, in order
+        self.references: Dict[str, Set[SourceLine]] = {}          # label -> lines branching to it
+        self.externs: Dict[str, List[SourceLine]] = {}            # symbol -> lines declaring it .extern, in order
+        self.duplicates: Set[str] = set()                         # labels defined more than once
+        self.memory_lines: Set[SourceLine] = set()
+        self.branch_lines: Set[SourceLine] = set()
+        self.flagged: Set[SourceLine] = set()                     # lines with diagnostics
+        self.stale: Set[SourceLine] = set()                       # lines whose label checks must be redone
+        self.changed_labels: Set[str] = set()                     # labels defined, removed or redefined
+        self.changed_externs: Set[str] = set()
+        self.changed_targets: Set[str] = set()                    # labels whose definitions or branches changed
+        self.reach_blocks: Set[LineBlock] = set()                 # blocks whose LineBlock.reach must be redone
+        self.seeds: Set[SourceLine] = set()                       # lines whose incoming flow may have changed
+        self.dirty: Set[SourceLine] = set()                       # seeds whose stored flow cannot be trusted
+        self.solved = False                                       # stored flows are current
+        self.heap: List[Tuple[Tuple[int, int], int, SourceLine]] = None     # lines left to solve, while solve() runs
+        self.visited: Set[SourceLine] = None                      # lines solve() has recomputed
+        self.large = False                                        # a branch may be out of range
+        self.near: Set[SourceLine] = set()                        # branch lines close to a range limit
+        self.drift = 0                                            # instructions inserted or removed since all were checked
+        self.cache: 'OrderedDict[str, Tuple[Tuple[Tuple[str, str], ...], List[Union[Label, Instruction]]]]' = OrderedDict()
+        self.lines_processed = 0                                  # cache misses since creation
+        self.update(input_code)
+
+    @property
+    def lines(self) -> List[str]:
+        return [line.text for block in self.blocks for line in block.lines]
+
+    @property
+    def line_count(self) -> int:
+        return self.line_totals.prefix(len(self.blocks))
+
+    @property
+    def instruction_count(self) -> int:
+        return self.instruction_totals.prefix(len(self.blocks))
+
+    @property
+    def symbol_table(self) -> SymbolTableView:
+        return SymbolTableView(self)
+
+    def update(self, input_code: str):
+        """Replace the whole buffer, re-processing only the lines that differ.
+
+        Finding them compares the old and new text line by line, O(n) per call;
+        an editor that knows what it changed should call replace_lines() instead.
+        """
+        new_lines = input_code.split('\n')
+        old_lines = self.lines
+        start = 0
+        limit = min(len(old_lines), len(new_lines))
+        while start < limit and old_lines[start] == new_lines[start]:
+            start += 1
+        old_end, new_end = len(old_lines), len(new_lines)
+        while old_end > start and new_end > start and old_lines[old_end - 1] == new_lines[new_end - 1]:
+            old_end -= 1
+            new_end -= 1
+        if start == old_end and start == new_end and old_lines:
+            return
+        self.replace_lines(start, old_end, new_lines[start:new_end])
+
+    def edit_line(self, line_num: int, text: str):
+        """Replace a single (1-based) line."""
+        self.replace_lines(line_num - 1, line_num, [text])
+
+    def replace_lines(self, start: int, end: int, new_lines: List[str]):
+        """Replace lines[start:end] (0-based) with new_lines.
+
+        The blocks holding the replaced lines are edited in place and the
+        Fenwick trees updated, O(log n) per block. A block that grows past
+        2 * BLOCK_LINES is split, and once an eighth of the blocks are empty
+        they are dropped; both rebuild the per-block trees in O(n / BLOCK_LINES),
+        which is amortized over the BLOCK_LINES lines it takes to get there.
+        """
+        blocks = self.blocks
+        first = min(self.line_totals.find(start), len(blocks) - 1)
+        last = min(self.line_totals.find(end - 1), len(blocks) - 1) if end > start else first
+        head = start - self.line_totals.prefix(first)
+        tail = end - self.line_totals.prefix(last)
+        touched = blocks[first:last + 1]
+        sizes = [(len(block.lines), block.count) for block in touched]
+        new = [SourceLine(text, *self.process_line(text, start + offset + 1)) for offset, text in enumerate(new_lines)]
+        if first == last:
+            old = touched[0].lines[head:tail]
+            touched[0].lines = touched[0].lines[:head] + new + touched[0].lines[tail:]
+        else:
+            old = touched[0].lines[head:] + [line for block in touched[1:-1] for line in block.lines] + touched[-1].lines[:tail]
+            touched[0].lines = touched[0].lines[:head] + new
+            for block in touched[1:-1]:
+                block.lines = []
+            touched[-1].lines = touched[-1].lines[tail:]
+            for block in touched[1:]:
+                block.flow = None       # their first line is no longer where the flow was taken
+        for line in old:
+            self.forget(line)
+        self.drift += abs(sum(line.count for line in new) - sum(line.count for line in old))
+
+        for index, (block, (line_total, instruction_total)) in enumerate(zip(touched, sizes), first):
+            block.renumber()
+            self.line_totals.add(index, len(block.lines) - line_total)
+            self.instruction_totals.add(index, block.count - instruction_total)
+            self.empty_blocks += (not block.lines) - (not line_total)
+        self.reach_blocks.update(touched)
+        if len(touched[0].lines) > 2 * BLOCK_LINES:
+            self.split(touched[0])
+        elif self.empty_blocks * 8 > len(blocks):
+            self.rebuild()
+
+        for line in new:
+            self.learn(line)
+        self.seeds.update(new)
+        self.dirty.update(new)
+        following = self.next_line(new[-1]) if new else self.line_at(start)
+        if following is not None:
+            self.seeds.add(following)
+
+    def split(self, block: LineBlock):
+        """Cut an overgrown block into blocks of BLOCK_LINES lines."""
+        lines = block.lines
+        pieces = [LineBlock(lines[at:at + BLOCK_LINES], block.index) for at in range(0, len(lines), BLOCK_LINES)]
+        pieces[0].flow = block.flow
+        for piece in pieces[1:]:
+            self.seeds.add(piece.lines[0])
+        self.blocks[block.index:block.index + 1] = pieces
+        self.reach_blocks.update(pieces)
+        self.rebuild()
+
+    def rebuild(self):
+        """Drop empty blocks, renumber the rest and rebuild the per-block trees."""
+        self.blocks = [block for block in self.blocks if block.lines] or self.blocks[:1]
+        for index, block in enumerate(self.blocks):
+            block.index = index
+        self.line_totals = FenwickTree([len(block.lines) for block in self.blocks])
+        self.instruction_totals = FenwickTree([block.count for block in self.blocks])
+        self.empty_blocks = 0 if self.blocks[0].lines else 1
+        self.reach_tree = None
+
+    def learn(self, line: SourceLine):
+        """Index a line that was just placed: its label, branch targets, declarations and the checks it needs."""
+        if line.label is not None:
+            lines = self.labels.setdefault(line.label, [])
+            self.insert_in_order(lines, line)
+            if len(lines) > 1:
+                self.duplicates.add(line.label)
+            self.changed_labels.add(line.label)
+            self.changed_targets.add(line.label)
+        for name in line.targets:
+            self.references.setdefault(name, set()).add(line)
+            self.changed_targets.add(name)
+        for name in line.externs:
+            self.insert_in_order(self.externs.setdefault(name, []), line)
+            self.changed_externs.add(name)
+        if line.targets:
+            self.branch_lines.add(line)
+        if line.memory:
+            self.memory_lines.add(line)
+        self.stale.add(line)
+
+    def forget(self, line: SourceLine):
+        """Drop a replaced line from every index."""
+        if line.label is not None:
+            lines = self.labels[line.label]
+            lines.remove(line)
+            if len(lines) < 2:
+                self.duplicates.discard(line.label)
+            if not lines:
+                del self.labels[line.label]
+            self.changed_labels.add(line.label)
+            self.changed_targets.add(line.label)
+        for name in line.targets:
+            referencing = self.references[name]
+            referencing.discard(line)
+            if not referencing:
+                del self.references[name]
+            self.changed_targets.add(name)
+        for name in line.externs:
+            lines = self.externs[name]
+            lines.remove(line)
+            if not lines:
+                del self.externs[name]
+            self.changed_externs.add(name)
+        for lines in (self.memory_lines, self.branch_lines, self.flagged, self.stale, self.near, self.seeds, self.dirty):
+            lines.discard(line)
+        line.block = None
+
+    def insert_in_order(self, lines: List[SourceLine], line: SourceLine):
+        key = self.position(line)
+        at = len(lines)
+        while at and self.position(lines[at - 1]) > key:
+            at -= 1
+        lines.insert(at, line)
+
+    def process_line(self, line: str, line_num: int):
+        """Tokenize and parse one line, reusing cached results for identical text; the nodes returned are fresh copies."""
+        cached = self.cache.get(line)
+        if cached is None:
+            tokens = Tokenizer.tokenize_line(line, line_num)
+            nodes = list(Parser.iter_nodes(tokens))
+            cached = (tuple((token_type, value) for token_type, value, _ in tokens), nodes)
+            self.cache[line] = cached
+            if len(self.cache) > CACHE_LINES:
+                self.cache.popitem(last=False)
+            self.lines_processed += 1
+        else:
+            self.cache.move_to_end(line)
+        tokens, nodes = cached
+        return tokens, [node.copy() for node in nodes]
+
+    @staticmethod
+    def position(line: SourceLine) -> Tuple[int, int]:
+        """Sort key of a line in source order."""
+        return line.block.index, line.position
+
+    def first_instruction(self, line: SourceLine) -> int:
+        """Instruction index of the first instruction at or after the start of line."""
+        return self.instruction_totals.prefix(line.block.index) + line.offset
+
+    def address_of(self, line: SourceLine) -> int:
+        return self.first_instruction(line) * self.INSTRUCTION_SIZE
+
+    def line_at(self, line_index: int) -> Optional[SourceLine]:
+        block = self.line_totals.find(line_index)
+        if block >= len(self.blocks):
+            return None
+        return self.blocks[block].lines[line_index - self.line_totals.prefix(block)]
+
+    def line_address(self, line_index: int) -> int:
+        """Address of the first instruction at or after the start of a line."""
+        line = self.line_at(line_index)
+        if line is None:
+            return self.instruction_count * self.INSTRUCTION_SIZE
+        return self.address_of(line)
+
+    def next_line(self, line: SourceLine) -> Optional[SourceLine]:
+        block = line.block
+        if line.position + 1 < len(block.lines):
+            return block.lines[line.position + 1]
+        for following in islice(self.blocks, block.index + 1, None):
+            if following.lines:
+                return following.lines[0]
+        return None
+
+    def previous_line(self, line: SourceLine) -> Optional[SourceLine]:
+        block = line.block
+        if line.position:
+            return block.lines[line.position - 1]
+        for index in range(block.index - 1, -1, -1):
+            if self.blocks[index].lines:
+                return self.blocks[index].lines[-1]
+        return None
+
+    def first_line(self) -> Optional[SourceLine]:
+        return next((block.lines[0] for block in self.blocks if block.lines), None)
+
+    def iter_lines(self, first: SourceLine, last: SourceLine) -> Iterator[SourceLine]:
+        """first, last and the lines between them."""
+        line = first
+        while True:
+            yield line
+            if line is last:
+                return
+            line = self.next_line(line)
+
+    @property
+    def tokens(self) -> List[tuple]:
+        """Flat token list, identical to Tokenizer(buffer).tokenize()."""
+        return [(token_type, value, line_num)
+                for line_num, line in enumerate((line for block in self.blocks for line in block.lines), 1)
+                for token_type, value in line.tokens]
+
+    @property
+    def ast(self) -> List[Union[Label, Instruction]]:
+        return [node for block in self.blocks for line in block.lines for node in line.nodes]
+
+    def duplicate_errors(self) -> List[Diagnostic]:
+        """Diagnostics for every repeated label definition, in source order, as build_symbol_table reports them."""
+        duplicates = sorted((self.position(line), name, line) for name in self.duplicates for line in self.labels[name][1:])
+        return [Diagnostic('duplicate-label', self.first_instruction(line), (name,)) for _, name, line in duplicates]
+
+    def analyze(self):
+        """Run semantic validation against the incrementally maintained symbol table.
+
+        Returns (errors, symbol_table) as SemanticAnalyzer.analyze would for the whole buffer.
+        """
+        analyzer = SemanticAnalyzer([])
+        analyzer.symbol_table = self.symbol_table
+
+        stale = self.stale
+        for name in self.changed_labels | self.changed_externs:
+            stale.update(self.references.get(name, ()))
+        large = (self.instruction_count + 1) * self.INSTRUCTION_SIZE > SHORTEST_BRANCH_RANGE
+        if large != self.large or (large and self.drift > self.range_margin()):
+            stale.update(self.branch_lines)
+            self.near.clear()
+            self.drift = 0
+        elif large:
+            stale.update(self.near)
+        else:
+            self.drift = 0
+        self.large = large
+        for line in stale:
+            self.check_line(analyzer, line)
+        stale.clear()
+        self.changed_labels.clear()
+        self.changed_externs.clear()
+
+        self.refresh_loops()
+        self.solve(analyzer)
+
+        errors = self.duplicate_errors()
+        for line in sorted(self.flagged, key=self.position):
+            first = self.first_instruction(line)
+            for index, slots in enumerate(line.checks):
+                for slot in slots:
+                    errors.extend(Diagnostic(error.code, first + index, error.args) for error in slot)
+        return errors, self.symbol_table
+
+    def range_margin(self) -> int:
+        """Instructions of drift the near-limit branch set covers; grows with the branches so a full recheck stays amortized O(1)."""
+        return max(RANGE_MARGIN, len(self.branch_lines) // 8)
+
+    def check_line(self, analyzer: SemanticAnalyzer, line: SourceLine):
+        """Label checks of line, and the line-local checks too if it is new."""
+        fresh = line.checks is None
+        if fresh:
+            line.checks = [[[], [], [], []] for _ in range(line.count)]
+        address = self.address_of(line)
+        for index, node in enumerate(line.instructions()):
+            slots = line.checks[index]
+            analyzer.instruction_index = index
+            analyzer.instruction_address = address + index * self.INSTRUCTION_SIZE
+            if node.mnemonic.startswith('.'):
+                if fresh:
+                    analyzer.errors = slots[BEFORE]
+                    analyzer.external_symbols = set()
+                    analyzer.process_directive(node)
+                continue
+            if fresh:
+                analyzer.errors = slots[BEFORE]
+                analyzer.validate_mnemonic(node)
+                analyzer.validate_operands(node)
+                analyzer.errors = slots[AFTER]
+                analyzer.validate_type_mismatch(node)
+            analyzer.errors = slots[LABEL] = []
+            analyzer.external_symbols = ExternalSymbolsView(self, line, index)
+            analyzer.validate_label_references(node)
+        if self.large and line.targets and self.near_range_limit(line, address):
+            self.near.add(line)
+        else:
+            self.near.discard(line)
+        self.flag(line)
+
+    def near_range_limit(self, line: SourceLine, address: int) -> bool:
+        """Whether a branch of line is within range_margin() instructions of either end of its range."""
+        margin = self.range_margin() * self.INSTRUCTION_SIZE
+        for index, node in enumerate(line.instructions()):
+            if node.mnemonic in BRANCH_MNEMONICS and node.operands and node.operands[0] in self.labels:
+                distance = self.symbol_table[node.operands[0]] - (address + index * self.INSTRUCTION_SIZE + 8)
+                low, high = SemanticAnalyzer.branch_range(node.mnemonic)
+                if abs(min(distance - low, high - distance)) <= margin:
+                    return True
+        return False
+
+    def flag(self, line: SourceLine):
+        if any(slot for slots in line.checks for slot in slots):
+            self.flagged.add(line)
+        else:
+            self.flagged.discard(line)
+
+    def refresh_loops(self):
+        """Redo SourceLine.reach for the lines of changed labels, and the per-block maxima over it."""
+        for name in self.changed_targets:
+            for line in self.labels.get(name, ()):
+                line.reach = self.back_reach(line)
+                self.reach_blocks.add(line.block)
+        blocks = self.blocks
+        values = {}
+        for block in self.reach_blocks:
+            if block.index < len(blocks) and blocks[block.index] is block:
+                block.reach = None
+                for line in block.lines:
+                    block.reach = later(block.reach, line.reach)
+                values[block.index] = block.reach
+        self.reach_blocks.clear()
+        if self.reach_tree is None:
+            self.reach_tree = ReachTree([block.reach for block in blocks])
+        elif values:
+            self.reach_tree.update(values)
+
+    def back_reach(self, line: SourceLine) -> Optional[SourceLine]:
+        """Last line at or after line that branches to its label."""
+        key = self.position(line)
+        furthest = None
+        for source in self.references.get(line.label, ()):
+            if self.position(source) >= key:
+                furthest = later(furthest, source)
+        return furthest
+
+    def enclosing_target(self, line: SourceLine) -> Optional[SourceLine]:
+        """A label line before line that a branch at or after line jumps back to, the earliest one if any."""
+        key = self.position(line)
+        index = self.reach_tree.leftmost(line.block.index, key)
+        candidates = self.blocks[index].lines if index is not None else line.block.lines[:line.position]
+        return next((candidate for candidate in candidates
+                     if candidate.reach is not None and self.position(candidate.reach) >= key), None)
+
+    def loop_range(self, line: SourceLine) -> Tuple[SourceLine, SourceLine, bool]:
+        """First and last line of the loops around line, and whether there are any (else line, line)."""
+        first = last = line
+        cyclic = False
+        pending = [(line, line)]            # ranges not yet searched for branches leaving them
+        while True:
+            while pending:
+                start, end = pending.pop()
+                for scanned in self.iter_lines(start, end):
+                    if scanned.reach is not None:
+                        cyclic = True
+                        if self.position(scanned.reach) > self.position(last):
+                            pending.append((self.next_line(last), scanned.reach))
+                            last = scanned.reach
+                    for name in scanned.targets:
+                        for target in self.labels.get(name, ()):
+                            if self.position(target) <= self.position(scanned):
+                                cyclic = True
+                                if self.position(target) < self.position(first):
+                                    pending.append((target, self.previous_line(first)))
+                                    first = target
+            target = self.enclosing_target(first)
+            if target is None:
+                return first, last, cyclic
+            cyclic = True
+            pending.append((target, self.previous_line(first)))
+            first = target
+
+    def solve(self, analyzer: SemanticAnalyzer):
+        """Bring the stored flows up to date from the seeds, checking memory lines whose flow changed."""
+        if not self.memory_lines:
+            # Nothing reads register constants; start over once something does
+            self.solved = False
+        elif not self.solved or self.seeds or self.changed_targets:
+            seeds, dirty = self.seeds, self.dirty
+            for name in self.changed_targets:
+                targets = self.labels.get(name, ())
+                seeds.update(targets)
+                dirty.update(targets)
+            if not self.solved:
+                seeds = {self.first_line()}
+            self.heap = [(self.position(line), id(line), line) for line in seeds if line is not None and line.block is not None]
+            heapq.heapify(self.heap)
+            self.visited = set()
+            while self.heap:
+                line = heapq.heappop(self.heap)[2]
+                if line.block is not None and line not in self.visited:
+                    first, last, cyclic = self.loop_range(line)
+                    self.walk(analyzer, first, last, cyclic, self.flow_before(first) if self.solved else START_FLOW)
+            self.heap = self.visited = None
+            self.solved = True
+        self.seeds.clear()
+        self.dirty.clear()
+        self.changed_targets.clear()
+
+    def walk(self, analyzer: SemanticAnalyzer, line: SourceLine, last: SourceLine, cyclic: bool, flow: Flow):
+        """Recompute flows from line on, stopping at a line whose stored flow comes out the same."""
+        while True:
+            flow = self.solve_loop(analyzer, line, last, flow) if cyclic else self.visit(analyzer, line, flow)
+            line = self.next_line(last)
+            if line is None or line in self.visited or (self.solved and self.converged(line, flow)):
+                return
+            if line.reach is not None:
+                line, last, cyclic = self.loop_range(line)
+            else:
+                last, cyclic = line, False
+
+    def converged(self, line: SourceLine, flow: Flow) -> bool:
+        if line in self.dirty or self.remerged(line, flow):
+            return False
+        if line.position == 0 and line.block.flow is not None:
+            return line.block.flow == flow
+        return line.flow is not None and line.flow == flow
+
+    def flow_before(self, line: SourceLine) -> Flow:
+        """Flow into line, replayed from the nearest flow stored before it."""
+        block, position = line.block, line.position
+        while True:
+            lines = block.lines
+            at = position - 1
+            while at >= 0 and lines[at].flow is None:
+                at -= 1
+            if at >= 0:
+                start, flow = lines[at], lines[at].flow
+                break
+            if position and block.flow is not None:
+                start, flow = lines[0], block.flow
+                break
+            if block.index == 0:
+                start, flow = self.first_line(), START_FLOW
+                break
+            block = self.blocks[block.index - 1]
+            position = len(block.lines)
+        while start is not line:
+            flow = self.step(start, flow)[0]
+            start = self.next_line(start)
+        return flow
+
+    def visit(self, analyzer: SemanticAnalyzer, line: SourceLine, flow: Flow) -> Flow:
+        """Recompute one line outside any loop; returns the flow out of it."""
+        if line.position == 0:
+            line.block.flow = flow
+        stored = line.flow
+        if line.checkpoint:
+            line.flow = flow
+        self.visited.add(line)
+        states = [] if line.memory else None
+        after, exits = self.step(line, flow, states)
+        if exits != line.exits:
+            line.exits = exits
+            self.seed_targets(line, line)
+        if line.memory and (not self.solved or line in self.dirty or stored != flow or self.remerged(line, flow)):
+            self.check_memory(analyzer, line, states)
+        return after
+
+    def solve_loop(self, analyzer: SemanticAnalyzer, first: SourceLine, last: SourceLine, flow: Flow) -> Flow:
+        """Solve the lines first..last, which contain loops, from scratch; returns the flow out of last."""
+        lines = list(self.iter_lines(first, last))
+        stored = [(line.flow, line.exits) for line in lines]
+        for line in lines:
+            line.flow = line.exits = None
+        entry = flow
+        changed = True
+        while changed:              # exits only ever lose constants, so this settles
+            changed = False
+            flow = entry
+            for line in lines:
+                if line.position == 0:
+                    line.block.flow = flow
+                if line.checkpoint:
+                    line.flow = flow
+                flow, exits = self.step(line, flow)
+                if exits != line.exits:
+                    line.exits = exits
+                    changed = True
+        merged = set()              # labels whose incoming branches changed
+        for line, (stored_flow, stored_exits) in zip(lines, stored):
+            if line.exits != stored_exits:
+                merged.update(line.targets)
+                self.seed_targets(line, last)
+        for line, (stored_flow, stored_exits) in zip(lines, stored):
+            self.visited.add(line)
+            if line.memory and (not self.solved or line in self.dirty or line.flow != stored_flow
+                                or self.remerged(line, line.flow, merged)):
+                states = []
+                self.step(line, line.flow, states)
+                self.check_memory(analyzer, line, states)
+        return flow
+
+    def remerged(self, line: SourceLine, flow: Flow, names: Set[str] = frozenset()) -> bool:
+        """Whether a label flowing into line, or its own, was queued or is in names: its branches in changed."""
+        labels = flow[3] + (line,) if line.label is not None else flow[3]
+        return any(label in self.dirty or label.label in names for label in labels)
+
+    def seed_targets(self, line: SourceLine, bound: SourceLine):
+        """Queue the labels line branches to that lie after bound: what flows into them changed."""
+        key = self.position(bound)
+        for name in line.targets:
+            for target in self.labels.get(name, ()):
+                if self.position(target) > key:
+                    self.dirty.add(target)
+                    heapq.heappush(self.heap, (self.position(target), id(target), target))
+
+    def step(self, line: SourceLine, flow: Flow, states: List[RegisterState] = None):
+        """Flow out of line given the flow into it, and the state after each of its branches.
+
+        Register states before each instruction are appended to states, as ConstantPropagation.states() yields them.
+        """
+        state, reached, kind, labels = flow
+        if line.label is not None:
+            labels += (line,)
+        exits = [] if line.targets else None
+        for node in line.instructions():
+            if kind == START:
+                state, reached = UNKNOWN_STATE, True
+            else:
+                targets = tuple(label for label in labels if self.labels[label.label][0] is label)
+                if kind != FALL or targets:
+                    state, reached = self.entry(state, reached, kind, targets)
+            if states is not None:
+                states.append(state)
+            mnemonic = node.mnemonic
+            following = transfer(state, mnemonic, node.decoded)
+            if mnemonic in BRANCH_MNEMONICS:
+                if node.operands:
+                    exits.append((node.operands[0], following if reached else None))
+                kind = LEAD_CUT if mnemonic in UNCONDITIONAL_BRANCHES else LEAD_FALL
+            else:
+                kind = LEAD_CUT if ends_block(mnemonic, node.operands) else FALL
+            state = following
+            labels = ()
+        return (state, reached, kind, labels), (tuple(exits) if exits is not None else None)
+
+    def entry(self, state: RegisterState, reached: bool, kind: int, targets: Tuple[SourceLine, ...]) -> Tuple[RegisterState, bool]:
+        """Register state at a block start and whether it is reached: the meet over its reached predecessors.
+
+        A block without predecessors starts from nothing known, like ConstantPropagation's roots.
+        """
+        connected = kind != LEAD_CUT
+        incoming = [state] if connected and reached else []
+        for target in targets:
+            for source in self.references.get(target.label, ()):
+                connected = True
+                if source.exits is not None:
+                    incoming.extend(after for name, after in source.exits if name == target.label and after is not None)
+        if not connected:
+            return UNKNOWN_STATE, True
+        if not incoming:
+            return UNKNOWN_STATE, False
+        return reduce(meet, incoming), True
+
+    def check_memory(self, analyzer: SemanticAnalyzer, line: SourceLine, states: List[RegisterState]):
+        """Redo the memory-access checks of line against the register states before its instructions."""
+        for index, node in enumerate(line.instructions()):
+            analyzer.instruction_index = index
+            analyzer.register_state = states[index]
+            analyzer.errors = line.checks[index][MEMORY] = []
+            analyzer.validate_memory_access(node)
+        analyzer.register_state = None
+        self.flag(line)
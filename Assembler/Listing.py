@@ -0,0 +1,88 @@
+from typing import Dict, List, Union
+from Parser import Label, Instruction
+from Code_generator import TYPE_SHIFT, CONTROL_SHIFT, RD_SHIFT, RM_SHIFT, RN_SHIFT, IMMEDIATE_FLAG, VALUE_MASK
+
+NODE_TOKENS = frozenset({'LABEL_DEF', 'INSTRUCTION', 'DIRECTIVE'})
+
+HEADER = " line  address  word      type ctrl   rd rm rn i value  source"
+LABEL_PAD = " " * 39
+
+def node_lines(nodes: List[Union[Label, Instruction]], tokens: List[tuple]) -> Dict[int, tuple]:
+    """id(node) -> (node, source line) for the nodes Parser.parse built from tokens.
+
+    Every label definition and mnemonic token starts exactly one node, in order.
+    The node is kept alongside its line so an id reused by a later node never matches.
+    """
+    starts = (line_num for token_type, _, line_num in tokens if token_type in NODE_TOKENS)
+    return {id(node): (node, line_num) for node, line_num in zip(nodes, starts)}
+
+def format_instruction(node: Instruction) -> str:
+    """Instruction as assembly text, for nodes that have no source line (literal pools, rewritten branches)."""
+    text = ''
+    previous = '['
+    for operand in node.operands:
+        if not (previous == '[' or operand in (']', '!')):
+            text += ', '
+        text += operand
+        previous = operand
+    mnemonic = node.mnemonic + (node.condition or '')
+    return f"{mnemonic} {text}" if text else mnemonic
+
+class Listing:
+    """
+    Assembly listing (.lst) of one program.
+
+    One row per label and instruction: source line number, address and,
+    for instructions, the encoded word in hex, its decoded fields and the
+    source line it came from; nodes the assembler created itself (literal pools, peephole
+    rewrites) show their instruction text instead. The symbol table
+    follows. Rows are collected in one pass over the final nodes and the
+    file is written with a single write.
+    """
+
+    def __init__(self, source: str, nodes: List[Union[Label, Instruction]], machine_code: List[int],
+                 symbol_table: Dict[str, int], lines: Dict[int, tuple] = None):
+        self.source_lines = source.split('\n')
+        self.nodes = nodes
+        self.machine_code = machine_code
+        self.symbol_table = symbol_table
+        self.lines = lines or {}
+
+    def source_line(self, node: Union[Label, Instruction]):
+        """(line number, text) of node in the source, or None."""
+        entry = self.lines.get(id(node))
+        if entry is None or entry[0] is not node:
+            return None
+        line_num = entry[1]
+        return line_num, self.source_lines[line_num - 1].rstrip()
+
+    def render(self) -> str:
+        rows = [HEADER]
+        append = rows.append
+        words = iter(self.machine_code)
+        address = 0
+        for node in self.nodes:
+            located = self.source_line(node)
+            line = f"{located[0]:5}" if located else "     "
+            if isinstance(node, Label):
+                append(f"{line}  {address:08X}{LABEL_PAD}{node.name}:")
+                continue
+            word = next(words, None)
+            if word is None:
+                break       # code generation stopped early
+            text = located[1] if located else "    " + format_instruction(node)
+            append(f"{line}  {address:08X} {word:08X}  "
+                   f"{word >> TYPE_SHIFT:02b}   {(word >> CONTROL_SHIFT) & 0x3F:06b} "
+                   f"{(word >> RD_SHIFT) & 0xF:2} {(word >> RM_SHIFT) & 0xF:2} {(word >> RN_SHIFT) & 0xF:2} "
+                   f"{1 if word & IMMEDIATE_FLAG else 0} {word & VALUE_MASK:5}  {text}")
+            address += 4
+
+        append("")
+        append("Symbol table")
+        for name, value in sorted(self.symbol_table.items(), key=lambda item: (item[1], item[0])):
+            append(f"  {value:08X}  {name}")
+        return '\n'.join(rows) + '\n'
+
+    def write(self, path: str):
+        with open(path, 'w') as f:
+            f.write(self.render())
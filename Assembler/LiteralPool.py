@@ -0,0 +1,144 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from Parser import Label, Instruction
+from Operands import Immediate, decode_operand
+
+MASK = 0xFFFFFFFF
+
+def rotate_right(value: int, amount: int) -> int:
+    return ((value >> amount) | (value << (32 - amount))) & MASK
+
+# Every operand-2 immediate ARM can encode: an 8-bit value rotated right by an even amount (3073 values)
+ENCODABLE_IMMEDIATES = frozenset(rotate_right(byte, rotation) for rotation in range(0, 32, 2) for byte in range(256))
+
+# CodeGenerator packs immediates into a 15-bit field
+IMMEDIATE_FIELD_LIMIT = 0x8000
+# Largest ldr offset from pc (the load's address + 8) to its literal
+LITERAL_RANGE = 4095
+# Labels the assembler places behind early pools; every module has its own, so they are never exported
+POOL_LABEL_PREFIX = '__literal_pool_'
+
+def is_encodable(value: int) -> bool:
+    """True if value (taken as 32 bits) is an ARM rotated 8-bit immediate."""
+    return value & MASK in ENCODABLE_IMMEDIATES
+
+def fits_inline(value: int) -> bool:
+    """True if a mov can carry value: ARM-encodable and within the immediate field."""
+    return value < IMMEDIATE_FIELD_LIMIT and value in ENCODABLE_IMMEDIATES
+
+def literal_value(instruction: Instruction) -> Optional[int]:
+    """The 32-bit constant instruction loads into a register, for `ldr rX, =value`, `mov rX, #value` and `mvn rX, #value`."""
+    operands = instruction.operands
+    if len(operands) != 2:
+        return None
+    mnemonic = instruction.mnemonic
+    if mnemonic == 'ldr' and operands[1].startswith('='):
+        operand = decode_operand('#' + operands[1][1:])
+    elif mnemonic in ('mov', 'mvn'):
+        operand = decode_operand(operands[1])
+    else:
+        return None
+    if not isinstance(operand, Immediate) or operand.value is None:
+        return None
+    return operand.value & MASK if mnemonic != 'mvn' else ~operand.value & MASK
+
+def needs_literal_pool(node: Union[Label, Instruction]) -> bool:
+    """True for nodes that place_literal_pools rewrites."""
+    if isinstance(node, Label):
+        return False
+    if node.mnemonic == '.ltorg':
+        return True
+    value = literal_value(node)
+    if value is None:
+        return False
+    return node.mnemonic == 'ldr' or not fits_inline(value if node.mnemonic == 'mov' else ~value & MASK)
+
+class LiteralPools:
+    """
+    Turns constants that no mov can hold into PC-relative loads from literal pools.
+
+    `ldr rX, =value` becomes `mov rX, #value` when the value fits, and
+    otherwise, like a mov or mvn whose immediate does not fit, an
+    `ldr rX, [pc, #offset]` of a `.word` in the next pool. A pool is
+    placed at each `.ltorg` and at the end of the program; each value is
+    stored once per pool however many loads use it. When the oldest
+    pending load would fall out of ldr range the pool is emitted early,
+    behind a branch over it.
+    """
+
+    def __init__(self, literal_range: int = LITERAL_RANGE):
+        self.literal_range = literal_range
+        self.nodes: List[Union[Label, Instruction]] = []
+        self.address = 0
+        self.pending: Dict[int, List[Tuple[Instruction, int]]] = {}    # value -> (load, its address), in first-use order
+        self.pending_loads: Set[int] = set()                            # ids of those loads
+        self.oldest_load = 0
+        self.pool_count = 0
+        self.literal_count = 0
+
+    def place(self, nodes: Iterable[Union[Label, Instruction]]) -> List[Union[Label, Instruction]]:
+        """Return the program with pools placed; nodes that need no rewriting are passed through unchanged."""
+        self.nodes = list(self.iter_place(nodes))
+        return self.nodes
+
+    def iter_place(self, nodes: Iterable[Union[Label, Instruction]]) -> Iterator[Union[Label, Instruction]]:
+        """Stream the program with pools placed.
+
+        A load is yielded with offset #0 and patched when its pool is emitted;
+        until then is_pending is true for it.
+        """
+        for node in nodes:
+            if isinstance(node, Instruction):
+                if node.mnemonic == '.ltorg':
+                    yield from self.flush()
+                    continue
+                if needs_literal_pool(node):
+                    node = self.rewrite(node)
+                yield node
+                self.address += 4
+                if self.pending and self.pool_end() + 8 - (self.oldest_load + 8) > self.literal_range:
+                    yield from self.flush(branch_over=True)
+            else:
+                yield node
+        yield from self.flush()
+
+    def rewrite(self, instruction: Instruction) -> Instruction:
+        value = literal_value(instruction)
+        if instruction.mnemonic == 'ldr' and fits_inline(value):
+            return Instruction('mov', instruction.condition, [instruction.operands[0], f'#{value}'])
+        load = Instruction('ldr', instruction.condition, [instruction.operands[0], '[', 'pc', '#0', ']'])
+        if not self.pending:
+            self.oldest_load = self.address
+        self.pending.setdefault(value, []).append((load, self.address))
+        self.pending_loads.add(id(load))
+        return load
+
+    def pool_end(self) -> int:
+        """Address of the last literal if the pending pool were emitted behind a branch right now."""
+        return self.address + 4 * len(self.pending)
+
+    def is_pending(self, node: Instruction) -> bool:
+        """True for a load whose pool has not been emitted yet, so its offset is still #0."""
+        return id(node) in self.pending_loads
+
+    def flush(self, branch_over: bool = False) -> Iterator[Union[Label, Instruction]]:
+        """Emit the pending pool, patching the offset of every load that uses it."""
+        if not self.pending:
+            return
+        skip = f"{POOL_LABEL_PREFIX}{self.pool_count}_end"
+        if branch_over:
+            yield Instruction('b', '', [skip])
+            self.address += 4
+        for value, loads in self.pending.items():
+            for load, address in loads:
+                load.set_operand(3, f'#{self.address - (address + 8)}')
+            yield Instruction('.word', '', [f'#{value:#x}'])
+            self.address += 4
+            self.literal_count += 1
+        if branch_over:
+            yield Label(skip)
+        self.pending.clear()
+        self.pending_loads.clear()
+        self.pool_count += 1
+
+def place_literal_pools(nodes: Iterable[Union[Label, Instruction]]) -> List[Union[Label, Instruction]]:
+    return LiteralPools().place(nodes)
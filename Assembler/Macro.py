@@ -0,0 +1,195 @@
+import re
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+from Tokenize import Tokenizer
+from Parser import Label, Instruction, Parser, ParseError
+
+MACRO_RE = re.compile(r'^\s*\.macro\s+([a-zA-Z_][a-zA-Z_0-9]*)\s*([^@]*?)\s*(?:@.*)?$')
+ENDM_RE = re.compile(r'^\s*\.endm\s*(?:@.*)?$')
+REPT_RE = re.compile(r'^\s*\.rept\s+(0x[0-9a-fA-F]+|\d+)\s*(?:@.*)?$')
+ENDR_RE = re.compile(r'^\s*\.endr\s*(?:@.*)?$')
+# Optional label, first word and the rest of a line (used to spot macro invocations)
+CALL_RE = re.compile(r'^\s*(?:([a-zA-Z_][a-zA-Z_0-9]*):)?\s*([a-zA-Z_][a-zA-Z_0-9]*)\s*([^@]*?)\s*(?:@.*)?$')
+
+class MacroError(ParseError):
+    pass
+
+class Macro:
+    __slots__ = ('name', 'params', 'body', 'numbered')
+
+    def __init__(self, name: str, params: List[str], body: List[Tuple[int, str]]):
+        self.name = name
+        self.params = params
+        self.body = body        # (line number, text) pairs between .macro and .endm
+        self.numbered = uses_expansion_number(body)
+
+    def substitute(self, args: Tuple[str, ...], number: int) -> List[Tuple[int, str]]:
+        """Replace every \\param in the body with its argument and \\@ with the expansion number."""
+        values = dict(zip(self.params, args + ('',) * (len(self.params) - len(args))))
+        body = self.body
+        if values:
+            pattern = re.compile(r'\\(' + '|'.join(sorted(map(re.escape, values), key=len, reverse=True)) + r')\b')
+            body = [(line_num, pattern.sub(lambda m: values[m.group(1)], text)) for line_num, text in body]
+        return number_expansion(body, number) if self.numbered else body
+
+class MacroExpander:
+    """
+    Expands `.macro`/`.endm` definitions and `.rept`/`.endr` blocks into a lazy node stream.
+
+    Sits between the tokenizer and the parser: ordinary lines are tokenized and
+    fed straight to Parser.iter_nodes, while directive lines are handled here.
+    Each (macro, argument tuple) and each .rept body is tokenized and parsed
+    once; every expansion, and each of the N passes of a `.rept N`, then
+    yields fresh copies of those nodes instead of materializing N token lists.
+
+    As in GAS, \\@ in a body stands for the number of the expansion, so a
+    label written `loop\\@:` gets its own name in every macro expansion and
+    every .rept pass. Such bodies (and those expanding one) differ each time
+    and are tokenized per expansion instead. A label without it would be
+    defined again by the next expansion, which is a MacroError.
+    """
+
+    def __init__(self):
+        self.macros: Dict[str, Macro] = {}
+        self.expansions: Dict[tuple, List[Union[Label, Instruction]]] = {}
+        self.expanding: List[str] = []      # macros currently being expanded, for recursion checks
+        self.count = 0                      # expansions so far; \@ becomes this number
+        self.numbered = False               # the expansion being built used \@, so it is not memoized
+        self.depth = 0                      # expansions being built around the current one
+        self.defined: Dict[str, Tuple[int, int]] = {}   # label -> (expansion, line) of the top-level expansion defining it
+
+    def parse(self, input_code: str) -> List[Union[Label, Instruction]]:
+        return list(self.iter_nodes(input_code.split('\n')))
+
+    def iter_nodes(self, lines: Iterable[str]) -> Iterator[Union[Label, Instruction]]:
+        return self.expand(enumerate((line[:-1] if line.endswith('\n') else line for line in lines), 1))
+
+    def expand(self, numbered: Iterable[Tuple[int, str]]) -> Iterator[Union[Label, Instruction]]:
+        numbered = iter(numbered)
+        while True:
+            stop = []
+            yield from Parser.iter_nodes(self.ordinary_tokens(numbered, stop))
+            if not stop:
+                return
+            line_num, line = stop[0]
+            yield from self.directive(line_num, line, numbered)
+
+    def ordinary_tokens(self, numbered: Iterator[Tuple[int, str]], stop: list):
+        """Tokens of every line up to (not including) the next directive line, which goes into stop."""
+        for line_num, line in numbered:
+            if self.is_directive_line(line):
+                stop.append((line_num, line))
+                return
+            yield from Tokenizer.tokenize_line(line, line_num)
+
+    def is_directive_line(self, line: str) -> bool:
+        if '.' in line and (MACRO_RE.match(line) or REPT_RE.match(line) or ENDM_RE.match(line) or ENDR_RE.match(line)):
+            return True
+        if self.macros:
+            call = CALL_RE.match(line)
+            return call is not None and call.group(2) in self.macros
+        return False
+
+    def directive(self, line_num: int, line: str, numbered: Iterator[Tuple[int, str]]):
+        definition = MACRO_RE.match(line)
+        if definition:
+            name, params = definition.groups()
+            body = self.collect_block(numbered, MACRO_RE, ENDM_RE, '.macro', line_num)
+            self.macros[name] = Macro(name, [p.strip().lstrip('\\') for p in params.replace(',', ' ').split()], body)
+            return
+
+        repeat = REPT_RE.match(line)
+        if repeat:
+            count = int(repeat.group(1), 0)
+            body = self.collect_block(numbered, REPT_RE, ENDR_RE, '.rept', line_num)
+            key = ('.rept', tuple(body))
+            uses_number = uses_expansion_number(body)
+            outermost = self.depth == 0
+            for _ in range(count):
+                self.count += 1
+                nodes = self.expansions.get(key)
+                if nodes is None:
+                    nodes = self.build(key, number_expansion(body, self.count) if uses_number else body, uses_number)
+                yield from self.emit(nodes, line_num, outermost)
+            return
+
+        if ENDM_RE.match(line) or ENDR_RE.match(line):
+            raise MacroError(f"Unexpected {line.strip().split()[0]} at line {line_num}")
+
+        label, name, rest = CALL_RE.match(line).groups()
+        if label:
+            yield Label(label)
+        outermost = self.depth == 0
+        nodes = self.invoke(name, tuple(arg.strip() for arg in rest.split(',')) if rest else (), line_num)
+        yield from self.emit(nodes, line_num, outermost)
+
+    def invoke(self, name: str, args: Tuple[str, ...], line_num: int) -> List[Union[Label, Instruction]]:
+        """Nodes for one macro invocation, memoized per (macro, argument tuple); callers must copy them."""
+        macro = self.macros[name]
+        if len(args) > len(macro.params):
+            raise MacroError(f"Macro '{name}' takes {len(macro.params)} arguments, got {len(args)} at line {line_num}")
+        self.count += 1
+        key = (name, args)
+        nodes = self.expansions.get(key)
+        if nodes is None:
+            if name in self.expanding:
+                raise MacroError(f"Recursive expansion of macro '{name}' at line {line_num}")
+            self.expanding.append(name)
+            try:
+                nodes = self.build(key, macro.substitute(args, self.count), macro.numbered)
+            finally:
+                self.expanding.pop()
+        return nodes
+
+    def build(self, key: tuple, body: List[Tuple[int, str]], numbered: bool) -> List[Union[Label, Instruction]]:
+        """Parse an expansion's lines; memoized under key unless it, or an expansion inside it, used \\@."""
+        outer, self.numbered = self.numbered, numbered
+        self.depth += 1
+        try:
+            nodes = list(self.expand(body))
+        finally:
+            self.depth -= 1
+        if not self.numbered:
+            self.expansions[key] = nodes
+        self.numbered = outer or self.numbered
+        return nodes
+
+    def emit(self, nodes: List[Union[Label, Instruction]], line_num: int, outermost: bool) -> Iterator[Union[Label, Instruction]]:
+        """Fresh copies of one expansion's nodes; at top level, checks its labels against earlier expansions'."""
+        expansion = self.count
+        for node in copies(nodes):
+            if outermost and isinstance(node, Label):
+                first = self.defined.setdefault(node.name, (expansion, line_num))
+                if first[0] != expansion:
+                    raise MacroError(f"Label '{node.name}' is defined by the expansion at line {first[1]} and again "
+                                     f"at line {line_num}; write it as {node.name}\\@ so each expansion gets its own")
+            yield node
+
+    @staticmethod
+    def collect_block(numbered: Iterator[Tuple[int, str]], open_re, close_re, directive: str, start_line: int):
+        """Body lines up to the matching close directive, allowing nested blocks of the same kind."""
+        body = []
+        depth = 1
+        for line_num, line in numbered:
+            if open_re.match(line):
+                depth += 1
+            elif close_re.match(line):
+                depth -= 1
+                if depth == 0:
+                    return body
+            body.append((line_num, line))
+        raise MacroError(f"Missing end of {directive} block started at line {start_line}")
+
+def uses_expansion_number(body: List[Tuple[int, str]]) -> bool:
+    return any('\\@' in text for _, text in body)
+
+def number_expansion(body: List[Tuple[int, str]], number: int) -> List[Tuple[int, str]]:
+    """The body with every \\@ replaced by the expansion number."""
+    return [(line_num, text.replace('\\@', str(number))) for line_num, text in body]
+
+def copies(nodes: List[Union[Label, Instruction]]) -> Iterator[Union[Label, Instruction]]:
+    """Fresh nodes for one expansion, so later passes can rewrite them without touching the memoized ones."""
+    return (node.copy() for node in nodes)
+
+def has_macros(input_code: str) -> bool:
+    return ('.macro' in input_code or '.rept' in input_code) and any(
+        MACRO_RE.match(line) or REPT_RE.match(line) for line in input_code.split('\n'))
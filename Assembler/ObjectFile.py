@@ -0,0 +1,233 @@
+import ast
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, List, Tuple, Union
+from Parser import Label, Instruction
+from LiteralPool import POOL_LABEL_PREFIX
+
+# Binary relocatable object layout, all fields little-endian:
+#   header      HEADER
+#   code        one 32-bit word per instruction
+#   symbols     SYMBOL entries
+#   relocations RELOCATION entries
+#   strings     NUL-terminated UTF-8 symbol names, referenced by byte offset
+MAGIC = b'CSDO'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIII')     # magic, version, flags, words, symbols, relocations, string table bytes
+SYMBOL = struct.Struct('<IIB3x')        # name offset, value, binding
+RELOCATION = struct.Struct('<IIB3x')    # word index, symbol index, type
+WORD = struct.Struct('<I')              # one code word
+
+# Symbol bindings
+LOCAL = 0       # defined here, visible to this object only
+GLOBAL = 1      # defined here and exported to the linker
+EXTERN = 2      # referenced here, defined by another object
+BINDING_NAMES = ('local', 'global', 'extern')
+
+# Relocation types
+RELOC_VALUE = 0     # value field (bits 0-14) holds the symbol's address
+
+VALUE_MASK = 0x7FFF
+
+DECLARATION_RE = re.compile(r'\s*\.(?:global|extern)\b')
+DECLARATION_DIRECTIVES = ('.global', '.extern')
+
+class ObjectFormatError(Exception):
+    pass
+
+class ObjectSymbol:
+    __slots__ = ('name', 'value', 'binding')
+
+    def __init__(self, name: str, value: int, binding: int):
+        self.name = name
+        self.value = value
+        self.binding = binding
+
+    def __repr__(self):
+        return f"ObjectSymbol({self.name}, {self.value}, {BINDING_NAMES[self.binding]})"
+
+class Relocation:
+    __slots__ = ('word', 'symbol', 'type')
+
+    def __init__(self, word: int, symbol: int, type: int = RELOC_VALUE):
+        self.word = word
+        self.symbol = symbol
+        self.type = type
+
+    def __repr__(self):
+        return f"Relocation({self.word}, {self.symbol}, {self.type})"
+
+class ObjectModule:
+    """
+    One assembled module: code words, symbols with their binding, and the
+    relocations the linker applies once base addresses are known.
+
+    Written either in the packed binary format (see the layout above), which
+    read_object maps into memory and unpacks without any text parsing, or in
+    the legacy text format of one binary string per word followed by
+    '#' + symbol table + '#' + word count.
+    """
+
+    def __init__(self, code: List[int] = None, symbols: List[ObjectSymbol] = None, relocations: List[Relocation] = None):
+        self.code = code if code is not None else []
+        self.symbols = symbols if symbols is not None else []
+        self.relocations = relocations if relocations is not None else []
+
+    @classmethod
+    def from_assembly(cls, machine_code: List[int], symbol_table: Dict[str, int], relocations: Iterable[Tuple[int, str]] = (),
+                      global_symbols: Iterable[str] = (), external_symbols: Iterable[str] = ()) -> 'ObjectModule':
+        """Build a module from generated code.
+
+        relocations are (word index, symbol name) pairs from CodeGenerator. Without
+        any .global or .extern declarations every label is exported, as the text
+        format always did; otherwise only the declared globals are. Labels the
+        assembler generated itself (literal pools) are always local.
+        """
+        global_symbols = set(global_symbols)
+        external_symbols = [name for name in dict.fromkeys(external_symbols) if name not in symbol_table]
+        export_all = not global_symbols and not external_symbols
+        symbols = [ObjectSymbol(name, value, GLOBAL if (export_all and not is_generated(name)) or name in global_symbols else LOCAL)
+                   for name, value in symbol_table.items()]
+        symbols.extend(ObjectSymbol(name, 0, EXTERN) for name in external_symbols)
+        index = {symbol.name: position for position, symbol in enumerate(symbols)}
+        return cls(list(machine_code), symbols, [Relocation(word, index[name]) for word, name in relocations])
+
+    @property
+    def symbol_table(self) -> Dict[str, int]:
+        """Defined symbols, as the assembler's symbol table."""
+        return {symbol.name: symbol.value for symbol in self.symbols if symbol.binding != EXTERN}
+
+    def to_bytes(self) -> bytes:
+        header, tables = self.pack(len(self.code))
+        code = array('I', self.code)
+        if sys.byteorder == 'big':
+            code.byteswap()
+        return b''.join((header, code.tobytes(), tables))
+
+    def pack(self, word_count: int) -> Tuple[bytes, bytes]:
+        """(header, symbol + relocation + string tables) of the binary format for word_count code words.
+
+        The code itself goes between the two; writers that stream the code use this directly.
+        """
+        strings = bytearray()
+        symbols = bytearray()
+        for symbol in self.symbols:
+            symbols += SYMBOL.pack(len(strings), symbol.value & 0xFFFFFFFF, symbol.binding)
+            strings += symbol.name.encode() + b'\0'
+        relocations = b''.join(RELOCATION.pack(relocation.word, relocation.symbol, relocation.type)
+                               for relocation in self.relocations)
+        header = HEADER.pack(MAGIC, VERSION, 0, word_count, len(self.symbols), len(self.relocations), len(strings))
+        return header, b''.join((symbols, relocations, strings))
+
+    def to_text(self) -> str:
+        code = ''.join(format(word, '032b') + '\n' for word in self.code)
+        return code + self.text_trailer(len(self.code))
+
+    def text_trailer(self, word_count: int) -> str:
+        """The symbol table and length sections that follow the code in the text format."""
+        return f"#{self.symbol_table}\n#{word_count}"
+
+    def write(self, path: str, object_format: str = 'binary'):
+        """Write the module as 'binary' or 'text'; path is replaced only once the whole file is written."""
+        if object_format == 'binary':
+            data, mode = self.to_bytes(), 'wb'
+        elif object_format == 'text':
+            data, mode = self.to_text(), 'w'
+        else:
+            raise ValueError(f"Unknown object format: {object_format}")
+        temporary = temporary_path(path)
+        try:
+            with open(temporary, mode) as f:
+                f.write(data)
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    @classmethod
+    def from_bytes(cls, data) -> 'ObjectModule':
+        """Unpack a binary object from bytes or any buffer, such as an mmap."""
+        if len(data) < HEADER.size:
+            raise ObjectFormatError("Truncated object header")
+        magic, version, _, word_count, symbol_count, relocation_count, string_size = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ObjectFormatError("Not a binary object file")
+        if version != VERSION:
+            raise ObjectFormatError(f"Unsupported object version {version}")
+        code_start = HEADER.size
+        symbol_start = code_start + 4 * word_count
+        relocation_start = symbol_start + SYMBOL.size * symbol_count
+        string_start = relocation_start + RELOCATION.size * relocation_count
+        if len(data) < string_start + string_size:
+            raise ObjectFormatError("Truncated object file")
+
+        code = array('I')
+        code.frombytes(data[code_start:symbol_start])
+        if sys.byteorder == 'big':
+            code.byteswap()
+        strings = bytes(data[string_start:string_start + string_size])
+        symbols = []
+        for name_offset, value, binding in SYMBOL.iter_unpack(data[symbol_start:relocation_start]):
+            name = strings[name_offset:strings.index(b'\0', name_offset)].decode()
+            symbols.append(ObjectSymbol(name, value, binding))
+        relocations = [Relocation(word, symbol, type)
+                       for word, symbol, type in RELOCATION.iter_unpack(data[relocation_start:string_start])]
+        return cls(code.tolist(), symbols, relocations)
+
+    @classmethod
+    def from_text(cls, text: str) -> 'ObjectModule':
+        """Parse the legacy text format; every symbol in it but generated labels is exported and nothing is relocated."""
+        content = text.strip().split('#')
+        if len(content) != 3:
+            raise ObjectFormatError("Text object needs code, symbol table and length sections")
+        code = [int(line, 2) for line in content[0].split()]
+        symbol_table = ast.literal_eval(content[1].strip())
+        if not isinstance(symbol_table, dict):
+            raise ObjectFormatError("Symbol table is not a valid dictionary")
+        return cls(code, [ObjectSymbol(name, value, LOCAL if is_generated(name) else GLOBAL)
+                          for name, value in symbol_table.items()])
+
+def is_generated(name: str) -> bool:
+    """True for labels the assembler created rather than the programmer."""
+    return name.startswith(POOL_LABEL_PREFIX)
+
+def temporary_path(path: str) -> str:
+    """Scratch file next to path, written first and renamed over it so path never holds a partial object."""
+    return f"{path}.{os.getpid()}.tmp"
+
+def read_object(path: str) -> ObjectModule:
+    """Read a binary (memory-mapped) or text object file."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            f.seek(0)
+            return ObjectModule.from_text(f.read().decode())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return ObjectModule.from_bytes(data)
+
+def has_symbol_declarations(input_code: str) -> bool:
+    return ('.global' in input_code or '.extern' in input_code) and any(
+        DECLARATION_RE.match(line) for line in input_code.split('\n'))
+
+def is_symbol_declaration(node: Union[Label, Instruction]) -> bool:
+    """True for a .global or .extern with symbols; one without any is left for the semantic analyzer to report."""
+    return isinstance(node, Instruction) and node.mnemonic in DECLARATION_DIRECTIVES and bool(node.operands)
+
+def take_symbol_declarations(nodes: Iterable[Union[Label, Instruction]]):
+    """Remove .global and .extern from the program; they declare bindings and occupy no address.
+
+    Declarations without symbols are left for the semantic analyzer to report.
+    Returns (nodes, global symbols, external symbols).
+    """
+    output = []
+    global_symbols = []
+    external_symbols = []
+    for node in nodes:
+        if is_symbol_declaration(node):
+            (global_symbols if node.mnemonic == '.global' else external_symbols).extend(node.operands)
+            continue
+        output.append(node)
+    return output, global_symbols, external_symbols
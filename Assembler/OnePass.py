@@ -0,0 +1,227 @@
+import os
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Tuple, Union
+from Parser import Label, Instruction
+from Operands import LabelRef
+from Semantic_Analyzer.Semantic_Analyzer import SemanticAnalyzer
+from Code_generator import CodeGenerator
+from Dataflow import UNKNOWN_STATE, transfer
+from CFG import ends_block
+from Diagnostics import Diagnostic, has_errors
+from LiteralPool import LiteralPools
+from ObjectFile import HEADER, WORD, ObjectModule, is_symbol_declaration, temporary_path
+
+WORD_WIDTH = 32
+LINE_WIDTH = WORD_WIDTH + 1     # binary word plus newline in the text object format
+
+class ObjectStream:
+    """
+    Writes code words to a seekable binary file as they are encoded, in
+    either object format, and patches them in place later.
+
+    Every word has a fixed size (a 33-byte line of text, or 4 bytes after
+    the binary header), so word i lives at a known offset. The binary
+    header is written as a placeholder and filled in by finish, once the
+    word count and the tables behind the code are known.
+    """
+
+    def __init__(self, obj: BinaryIO, object_format: str = 'binary'):
+        if object_format not in ('binary', 'text'):
+            raise ValueError(f"Unknown object format: {object_format}")
+        self.obj = obj
+        self.binary = object_format == 'binary'
+        self.start = HEADER.size if self.binary else 0
+        self.width = WORD.size if self.binary else LINE_WIDTH
+        if self.binary:
+            obj.write(bytes(HEADER.size))
+
+    def encode(self, word: int) -> bytes:
+        if self.binary:
+            return WORD.pack(word)
+        return (CodeGenerator.format_binary(word, WORD_WIDTH) + '\n').encode()
+
+    def write(self, word: int):
+        self.obj.write(self.encode(word))
+
+    def patch(self, index: int, word: int):
+        self.obj.seek(self.start + index * self.width)
+        self.obj.write(self.encode(word))
+
+    def finish(self, module: ObjectModule, word_count: int):
+        """Append the symbol table (and relocations) of module behind word_count streamed words."""
+        self.obj.seek(0, 2)
+        if self.binary:
+            header, tables = module.pack(word_count)
+            self.obj.write(tables)
+            self.obj.seek(0)
+            self.obj.write(header)
+        else:
+            self.obj.write(module.text_trailer(word_count).encode())
+
+class OnePassAssembler:
+    """
+    Single-pass assembler: every instruction is validated and encoded as soon
+    as it is parsed and its word is streamed straight to the object file.
+
+    Branches to labels that are not defined yet, and literal-pool loads whose
+    pool has not been emitted yet, are written as a placeholder word and
+    recorded in a fixup list; once the whole input has been read the fixups
+    are encoded against the complete symbol table and backpatched in place
+    (see ObjectStream). Label-reference diagnostics for those branches are
+    deferred the same way and merged back in source order, so the object file
+    and the error list match the multi-pass pipeline. `.global` and
+    `.extern` are taken out of the stream as they pass, and `ldr rX, =value`
+    goes through the same LiteralPools as the multi-pass pipeline. Memory
+    grows with the number of labels, forward references and pending
+    literals, not with program size.
+
+    The node stream can come from any source; assemble_asm_to_object feeds
+    it through splice_includes and MacroExpander.iter_nodes, so `.include`,
+    `.macro` and `.rept` work as in the multi-pass pipeline. An included
+    file is read whole while it is spliced in.
+
+    Register constants for the memory-access checks are propagated only
+    within straight-line code (reset at every label and branch), so this
+    mode can report fewer memory warnings than the whole-program dataflow.
+    """
+
+    def __init__(self):
+        self.symbol_table: Dict[str, int] = {}
+        self.analyzer = SemanticAnalyzer([])
+        self.analyzer.symbol_table = self.symbol_table
+        self.code_gen = CodeGenerator([], self.symbol_table)
+        self.pools = LiteralPools()
+        self.global_symbols: List[str] = []
+        self.external_symbols: List[str] = []
+        self.relocations: List[Tuple[int, str]] = []                # (word index, symbol)
+        self.fixups: List[Tuple[int, Instruction]] = []             # (word index, branch or literal load)
+        self.deferred_checks: List[Tuple[int, int, Instruction]] = []   # (position in errors, address, branch)
+        self.label_errors: List[Diagnostic] = []
+        self.count = 0
+
+    def assemble(self, nodes: Iterable[Union[Label, Instruction]], obj: BinaryIO,
+                 object_format: str = 'binary', werror: bool = False) -> Tuple[List[Diagnostic], Dict[str, int], int]:
+        """Assemble a node stream into obj, which must be opened in binary mode for writing and seeking.
+
+        Returns (errors, symbol_table, instruction count). With werror, once
+        any error is reported obj is left incomplete and must be discarded.
+        """
+        stream = ObjectStream(obj, object_format)
+        analyzer = self.analyzer
+        pools = self.pools
+        state = UNKNOWN_STATE
+        # With werror the object is discarded after an error, so nothing more is encoded; checking goes on
+        failed = False
+        checked = 0
+        for node in pools.iter_place(self.take_declarations(nodes)):
+            if isinstance(node, Label):
+                state = UNKNOWN_STATE
+                if node.name in self.symbol_table:
+                    self.label_errors.append(Diagnostic('duplicate-label', self.count, (node.name,)))
+                    failed = werror
+                else:
+                    self.symbol_table[node.name] = self.count * 4
+                continue
+
+            target = node.decoded[0] if node.operands else None
+            forward = isinstance(target, LabelRef) and target.name not in self.symbol_table
+
+            analyzer.instruction_index = self.count
+            analyzer.instruction_address = self.count * 4
+            if node.mnemonic.startswith('.'):
+                # Directives (and literal-pool words) are only checked as directives, as in validate_instruction
+                analyzer.process_directive(node)
+            else:
+                analyzer.validate_mnemonic(node)
+                analyzer.validate_operands(node)
+                analyzer.register_state = state
+                analyzer.validate_memory_access(node)
+                state = UNKNOWN_STATE if ends_block(node.mnemonic, node.decoded) else transfer(state, node.mnemonic, node.decoded)
+                if forward and node.mnemonic in analyzer.LABEL_BRANCH_INSTRUCTIONS:
+                    self.deferred_checks.append((len(analyzer.errors), analyzer.instruction_address, node))
+                else:
+                    analyzer.validate_label_references(node)
+                analyzer.validate_type_mismatch(node)
+            failed = failed or werror and has_errors(analyzer.errors[checked:])
+            checked = len(analyzer.errors)
+
+            if failed:
+                word = 0
+            elif (forward and node.mnemonic.upper() in CodeGenerator.BRANCH_MNEMONICS) or pools.is_pending(node):
+                self.fixups.append((self.count, node))
+                word = 0
+            else:
+                word = self.encode(self.count, node)
+            stream.write(word)
+            self.count += 1
+
+        errors = self.resolve_deferred_checks()
+        if werror and has_errors(errors):
+            return errors, self.symbol_table, self.count
+        self.backpatch(stream)
+        self.relocations.sort()
+        module = ObjectModule.from_assembly((), self.symbol_table, self.relocations, self.global_symbols,
+                                            self.external_symbols)
+        stream.finish(module, self.count)
+        return errors, self.symbol_table, self.count
+
+    def take_declarations(self, nodes: Iterable[Union[Label, Instruction]]) -> Iterator[Union[Label, Instruction]]:
+        """Pass nodes through, recording .global and .extern declarations instead (see take_symbol_declarations)."""
+        for node in nodes:
+            if is_symbol_declaration(node):
+                if node.mnemonic == '.global':
+                    self.global_symbols.extend(node.operands)
+                    self.analyzer.global_symbols.update(node.operands)
+                else:
+                    self.external_symbols.extend(node.operands)
+                    self.analyzer.external_symbols.update(node.operands)
+                    self.code_gen.external_symbols.update(node.operands)
+                continue
+            yield node
+
+    def encode(self, index: int, node: Instruction) -> int:
+        """Encode node as word index, recording its relocation under that index."""
+        relocations = self.code_gen.relocations
+        word = self.code_gen.encode_instruction(node)
+        self.relocations.extend((index, symbol) for _, symbol in relocations)
+        relocations.clear()
+        return word
+
+    def resolve_deferred_checks(self) -> List[Diagnostic]:
+        """Run the postponed label checks and splice their errors back in source order."""
+        analyzer = self.analyzer
+        errors = list(self.label_errors)
+        previous = 0
+        for position, address, node in self.deferred_checks:
+            errors.extend(analyzer.errors[previous:position])
+            saved = analyzer.errors
+            analyzer.errors = errors
+            analyzer.instruction_index = address // 4
+            analyzer.instruction_address = address
+            analyzer.validate_label_references(node)
+            analyzer.errors = saved
+            previous = position
+        errors.extend(analyzer.errors[previous:])
+        return errors
+
+    def backpatch(self, stream: ObjectStream):
+        for index, node in self.fixups:
+            stream.patch(index, self.encode(index, node))
+
+def assemble_one_pass(nodes: Iterable[Union[Label, Instruction]], obj_file: str, object_format: str = 'binary',
+                      werror: bool = False):
+    """Assemble a node stream straight into obj_file. Returns (errors, symbol_table, count).
+
+    Words are streamed to a scratch file that replaces obj_file once the
+    stream is done, so an interrupted run never leaves a partial object.
+    With werror, a run that reported an error leaves obj_file untouched.
+    """
+    temporary = temporary_path(obj_file)
+    try:
+        with open(temporary, 'w+b') as obj:
+            errors, symbol_table, count = OnePassAssembler().assemble(nodes, obj, object_format, werror)
+        if not (werror and has_errors(errors)):
+            os.replace(temporary, obj_file)
+        return errors, symbol_table, count
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
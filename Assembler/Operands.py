@@ -0,0 +1,105 @@
+from functools import lru_cache
+from typing import List, Optional, Tuple, Union
+
+REGISTER_NUMBERS = {f'r{i}': i for i in range(16)}
+REGISTER_NUMBERS.update({'sp': 13, 'lr': 14, 'pc': 15})
+
+class Register:
+    __slots__ = ('num', 'name')
+
+    def __init__(self, num: int, name: str):
+        self.num = num
+        self.name = name
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f"Register({self.name})"
+
+class Immediate:
+    __slots__ = ('value', 'text')
+
+    def __init__(self, value: Optional[int], text: str):
+        self.value = value      # None if the literal cannot be parsed with int(..., 0)
+        self.text = text
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f"Immediate({self.text})"
+
+class LabelRef:
+    """A symbol operand: anything that is not a register, an immediate or an address."""
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f"LabelRef({self.name})"
+
+class MemOperand:
+    """A bracketed address: [base], [base, offset] or [base, offset]! (writeback)."""
+    __slots__ = ('operands', 'base', 'offset', 'closed', 'writeback', 'text')
+
+    def __init__(self, operands: tuple, closed: bool, writeback: bool, text: str):
+        self.operands = operands    # everything inside [], decoded
+        self.base = operands[0] if operands else None               # Register, or whatever the first operand decoded to
+        self.offset = operands[1] if len(operands) > 1 else None    # Immediate, Register or None
+        self.closed = closed        # False if the ']' is missing
+        self.writeback = writeback
+        self.text = text
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f"MemOperand({self.text})"
+
+Operand = Union[Register, Immediate, LabelRef, MemOperand]
+
+# Decoded operands are shared between instructions with the same operand text. The
+# cache is bounded so a long-running process assembling many programs stays flat.
+DECODE_CACHE_SIZE = 1 << 16
+
+@lru_cache(maxsize=DECODE_CACHE_SIZE)
+def decode_operand(text: str) -> Union[Register, Immediate, LabelRef]:
+    """Decode one operand token ('r3', 'sp', '#0x10', 'loop') into a typed operand."""
+    if text in REGISTER_NUMBERS:
+        return Register(REGISTER_NUMBERS[text], text)
+    if text[:1] == 'r' and text[1:].isascii() and text[1:].isdigit() and int(text[1:]) < 16:
+        return Register(int(text[1:]), text)    # 'r01': not a canonical name (see REGISTER_NUMBERS), same register
+    if text.startswith('#'):
+        try:
+            value = int(text[1:], 0)    # 0 as base allows for hex and binary literals
+        except ValueError:
+            value = None
+        return Immediate(value, text)
+    return LabelRef(text)
+
+def decode_operands(operands: List[str]) -> Tuple[Operand, ...]:
+    """Decode an instruction's operand tokens, folding '[' ... ']' ['!'] into one MemOperand."""
+    decoded = []
+    i = 0
+    count = len(operands)
+    while i < count:
+        op = operands[i]
+        if op == '[':
+            end = i + 1
+            while end < count and operands[end] != ']':
+                end += 1
+            inner = tuple(decode_operand(o) for o in operands[i + 1:end])
+            closed = end < count
+            writeback = closed and end + 1 < count and operands[end + 1] == '!'
+            text = '[' + ', '.join(operands[i + 1:end]) + (']' if closed else '') + ('!' if writeback else '')
+            decoded.append(MemOperand(inner, closed, writeback, text))
+            i = end + (2 if writeback else 1)
+        else:
+            decoded.append(decode_operand(op))
+            i += 1
+    return tuple(decoded)
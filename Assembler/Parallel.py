@@ -0,0 +1,180 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+from Tokenize import Tokenizer
+from Parser import Label, Instruction, Parser
+from FastParser import FastParser
+from Semantic_Analyzer.Semantic_Analyzer import SemanticAnalyzer
+from Code_generator import CodeGenerator
+from CFG import ControlFlowGraph
+from Dataflow import ConstantPropagation
+from Diagnostics import Diagnostic
+from LiteralPool import needs_literal_pool, place_literal_pools
+
+# A line that starts with a label definition; chunks only ever start at one,
+# so no instruction's operands can run across a chunk boundary.
+LABEL_LINE_RE = re.compile(r'\s*[a-zA-Z_][a-zA-Z_0-9]*:')
+
+class ChunkError(Exception):
+    pass
+
+def split_chunks(lines: List[str], chunk_count: int) -> List[Tuple[int, List[str]]]:
+    """Split lines into about chunk_count pieces at label boundaries.
+
+    Returns (first line number, lines) pairs in source order.
+    """
+    target = max(1, len(lines) // max(1, chunk_count))
+    chunks = []
+    start = 0
+    index = target
+    while index < len(lines):
+        if LABEL_LINE_RE.match(lines[index]):
+            chunks.append((start + 1, lines[start:index]))
+            start = index
+            index += target
+        else:
+            index += 1
+    chunks.append((start + 1, lines[start:]))
+    return chunks
+
+def scan_chunk(chunk: Tuple[int, List[str]]):
+    """Phase 1: labels (name, instruction index) and instruction rows (mnemonic, condition, operands) of one chunk.
+
+    Returns None for chunks the serial pipeline has to handle: ones that fail
+    to parse, ones with literal-pool loads, which shift the addresses of
+    everything after them, and ones with directives, which carry state from
+    one instruction to the next.
+    """
+    first_line, lines = chunk
+    labels = []
+    rows = []
+    try:
+        for node in FastParser().iter_nodes(lines):
+            if isinstance(node, Label):
+                labels.append((node.name, len(rows)))
+            elif needs_literal_pool(node) or node.mnemonic.startswith('.'):
+                return None
+            else:
+                rows.append((node.mnemonic, node.condition, node.operands))
+    except Exception:
+        return None
+    return labels, rows
+
+# Whole-program state, installed once per worker process (inherited, not pickled, under fork)
+_rows: List[Tuple[str, str, List[str]]] = []
+_symbol_table: Dict[str, int] = {}
+_cfg: ControlFlowGraph = None
+_dataflow: ConstantPropagation = None
+
+def _set_shared_state(rows: List[Tuple[str, str, List[str]]], symbol_table: Dict[str, int], cfg: ControlFlowGraph,
+                      dataflow: ConstantPropagation):
+    global _rows, _symbol_table, _cfg, _dataflow
+    _rows = rows
+    _symbol_table = symbol_table
+    _cfg = cfg
+    _dataflow = dataflow
+
+def assemble_chunk(bounds: Tuple[int, int]):
+    """Phase 2: validate and encode rows[start:end] of the whole program.
+
+    Addresses and register constants come from the whole-program control-flow
+    graph and constant propagation, so the diagnostics are exactly those the
+    serial run reports for these instructions (see validate_chunk).
+    Returns (errors, machine code, relocations, code generation error message or None);
+    relocations point at chunk-local word indices.
+    """
+    start, end = bounds
+    nodes = [Instruction(mnemonic, condition, operands) for mnemonic, condition, operands in _rows[start:end]]
+    analyzer = SemanticAnalyzer([])
+    analyzer.symbol_table = _symbol_table
+    states = _dataflow.states(start, end) if _dataflow is not None else None
+    for index, node in enumerate(nodes, start):
+        analyzer.instruction_index = index
+        analyzer.instruction_address = _cfg.addresses[index]
+        if states is not None:
+            analyzer.register_state = next(states)
+        analyzer.validate_instruction(node)
+
+    code_gen = CodeGenerator(nodes, _symbol_table)
+    try:
+        machine_code = code_gen.generate_machine_code()
+        failure = None
+    except Exception as e:
+        machine_code = code_gen.machine_code
+        failure = str(e)
+    return analyzer.errors, machine_code, code_gen.relocations, failure
+
+def merge_symbol_tables(scans) -> Tuple[Dict[str, int], List[Diagnostic]]:
+    """Offset each chunk's labels by the instructions before it, in source order."""
+    symbol_table = {}
+    errors = []
+    base = 0
+    for labels, rows in scans:
+        for name, index in labels:
+            if name in symbol_table:
+                errors.append(Diagnostic('duplicate-label', base + index, (name,)))
+            else:
+                symbol_table[name] = (base + index) * 4
+        base += len(rows)
+    return symbol_table, errors
+
+def assemble_parallel(input_code: str, workers: int = 4, chunks_per_worker: int = 4):
+    """
+    Assemble one large source on `workers` processes.
+
+    The source is split at label boundaries; a first parallel pass parses
+    each chunk into its labels and instruction rows, the per-chunk tables are
+    merged with address offsets, and the control-flow graph and constant
+    propagation are solved once over the whole program. A second pass
+    validates and encodes every chunk against that shared state, so
+    cross-chunk branches resolve directly and the memory-access checks see
+    the same register constants as the serial run.
+    Returns (errors, symbol_table, machine_code, relocations) identical to the
+    serial pipeline, and raises ChunkError with the message of the exception the
+    serial pipeline would raise first. Sources that fail to tokenize or parse,
+    or that need literal pools or contain directives, are handed to the serial
+    pipeline (see scan_chunk).
+    """
+    lines = input_code.split('\n')
+    chunks = split_chunks(lines, workers * chunks_per_worker)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        scans = list(pool.map(scan_chunk, chunks))
+    if any(scan is None for scan in scans):
+        return assemble_serial(input_code)
+
+    symbol_table, errors = merge_symbol_tables(scans)
+
+    rows = []
+    bounds = []
+    for _, chunk_rows in scans:
+        bounds.append((len(rows), len(rows) + len(chunk_rows)))
+        rows.extend(chunk_rows)
+    analyzer = SemanticAnalyzer([])
+    analyzer.symbol_table = symbol_table
+    cfg = ControlFlowGraph([row[0] for row in rows], [row[2] for row in rows], symbol_table)
+    dataflow = analyzer.constant_propagation(cfg)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_set_shared_state,
+                             initargs=(rows, symbol_table, cfg, dataflow)) as pool:
+        results = list(pool.map(assemble_chunk, bounds))
+
+    machine_code = []
+    relocations = []
+    failure = None
+    for (start, _), (chunk_errors, chunk_code, chunk_relocations, chunk_failure) in zip(bounds, results):
+        errors.extend(chunk_errors)
+        if failure is None:
+            machine_code.extend(chunk_code)
+            relocations.extend((word + start, symbol) for word, symbol in chunk_relocations)
+            failure = chunk_failure
+    if failure is not None:
+        raise ChunkError(failure)
+    return errors, symbol_table, machine_code, relocations
+
+def assemble_serial(input_code: str):
+    """Reference single-process pipeline with the same return value as assemble_parallel."""
+    ast = place_literal_pools(Parser(Tokenizer(input_code).tokenize()).parse())
+    errors, symbol_table = SemanticAnalyzer(ast).analyze()
+    code_gen = CodeGenerator(ast, symbol_table)
+    machine_code = code_gen.generate_machine_code()
+    return errors, symbol_table, machine_code, code_gen.relocations
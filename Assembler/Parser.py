@@ -1,42 +1,251 @@
-from typing import List, Union
+from array import array
+from typing import Iterable, Iterator, List, Tuple, Union
 #from Tokenize import tokenize
+from Tokenize import TokenStream
+from Operands import Operand, decode_operands
 
 class ParseError(Exception):
     pass
 
 class Label:
+    __slots__ = ('name',)
+
     def __init__(self, name: str):
         self.name = name
+
+    def copy(self) -> 'Label':
+        return Label(self.name)
     
     def __repr__(self):
         return f"Label({self.name})"
 
 class Instruction:
+    __slots__ = ('mnemonic', 'condition', 'operands', '_decoded')
+
     def __init__(self, mnemonic: str, condition: str, operands: List[str]):
         self.mnemonic = mnemonic
         self.condition = condition
         self.operands = operands
+        self._decoded = None
+
+    @property
+    def decoded(self) -> Tuple[Operand, ...]:
+        """Typed operands (Register, Immediate, LabelRef, MemOperand), decoded on first use after a change."""
+        if self._decoded is None:
+            self._decoded = decode_operands(self.operands)
+        return self._decoded
+
+    def set_operand(self, index: int, text: str):
+        """Replace one operand token; later stages rewrite operands through this so decoded stays in step."""
+        self.operands[index] = text
+        self._decoded = None
+
+    def copy(self) -> 'Instruction':
+        """A node of its own with the same contents; the operand list is copied, the decoded operands shared."""
+        instruction = Instruction(self.mnemonic, self.condition, list(self.operands))
+        instruction._decoded = self._decoded
+        return instruction
     
     def __repr__(self):
         return f"Instruction({self.mnemonic}{self.condition or ''}, {self.operands})"
 
+class InstructionCursor(Instruction):
+    """A single reusable Instruction that InstructionTable re-points at each row."""
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__('', '', [])
+
+class InstructionTable:
+    """
+    Columnar AST: one row per instruction instead of one object per node.
+
+    mnemonics        array('B') of ids into mnemonic_names ((mnemonic, condition) pairs)
+    operand_offsets  array('I'); row i's operands are operand_pool[offsets[i]:offsets[i + 1]]
+    operand_pool     array('I') of ids into operand_names (interned operand strings)
+    label_positions  array('I'); label_names[k] is defined just before instruction row label_positions[k]
+    """
+
+    def __init__(self):
+        self.mnemonics = array('B')
+        self.mnemonic_names = []
+        self.mnemonic_ids = {}
+        self.operand_offsets = array('I', [0])
+        self.operand_pool = array('I')
+        self.operand_names = []
+        self.operand_ids = {}
+        self.label_names = []
+        self.label_positions = array('I')
+
+    @classmethod
+    def from_nodes(cls, nodes: Iterable[Union[Label, Instruction]]) -> 'InstructionTable':
+        """Build a table from any node iterable, e.g. Parser.iter_nodes(...)."""
+        table = cls()
+        for node in nodes:
+            if isinstance(node, Label):
+                table.add_label(node.name)
+            else:
+                table.add_instruction(node.mnemonic, node.condition, node.operands)
+        return table
+
+    def add_label(self, name: str):
+        self.label_names.append(name)
+        self.label_positions.append(len(self.mnemonics))
+
+    def add_instruction(self, mnemonic: str, condition: str, operands: List[str]):
+        key = (mnemonic, condition)
+        mnemonic_id = self.mnemonic_ids.get(key)
+        if mnemonic_id is None:
+            mnemonic_id = self.mnemonic_ids[key] = len(self.mnemonic_names)
+            self.mnemonic_names.append(key)
+        self.mnemonics.append(mnemonic_id)
+        for operand in operands:
+            operand_id = self.operand_ids.get(operand)
+            if operand_id is None:
+                operand_id = self.operand_ids[operand] = len(self.operand_names)
+                self.operand_names.append(operand)
+            self.operand_pool.append(operand_id)
+        self.operand_offsets.append(len(self.operand_pool))
+
+    def __len__(self):
+        return len(self.mnemonics)
+
+    def mnemonic(self, row: int) -> str:
+        return self.mnemonic_names[self.mnemonics[row]][0]
+
+    def operands(self, row: int) -> List[str]:
+        names = self.operand_names
+        return [names[i] for i in self.operand_pool[self.operand_offsets[row]:self.operand_offsets[row + 1]]]
+
+    def labels(self) -> Iterator[tuple]:
+        """Yield (name, instruction row) for every label in definition order."""
+        return zip(self.label_names, self.label_positions)
+
+    def instructions(self) -> Iterator[Instruction]:
+        """Yield every instruction row through one reused InstructionCursor.
+
+        The cursor is overwritten on each step, so callers must not keep it.
+        """
+        cursor = InstructionCursor()
+        for row in range(len(self.mnemonics)):
+            cursor.mnemonic, cursor.condition = self.mnemonic_names[self.mnemonics[row]]
+            cursor.operands = self.operands(row)
+            cursor._decoded = None
+            yield cursor
+
+    def __iter__(self) -> Iterator[Union[Label, Instruction]]:
+        """Yield the program in source order: Labels, then the cursor for each instruction."""
+        labels = iter(self.labels())
+        pending = next(labels, None)
+        for row, cursor in enumerate(self.instructions()):
+            while pending is not None and pending[1] == row:
+                yield Label(pending[0])
+                pending = next(labels, None)
+            yield cursor
+        while pending is not None:
+            yield Label(pending[0])
+            pending = next(labels, None)
+
 class Parser:
-    def __init__(self, tokens: List[tuple]):
+    OPERAND_TOKENS = frozenset({'REGISTER', 'IMMEDIATE', 'LITERAL', 'LABEL', 'BRACKET_OPEN', 'BRACKET_CLOSE', 'EXCLAMATION'})
+    # Directives parse like instructions; the mnemonic keeps its leading '.' and the names that follow
+    # it (.global main) are its operands. Code that walks instructions tells them apart by that '.'.
+    MNEMONIC_TOKENS = frozenset({'INSTRUCTION', 'DIRECTIVE'})
+
+    def __init__(self, tokens: Union[List[tuple], TokenStream]):
         self.tokens = tokens
         self.pos = 0
 
     def parse(self) -> List[Union[Label, Instruction]]:
+        if isinstance(self.tokens, TokenStream):
+            return self.parse_token_stream()
         nodes = []
         while self.pos < len(self.tokens):
             token_type, token_value, line_num = self.tokens[self.pos]
             if token_type == 'LABEL_DEF':
                 nodes.append(self.parse_label())
-            elif token_type == 'INSTRUCTION':
+            elif token_type in self.MNEMONIC_TOKENS:
                 nodes.append(self.parse_instruction())
             else:
                 raise ParseError(f"Unexpected token {token_type} at line {line_num}")
         return nodes
 
+    def parse_token_stream(self) -> List[Union[Label, Instruction]]:
+        """Parse a TokenStream by index, comparing type ids instead of building token tuples."""
+        stream = self.tokens
+        types, values, strings = stream.types, stream.values, stream.strings
+        ids = TokenStream.TYPE_IDS
+        label_def, colon, comma = ids['LABEL_DEF'], ids['COLON'], ids['COMMA']
+        mnemonic_ids = frozenset(ids[name] for name in self.MNEMONIC_TOKENS)
+        operand_ids = frozenset(ids[name] for name in self.OPERAND_TOKENS)
+
+        nodes = []
+        pos = self.pos
+        end = len(types)
+        while pos < end:
+            type_id = types[pos]
+            if type_id == label_def:
+                nodes.append(Label(strings[values[pos]]))
+                pos += 1
+                if pos < end and types[pos] == colon:
+                    pos += 1
+            elif type_id in mnemonic_ids:
+                mnemonic = strings[values[pos]]
+                pos += 1
+                operands = []
+                while pos < end:
+                    type_id = types[pos]
+                    if type_id == comma:
+                        pos += 1
+                    elif type_id in operand_ids:
+                        operands.append(strings[values[pos]])
+                        pos += 1
+                    else:
+                        break
+                nodes.append(Instruction(mnemonic, '', operands))
+            else:
+                self.pos = pos
+                raise ParseError(f"Unexpected token {stream.type_name(pos)} at line {stream.lines[pos]}")
+        self.pos = pos
+        return nodes
+
+    @classmethod
+    def iter_nodes(cls, token_iter: Iterable[tuple]) -> Iterator[Union[Label, Instruction]]:
+        """Lazily parse a token iterator, yielding each node as soon as it is complete.
+
+        Uses a single token of lookahead, so it never holds more than the
+        current instruction's operands in memory.
+        """
+        tokens = iter(token_iter)
+        token = next(tokens, None)
+        while token is not None:
+            token_type, token_value, line_num = token
+            if token_type == 'LABEL_DEF':
+                token = next(tokens, None)
+                if token is not None and token[0] == 'COLON':
+                    token = next(tokens, None)
+                yield Label(token_value)
+            elif token_type in cls.MNEMONIC_TOKENS:
+                operands = []
+                token = next(tokens, None)
+                while token is not None:
+                    if token[0] == 'COMMA':
+                        pass
+                    elif token[0] in cls.OPERAND_TOKENS:
+                        operands.append(token[1])
+                    else:
+                        break
+                    token = next(tokens, None)
+                yield Instruction(token_value, '', operands)
+            else:
+                raise ParseError(f"Unexpected token {token_type} at line {line_num}")
+
+    def parse_table(self) -> InstructionTable:
+        """Parse the tokens straight into a columnar InstructionTable."""
+        table = InstructionTable.from_nodes(self.iter_nodes(self.tokens))
+        self.pos = len(self.tokens)
+        return table
+
     def parse_label(self) -> Label:
         _, label_name, _ = self.tokens[self.pos]
         self.pos += 1
@@ -61,7 +270,7 @@ class Parser:
             if token_type == 'COMMA':
                 self.pos += 1
                 continue
-            if token_type in ['REGISTER', 'IMMEDIATE', 'LABEL', 'BRACKET_OPEN', 'BRACKET_CLOSE', 'EXCLAMATION']:
+            if token_type in self.OPERAND_TOKENS:
                 operands.append(token_value)
                 self.pos += 1
             else:
@@ -0,0 +1,186 @@
+from typing import Dict, List, Tuple, Union
+from Parser import Label, Instruction
+from Operands import Register, Immediate, MemOperand, decode_operand
+from CFG import BRANCH_MNEMONICS, UNCONDITIONAL_BRANCHES, CALL_MNEMONICS, REGISTER_BRANCHES
+from Dataflow import LOAD_MNEMONICS
+from Semantic_Analyzer.Semantic_Analyzer import SemanticAnalyzer
+
+# Branches to a label that do nothing but change the pc
+JUMP_MNEMONICS = BRANCH_MNEMONICS - CALL_MNEMONICS - REGISTER_BRANCHES
+
+class PeepholeOptimizer:
+    """
+    Optional clean-up of a validated program before code generation.
+
+    A single pass slides a window over the tail of the output:
+    - jump threading: a branch to a label whose first instruction is an
+      unconditional `b` goes straight to that branch's final target;
+    - fallthrough deletion: a branch to a label that directly follows it
+      is dropped, re-checked as earlier branches come into the window;
+    - redundant moves: `mov rX, rX` is dropped.
+    Label addresses are then assigned again, and `ldr rX, [pc, #offset]`
+    loads (literal pools) are re-aimed at the entries they loaded before.
+    """
+
+    def __init__(self, nodes: List[Union[Label, Instruction]]):
+        self.nodes = nodes
+        self.threaded = 0
+        self.fallthroughs = 0
+        self.redundant_moves = 0
+
+    @property
+    def instructions_saved(self) -> int:
+        return self.fallthroughs + self.redundant_moves
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.instructions_saved * 4
+
+    def summary(self) -> str:
+        return (f"Peephole: saved {self.instructions_saved} instructions ({self.bytes_saved} bytes); "
+                f"{self.fallthroughs} fallthrough branches, {self.redundant_moves} redundant moves removed, "
+                f"{self.threaded} branches threaded")
+
+    def optimize(self) -> Tuple[List[Union[Label, Instruction]], Dict[str, int]]:
+        """Return the optimized nodes and their symbol table."""
+        nodes, pc_loads = self.copy_pc_relative_loads(self.nodes)
+        pinned = {id(target) for target in pc_loads.values()}
+        targets = self.thread_targets(nodes)
+
+        output = []
+        for node in nodes:
+            if isinstance(node, Label):
+                output.append(node)
+                self.remove_fallthroughs(output, targets, pinned)
+                continue
+            if id(node) not in pinned:
+                if self.is_redundant_move(node):
+                    self.redundant_moves += 1
+                    continue
+                node = self.thread(node, targets)
+            output.append(node)
+
+        self.aim_pc_relative_loads(output, pc_loads)
+        analyzer = SemanticAnalyzer(output)
+        return output, analyzer.build_symbol_table()
+
+    @staticmethod
+    def branch_label(node: Instruction):
+        """Target label of a plain jump (not a call or register branch), else None."""
+        if node.mnemonic in JUMP_MNEMONICS and len(node.operands) == 1 and not node.operands[0].startswith('#'):
+            return node.operands[0]
+        return None
+
+    def thread_targets(self, nodes: List[Union[Label, Instruction]]) -> Dict[str, str]:
+        """Label -> label its branches can jump to directly, following chains of unconditional `b`."""
+        forwards = {}
+        pending = []
+        for node in nodes:
+            if isinstance(node, Label):
+                pending.append(node.name)
+                continue
+            if pending and node.mnemonic in UNCONDITIONAL_BRANCHES and not node.condition:
+                target = self.branch_label(node)
+                if target is not None:
+                    forwards.update(dict.fromkeys(pending, target))
+            pending = []
+
+        targets = {}
+        for name in forwards:
+            seen = {name}
+            target = forwards[name]
+            while target in forwards and target not in seen:
+                seen.add(target)
+                target = forwards[target]
+            if target not in seen:      # a chain that loops back never leaves, so it is left alone
+                targets[name] = target
+        return targets
+
+    def thread(self, node: Instruction, targets: Dict[str, str]) -> Instruction:
+        label = self.branch_label(node)
+        if label is None or label not in targets:
+            return node
+        self.threaded += 1
+        # Nodes can be shared by macro expansions, so the retargeted branch is a new one
+        return Instruction(node.mnemonic, node.condition, [targets[label]])
+
+    def remove_fallthroughs(self, output: List[Union[Label, Instruction]], targets: Dict[str, str], pinned: set):
+        """Drop branches to the labels at the end of output while the last instruction is one.
+
+        A branch already threaded past one of those labels goes where falling through would, so it is dropped too.
+        """
+        labels = set()
+        position = len(output) - 1
+        while position >= 0:
+            node = output[position]
+            if isinstance(node, Label):
+                labels.add(node.name)
+                if node.name in targets:
+                    labels.add(targets[node.name])
+            elif self.branch_label(node) in labels and id(node) not in pinned:
+                del output[position]
+                self.fallthroughs += 1
+            else:
+                return
+            position -= 1
+
+    @staticmethod
+    def is_redundant_move(node: Instruction) -> bool:
+        if node.mnemonic != 'mov' or len(node.operands) != 2:
+            return False
+        dest, source = decode_operand(node.operands[0]), decode_operand(node.operands[1])
+        return (isinstance(dest, Register) and isinstance(source, Register)
+                and dest.num == source.num and dest.num != 15)
+
+    @staticmethod
+    def pc_relative_offset(node: Instruction):
+        """Offset of an `ldr rX, [pc, #offset]` load, else None."""
+        if node.mnemonic not in LOAD_MNEMONICS or len(node.decoded) != 2:
+            return None
+        address = node.decoded[1]
+        if (isinstance(address, MemOperand) and not address.writeback and isinstance(address.base, Register)
+                and address.base.num == 15 and isinstance(address.offset, Immediate) and node.operands[3:4] == [address.offset.text]):
+            return address.offset.value
+        return None
+
+    def copy_pc_relative_loads(self, nodes: List[Union[Label, Instruction]]):
+        """Give every pc-relative load and the instruction it reads their own node.
+
+        Returns the nodes and load id -> target node, so each can be found again after instructions move.
+        """
+        instructions = [node for node in nodes if isinstance(node, Instruction)]
+        loads = {}
+        for index, node in enumerate(instructions):
+            offset = self.pc_relative_offset(node)
+            if offset is not None and offset % 4 == 0 and 0 <= index + 2 + offset // 4 < len(instructions):
+                loads[index] = index + 2 + offset // 4
+        if not loads:
+            return nodes, {}
+
+        copies = {}
+        for index in set(loads) | set(loads.values()):
+            node = instructions[index]
+            copies[index] = Instruction(node.mnemonic, node.condition, list(node.operands))
+        copied = []
+        index = 0
+        for node in nodes:
+            if isinstance(node, Instruction):
+                node = copies.get(index, node)
+                index += 1
+            copied.append(node)
+        return copied, {id(copies[load]): copies[target] for load, target in loads.items()}
+
+    @staticmethod
+    def aim_pc_relative_loads(output: List[Union[Label, Instruction]], pc_loads: Dict[int, Instruction]):
+        if not pc_loads:
+            return
+        addresses = {}
+        address = 0
+        for node in output:
+            if isinstance(node, Instruction):
+                addresses[id(node)] = address
+                address += 4
+        for node in output:
+            target = pc_loads.get(id(node)) if isinstance(node, Instruction) else None
+            if target is not None:
+                node.set_operand(3, f'#{addresses[id(target)] - (addresses[id(node)] + 8)}')
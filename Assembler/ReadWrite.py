@@ -1,73 +1,299 @@
+import argparse
+import contextlib
+import glob
+import io
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
 from opcode_table import opcode_table
 from Tokenize import Tokenizer
 from Parser import Label, Instruction, Parser
 from Semantic_Analyzer.Semantic_Analyzer import SemanticAnalyzer
 from opcode_table import opcode_table
 from Code_generator import CodeGenerator
+from AssemblyCache import AssemblyCache
+from Include import IncludeCache, has_includes, include_closure, include_sources, splice_includes
+from Parallel import assemble_parallel, ChunkError
+from Macro import MacroExpander, has_macros
+from OnePass import assemble_one_pass
+from LiteralPool import place_literal_pools
+from Peephole import PeepholeOptimizer
+from ObjectFile import ObjectModule, has_symbol_declarations, take_symbol_declarations
+from Listing import Listing, node_lines
+from Diagnostics import ERROR, has_errors
 
-def assemble_asm_to_object(asm_file, obj_file):
+# Included files are parsed once per run and shared by every module that includes them
+include_cache = IncludeCache()
+
+def write_object_file(obj_file, machine_code, symbol_table, relocations=(), global_symbols=(), external_symbols=(),
+                      object_format='binary'):
+    """Write an object file, packed 'binary' (see ObjectFile) or the legacy 'text' format."""
+    module = ObjectModule.from_assembly(machine_code, symbol_table, relocations, global_symbols, external_symbols)
+    module.write(obj_file, object_format)
+
+def assemble_asm_to_object(asm_file, obj_file, cache: AssemblyCache = None, workers: int = None, one_pass: bool = False,
+                           max_errors: int = None, fail_fast: bool = False, optimize: bool = False,
+                           object_format: str = 'binary', listing_file: str = None, werror: bool = False):
+    """Assemble asm_file into obj_file; with listing_file, also write a .lst listing (see Listing).
+
+    Returns True on success and False if assembly fails. Diagnostics are
+    printed and the object is still written; with werror, any error (not
+    warning) diagnostic fails the file instead and no object is written.
+    Only diagnostics and a summary line go to stdout.
+    """
     try:
         if not os.path.exists(asm_file):
             print(f"Error: {asm_file} not found.")
-            return
+            return False
+
+        if one_pass:
+            # Streaming mode: the source is never held in memory and words go straight to obj_file.
+            # Lines go through the include splicer and then the macro expander, as on the serial path.
+            with open(asm_file, 'r') as asm:
+                lines = splice_includes(asm, os.path.dirname(os.path.abspath(asm_file)), [os.path.abspath(asm_file)])
+                errors, symbol_table, count = assemble_one_pass(MacroExpander().iter_nodes(lines), obj_file, object_format,
+                                                                werror)
+            print_diagnostics(errors)
+            if werror and has_errors(errors):
+                return report_failure(asm_file, errors)
+            print(f"Successfully assembled {asm_file} into {obj_file} ({count} instructions, one pass)")
+            return True
 
         with open(asm_file, 'r') as asm:
-            with open(obj_file, 'w') as obj:
-                input_code = asm.read()
-                print(input_code)
-
-                tokenizer = Tokenizer(input_code)
-                tokens = tokenizer.tokenize()
-                for token in tokens:
-                    print(token)
-                
-                parser = Parser(tokens)
-                ast = parser.parse()
-                print(ast)
-                
-                analyzer = SemanticAnalyzer(ast)
-                errors, symbol_table = analyzer.analyze()
-                if errors:
-                    for error in errors:
-                        print(error)
-                else:
-                    print("No semantic errors found.")
-                
-                #symbol_table = {'exit': 0x100, 'label1' : 0x101, 'lab2' : 0x102,}
-                code_gen = CodeGenerator(ast, symbol_table)
-                machine_code = code_gen.generate_machine_code()
-                i = 0
-                print("Generated Machine Code:")
-                for i, code in enumerate(machine_code):
-                    s = code_gen.format_binary(code)
-                    obj.write(s)
-                    obj.write("\n")
-                    print(f"Instruction {i}: {s}")
-                    # Print instruction breakdown
-                    itype = (code >> 30) & 0x3
-                    u_ctrl = (code >> 24) & 0x3F
-                    rd = (code >> 20) & 0xF
-                    rm = (code >> 16) & 0xF
-                    is_imm = (code >> 15) & 0x1
-                    value = code & 0x7FFF
-                    print(f"  Type: {itype:02b}, Control: {u_ctrl:06b}, Rd: {rd:04b}, Rm: {rm:04b}, Imm: {is_imm}, Value: {value:015b}")
-                    i+=1
-                
-                obj.write("#")
-                obj.write(str(symbol_table))   
-                obj.write("\n#")
-                obj.write(str(i))         
+            input_code = asm.read()
+
+        base_dir = os.path.dirname(os.path.abspath(asm_file))
+        uses_includes = has_includes(input_code)
+        uses_macros = has_macros(input_code)
+        uses_declarations = has_symbol_declarations(input_code)
+        cache_key = input_code
+        if uses_includes:
+            # Included files are part of the cached content; a missing one is reported by the parse below
+            for path, text in include_sources(input_code, base_dir):
+                if text is not None:
+                    cache_key += f"\0{path}\0{text}"
+                    uses_macros = uses_macros or has_macros(text)
+
+        # Options that change the object or the diagnostics; entries made with other settings never match
+        cache_options = {'optimize': optimize, 'max_errors': max_errors, 'fail_fast': fail_fast, 'werror': werror}
+
+        # A listing needs the parsed program, so it always takes the serial path below
+        if cache is not None and listing_file is None:
+            cached = cache.get(cache_key, cache_options)
+            if cached is not None:
+                machine_code, symbol_table, errors, linkage = cached
+                print_diagnostics(errors)
+                write_object_file(obj_file, machine_code, symbol_table, object_format=object_format, **linkage)
+                print(f"Successfully assembled {asm_file} into {obj_file} (cached)")
+                return True
+
+        parallel = None
+        # Sharded mode: chunks are assembled in a process pool, output is identical to the serial path.
+        # Error limits and the optimizer work on the whole program, so those runs stay serial, and
+        # a chunk that fails to encode is left to the serial path, which reports the program's errors first.
+        serial_only = listing_file is not None or max_errors is not None or fail_fast or optimize
+        if workers and workers > 1 and not serial_only and not (uses_includes or uses_macros or uses_declarations):
+            try:
+                parallel = assemble_parallel(input_code, workers)
+            except ChunkError:
+                pass
+        if parallel is not None:
+            errors, symbol_table, machine_code, relocations = parallel
+            print_diagnostics(errors)
+            if werror and has_errors(errors):
+                return report_failure(asm_file, errors)
+            write_object_file(obj_file, machine_code, symbol_table, relocations, object_format=object_format)
+            if cache is not None:
+                cache.put(cache_key, machine_code, symbol_table, errors, {'relocations': relocations}, cache_options)
+            print(f"Successfully assembled {asm_file} into {obj_file}")
+            return True
+
+        lines = None
+        if uses_macros:
+            # Includes are spliced in first, so macros defined in an included file can be used after it
+            source_lines = input_code.split('\n')
+            if uses_includes:
+                source_lines = splice_includes(source_lines, base_dir, [os.path.abspath(asm_file)])
+            ast = list(MacroExpander().iter_nodes(source_lines))
+        elif uses_includes:
+            ast = include_cache.parse_source(input_code, base_dir, asm_file)
+        else:
+            tokenizer = Tokenizer(input_code)
+            tokens = tokenizer.tokenize()
+
+            parser = Parser(tokens)
+            ast = parser.parse()
+            if listing_file is not None:
+                lines = node_lines(ast, tokens)
+        global_symbols, external_symbols = [], []
+        if uses_declarations:
+            ast, global_symbols, external_symbols = take_symbol_declarations(ast)
+        ast = place_literal_pools(ast)
+
+        analyzer = SemanticAnalyzer(ast, max_errors=max_errors, fail_fast=fail_fast)
+        analyzer.global_symbols.update(global_symbols)
+        analyzer.external_symbols.update(external_symbols)
+        errors, symbol_table = analyzer.analyze()
+        print_diagnostics(errors)
+        if analyzer.truncated:
+            print(f"Stopped after {analyzer.error_count} errors (max_errors={max_errors})")
+        if werror and has_errors(errors):
+            return report_failure(asm_file, errors)
+
+        if optimize:
+            optimizer = PeepholeOptimizer(ast)
+            ast, symbol_table = optimizer.optimize()
+            print(optimizer.summary())
+
+        code_gen = CodeGenerator(ast, symbol_table, external_symbols)
+        machine_code = code_gen.generate_machine_code()
+
+        linkage = {'relocations': code_gen.relocations, 'global_symbols': global_symbols, 'external_symbols': external_symbols}
+        write_object_file(obj_file, machine_code, symbol_table, object_format=object_format, **linkage)
+        if listing_file is not None:
+            Listing(input_code, ast, machine_code, symbol_table, lines).write(listing_file)
+        if cache is not None:
+            cache.put(cache_key, machine_code, symbol_table, errors, linkage, cache_options)
         print(f"Successfully assembled {asm_file} into {obj_file}")
+        return True
     except Exception as e:
         print(f"An error occurred: {e}")
+        return False
+
+def print_diagnostics(errors):
+    """Print each diagnostic, or the all-clear line when there are none."""
+    if errors:
+        for error in errors:
+            print(error)
+    else:
+        print("No semantic errors found.")
+
+def report_failure(asm_file, errors) -> bool:
+    count = sum(1 for error in errors if error.severity == ERROR)
+    print(f"Failed to assemble {asm_file}: {count} error(s), no object file written")
+    return False
+
+def object_path(asm_file: str, out_dir: str = None, suffix: str = '.o') -> str:
+    """Object file for asm_file: same name with suffix, next to the source or in out_dir."""
+    stem = os.path.splitext(os.path.basename(asm_file))[0] + suffix
+    return os.path.join(out_dir if out_dir is not None else os.path.dirname(asm_file), stem)
+
+def is_up_to_date(asm_file: str, obj_file: str) -> bool:
+    """True if obj_file exists and is not older than asm_file or any file it includes (make-style)."""
+    try:
+        obj_time = os.path.getmtime(obj_file)
+        with open(asm_file, 'r') as asm:
+            input_code = asm.read()
+        source_time = os.path.getmtime(asm_file)
+    except OSError:
+        return False
+    if has_includes(input_code):
+        for path in include_closure(input_code, os.path.dirname(os.path.abspath(asm_file))):
+            try:
+                source_time = max(source_time, os.path.getmtime(path))
+            except OSError:
+                return False
+    return obj_time >= source_time
+
+def assemble_job(job):
+    """Assemble one file in a batch worker; returns (asm_file, succeeded, seconds, captured output)."""
+    asm_file, obj_file, options = job
+    options = dict(options)
+    cache_dir = options.pop('cache_dir', None)
+    if cache_dir is not None:
+        options['cache'] = AssemblyCache(cache_dir)
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        succeeded = assemble_asm_to_object(asm_file, obj_file, **options)
+    return asm_file, succeeded, time.perf_counter() - start, output.getvalue()
+
+def assemble_batch(asm_files: List[str], out_dir: str = None, jobs: int = None, always_make: bool = False,
+                   listing: bool = False, **options) -> int:
+    """
+    Assemble many files on a process pool, make-style.
+
+    Files whose object is at least as new as the source (and its includes)
+    are skipped unless always_make is set. Each file's diagnostics are
+    printed in input order as the files finish, followed by one summary
+    line with per-file timings. options go to assemble_asm_to_object;
+    cache_dir replaces cache, since each worker opens its own.
+    Returns the number of files that failed.
+    """
+    if out_dir is not None:
+        os.makedirs(out_dir, exist_ok=True)
+    batch = []
+    skipped = []
+    for asm_file in asm_files:
+        obj_file = object_path(asm_file, out_dir)
+        if not always_make and is_up_to_date(asm_file, obj_file):
+            skipped.append(asm_file)
+            continue
+        job_options = dict(options)
+        if listing:
+            job_options['listing_file'] = object_path(asm_file, out_dir, '.lst')
+        batch.append((asm_file, obj_file, job_options))
+
+    start = time.perf_counter()
+    jobs = min(jobs or os.cpu_count() or 1, len(batch))
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(assemble_job, batch))
+    else:
+        results = [assemble_job(job) for job in batch]
+    elapsed = time.perf_counter() - start
+
+    timings = []
+    failed = 0
+    for asm_file, succeeded, seconds, output in results:
+        print(output, end='')
+        if not succeeded:
+            failed += 1
+        timings.append(f"{os.path.basename(asm_file)} {seconds * 1000:.1f}ms{'' if succeeded else ' FAILED'}")
+    timings.extend(f"{os.path.basename(asm_file)} skipped" for asm_file in skipped)
+    print(f"Assembled {len(results) - failed}, failed {failed}, skipped {len(skipped)} in {elapsed:.2f}s "
+          f"(jobs={jobs}): {', '.join(timings)}")
+    return failed
+
+def expand_sources(patterns: List[str]) -> List[str]:
+    """Expand globs in order, dropping duplicates; a pattern with no matches is kept to be reported as missing."""
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        files.extend(matches or [pattern])
+    return list(dict.fromkeys(files))
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Assemble .asm files into object files.")
+    parser.add_argument('sources', nargs='+', help=".asm files or glob patterns")
+    parser.add_argument('-o', '--out-dir', help="directory for object files (default: next to each source)")
+    parser.add_argument('-j', '--jobs', type=int, help="worker processes (default: CPU count)")
+    parser.add_argument('-B', '--always-make', action='store_true', help="assemble even if the object is up to date")
+    parser.add_argument('--format', dest='object_format', choices=('binary', 'text'), default='binary', help="object file format")
+    parser.add_argument('--listing', action='store_true', help="also write a .lst listing next to each object")
+    parser.add_argument('-O', '--optimize', action='store_true', help="run the peephole optimizer")
+    parser.add_argument('--one-pass', action='store_true', help="stream each file through the one-pass assembler (includes and macros are expanded)")
+    parser.add_argument('--max-errors', type=int, help="stop reporting after this many errors per file")
+    parser.add_argument('--fail-fast', action='store_true', help="stop at the first error")
+    parser.add_argument('--werror', action='store_true', help="fail a file and write no object if it reports any error")
+    parser.add_argument('--cache-dir', help="reuse assemblies from this AssemblyCache directory")
+    return parser.parse_args(argv)
+
+def main(argv: List[str] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        asm_file = input("Enter the ASM file (e.g., 'Prog.asm'): ")
+        obj_file = input("Enter the output object file (e.g., 'Prog.o'): ")
+        assemble_asm_to_object(asm_file, obj_file)
+        return 0
 
-def main():
-    asm_file = input("Enter the ASM file (e.g., 'Prog.asm'): ")
-    obj_file = input("Enter the output object file (e.g., 'Prog.o'): ")
-    # asm_file = "comp1.asm"
-    # obj_file = "p1.o"
-    assemble_asm_to_object(asm_file, obj_file)
+    args = parse_args(argv)
+    return 1 if assemble_batch(expand_sources(args.sources), out_dir=args.out_dir, jobs=args.jobs, always_make=args.always_make,
+                               listing=args.listing, object_format=args.object_format, optimize=args.optimize,
+                               one_pass=args.one_pass, max_errors=args.max_errors, fail_fast=args.fail_fast,
+                               werror=args.werror, cache_dir=args.cache_dir) else 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -41,8 +41,16 @@ Syntax for commas (being removed by parser. Check it there)
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from typing import List, Dict, Union
-from Parser import Label, Instruction
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Tuple, Union
+from Parser import Label, Instruction, InstructionTable
+from Operands import Immediate, LabelRef, MemOperand, Register, decode_operand, decode_operands
+from CFG import ControlFlowGraph, BRANCH_MNEMONICS, REGISTER_BRANCHES
+from Dataflow import ConstantPropagation, RegisterState
+from Semantic_Analyzer import mem_val
+from Semantic_Analyzer.Symbol_Table import SymbolTableGenerator
+from Diagnostics import Diagnostic, DiagnosticLimitReached, ERROR, MESSAGES
+from LiteralPool import ENCODABLE_IMMEDIATES, MASK
 # from Tokenize import tokenize
 
 
@@ -50,11 +58,19 @@ class SemanticError(Exception):
     pass
 
 class SemanticAnalyzer:
-    def __init__(self, ast: List[Union[Label, Instruction]]):
+    def __init__(self, ast: Union[List[Union[Label, Instruction]], InstructionTable],
+                 cross_reference: SymbolTableGenerator = None, max_errors: int = None, fail_fast: bool = False):
         self.ast = ast
+        self.cross_reference = cross_reference          # filled during validation when given
         self.symbol_table: Dict[str, int] = {}
         self.current_address = 0
-        self.errors: List[str] = []
+        self.errors: List[Diagnostic] = []
+        # Stop once this many errors (not warnings) are reported; fail_fast raises instead of returning
+        self.max_errors = max_errors if max_errors is not None else (1 if fail_fast else None)
+        self.fail_fast = fail_fast
+        self.error_count = 0
+        self.truncated = False
+        self.instruction_index = 0
         self.data_section = False
         self.global_symbols = set()
         self.hidden_symbols = set()
@@ -62,31 +78,144 @@ class SemanticAnalyzer:
         self.current_section = 'text'
         self.current_function = None
         self.no_code_section = False
+        self.cfg: ControlFlowGraph = None
+        self.instruction_address = 0                    # address of the instruction being validated
+        self.register_state: RegisterState = None     # known register values before the instruction being validated
 
-    def analyze(self):
-        self.build_symbol_table()
-        self.validate_instructions()
+    def analyze(self, workers: int = None, chunk_size: int = 20000):
+        try:
+            self.build_symbol_table()
+            if workers and workers > 1:
+                self.validate_instructions_parallel(workers, chunk_size)
+            else:
+                self.validate_instructions()
+        except DiagnosticLimitReached:
+            if self.fail_fast:
+                raise
+            self.truncated = True
         return self.errors, self.symbol_table
 
+    def report(self, code: str, *args, node: int = None):
+        """Record a diagnostic about the current (or the given) instruction; the message is formatted on demand."""
+        self.add(Diagnostic(code, self.instruction_index if node is None else node, args))
+
+    def add(self, diagnostic: Diagnostic):
+        self.errors.append(diagnostic)
+        if self.max_errors is not None and MESSAGES[diagnostic.code][0] == ERROR:
+            self.error_count += 1
+            if self.error_count >= self.max_errors:
+                raise DiagnosticLimitReached(diagnostic, self.error_count)
+
+    def validate_instructions_parallel(self, workers: int, chunk_size: int = 20000):
+        """
+        Validate instructions on a process pool, in chunks of chunk_size.
+
+        Every worker gets the instruction rows, the finished symbol table, the
+        declared global, hidden and external symbols, the control-flow graph
+        and the solved constant propagation once (pool initializer) and
+        returns the diagnostics of its chunk; they are merged
+        in source order, so the result, including where max_errors stops it,
+        is identical to validate_instructions. Directives carry state
+        (.extern, sections) from one instruction to the next, so programs
+        containing any, and analyzers filling a cross-reference table, are
+        validated serially.
+        """
+        nodes = self.ast.instructions() if isinstance(self.ast, InstructionTable) else self.ast
+        rows = [(node.mnemonic, node.condition, node.operands) for node in nodes if isinstance(node, Instruction)]
+        if (len(rows) <= chunk_size or self.cross_reference is not None
+                or any(mnemonic.startswith('.') for mnemonic, _, _ in rows)):
+            self.validate_instructions()
+            return
+        cfg = self.control_flow_graph()
+        dataflow = self.constant_propagation(cfg)
+
+        # The rows travel with the initializer (inherited, not pickled, under fork); tasks are index ranges
+        ranges = [(start, min(start + chunk_size, len(rows))) for start in range(0, len(rows), chunk_size)]
+        symbols = (self.global_symbols, self.hidden_symbols, self.external_symbols)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_set_shared_state,
+                                 initargs=(rows, self.symbol_table, symbols, cfg, dataflow)) as pool:
+            try:
+                for chunk_errors in pool.map(validate_chunk, ranges):
+                    for diagnostic in chunk_errors:
+                        self.add(diagnostic)
+            except DiagnosticLimitReached:
+                pool.shutdown(cancel_futures=True)
+                raise
+
     def build_symbol_table(self):
+        if isinstance(self.ast, InstructionTable):
+            # Columnar AST: label addresses come straight from the label-position array
+            for name, row in self.ast.labels():
+                if name in self.symbol_table:
+                    self.report('duplicate-label', name, node=row)
+                else:
+                    self.symbol_table[name] = row * 4
+                    if self.cross_reference is not None:
+                        self.cross_reference.add_label(name, row * 4)
+            self.current_address = len(self.ast) * 4
+            return(self.symbol_table)
+
         for node in self.ast:
             #print(node)
             if isinstance(node, Label):
                 if node.name in self.symbol_table:
-                    self.errors.append(f"Error: Label '{node.name}' is defined multiple times")
+                    self.report('duplicate-label', node.name, node=self.current_address // 4)
                 else:
                     self.symbol_table[node.name] = self.current_address
+                    if self.cross_reference is not None:
+                        self.cross_reference.add_label(node.name, self.current_address)
             elif isinstance(node, Instruction):
                 self.current_address += 4  # Assuming all instructions are 4 bytes long   
 
         return(self.symbol_table)
 
     def validate_instructions(self):
-        for node in self.ast:
+        cfg = self.control_flow_graph()
+        dataflow = self.constant_propagation(cfg)
+        states = dataflow.states() if dataflow is not None else None
+        nodes = self.ast.instructions() if isinstance(self.ast, InstructionTable) else self.ast
+        index = 0
+        for node in nodes:
             if isinstance(node, Instruction):
+                self.instruction_index = index
+                self.instruction_address = cfg.addresses[index]
+                if states is not None:
+                    self.register_state = next(states)
                 self.validate_instruction(node)
+                if self.cross_reference is not None:
+                    self.cross_reference.add_instruction(node.mnemonic, node.decoded, self.instruction_address)
+                index += 1
+        self.register_state = None
+
+    def control_flow_graph(self) -> ControlFlowGraph:
+        """Basic blocks and instruction addresses of the program, built once."""
+        if self.cfg is None:
+            if isinstance(self.ast, InstructionTable):
+                rows = range(len(self.ast))
+                mnemonics = [self.ast.mnemonic(row) for row in rows]
+                operands = [self.ast.operands(row) for row in rows]
+            else:
+                instructions = [node for node in self.ast if isinstance(node, Instruction)]
+                mnemonics = [node.mnemonic for node in instructions]
+                operands = [node.operands for node in instructions]
+            self.cfg = ControlFlowGraph(mnemonics, operands, self.symbol_table)
+        return self.cfg
+
+    def constant_propagation(self, cfg: ControlFlowGraph) -> ConstantPropagation:
+        """Register constants for every instruction, solved once over the whole program.
+
+        Only memory accesses use them, so programs without any skip the analysis (returns None).
+        """
+        memory = mem_val.MEMORY_INSTRUCTIONS
+        if memory.isdisjoint(cfg.mnemonics):
+            return None
+        return ConstantPropagation(cfg, [(mnemonic, decode_operands(operands))
+                                         for mnemonic, operands in zip(cfg.mnemonics, cfg.operands)])
 
     def validate_instruction(self, instruction: Instruction):
+        if instruction.mnemonic.startswith('.'):
+            self.process_directive(instruction)
+            return
         self.validate_mnemonic(instruction)
         self.validate_operands(instruction)                               
         # self.validate_register_usage(instruction)
@@ -96,166 +225,193 @@ class SemanticAnalyzer:
         self.validate_type_mismatch(instruction)
         self.process_directive(instruction)
 
+    # Built once at import instead of on every call
+    VALID_MNEMONICS = frozenset({
+        'add', 'sub', 'rsb', 'adc', 'sbc', 'rsc', 'and', 'orr', 'eor', 'bic', 'mov', 'mvn',
+        'mul', 'mla', 'umull', 'umlal', 'smull', 'smlal',
+        'cmp', 'cmn',
+        'ldr', 'str', 'ldrb', 'strb', 'ldrh', 'strh', 'ldm', 'stm',
+        'b', 'bl', 'bx', 'blx',
+        'bal',  'beq',  'bne',  'bpl',  'bmi',  'bcc',  'blo',  'bcs',  'bhs',  'bvc',  'bcs',  'bgt','bge','blt','ble', 'bhi','bls',
+        'lsl', 'lsr', 'asr', 'ror', 'rrx',
+        'mrs', 'msr',
+        'swi', 'svc', 'bkpt',
+    })
+    VALID_REGISTERS = frozenset({f'r{i}' for i in range(16)} | {'sp', 'lr', 'pc'})
+    SHIFT_OPERATORS = frozenset({'lsl', 'lsr', 'asr', 'ror'})
+    LABEL_BRANCH_INSTRUCTIONS = BRANCH_MNEMONICS
+    UNCONDITIONAL_LABEL_BRANCHES = frozenset({'b', 'bl', 'bal', 'blx'})
+    ARITHMETIC_INSTRUCTIONS = frozenset({'add', 'sub', 'rsb', 'adc', 'sbc', 'rsc', 'mul', 'mla'})
+    LOGICAL_INSTRUCTIONS = frozenset({'and', 'orr', 'eor', 'bic'})
+    DATA_PROCESSING_INSTRUCTIONS = ARITHMETIC_INSTRUCTIONS | LOGICAL_INSTRUCTIONS
+    # An immediate that does not encode is still fine if the opposite instruction can take -value or ~value
+    NEGATABLE_INSTRUCTIONS = frozenset({'add', 'sub', 'cmp', 'cmn'})
+    COMPLEMENTABLE_INSTRUCTIONS = frozenset({'mov', 'mvn', 'and', 'bic', 'adc', 'sbc'})
+
     def validate_mnemonic(self, instruction: Instruction):
-        valid_mnemonics = {
-            'add', 'sub', 'rsb', 'adc', 'sbc', 'rsc', 'and', 'orr', 'eor', 'bic', 'mov', 'mvn',
-            'mul', 'mla', 'umull', 'umlal', 'smull', 'smlal',
-            'cmp', 'cmn',
-            'ldr', 'str', 'ldrb', 'strb', 'ldrh', 'strh', 'ldm', 'stm',
-            'b', 'bl', 'bx', 'blx',
-            'bal',  'beq',  'bne',  'bpl',  'bmi',  'bcc',  'blo',  'bcs',  'bhs',  'bvc',  'bcs',  'bgt','bge','blt','ble', 'bhi','bls',
-            'lsl', 'lsr', 'asr', 'ror', 'rrx',
-            'mrs', 'msr',
-            'swi', 'svc', 'bkpt',
-        }
-        if instruction.mnemonic not in valid_mnemonics:
-            self.errors.append(f"Error: Invalid mnemonic '{instruction.mnemonic}'")
+        if instruction.mnemonic not in self.VALID_MNEMONICS:
+            self.report('invalid-mnemonic', instruction.mnemonic)
+
+    # Operand checks take decoded operands (Instruction.decoded)
 
     def is_valid_register(self, op):
-            return op in {f'r{i}' for i in range(16)} | {'sp', 'lr', 'pc'}
+        # 'r01' decodes to a register for the encoder but is not a canonical register name
+        return isinstance(op, Register) and op.name in self.VALID_REGISTERS
     
     def is_valid_immediate(self, op):
-        if not op.startswith('#'):
-            return False
-        try:
-            value = int(op[1:], 0)  # 0 as base allows for hex and binary literals
-            return -2**31 <= value < 2**31
-        except ValueError:
-            return False
+        return isinstance(op, Immediate) and op.value is not None and -2**31 <= op.value < 2**31
+
+    def validate_encodable_immediate(self, mnemonic, op):
+        """Report an operand-2 immediate that is not an 8-bit value rotated by an even amount."""
+        if not isinstance(op, Immediate) or op.value & MASK in ENCODABLE_IMMEDIATES:
+            return
+        if mnemonic in self.NEGATABLE_INSTRUCTIONS and -op.value & MASK in ENCODABLE_IMMEDIATES:
+            return
+        if mnemonic in self.COMPLEMENTABLE_INSTRUCTIONS and ~op.value & MASK in ENCODABLE_IMMEDIATES:
+            return
+        self.report('unencodable-immediate', op.text, mnemonic)
 
     def validate_operands(self, instruction: Instruction):
-        operand_count = len(instruction.operands)
         mnemonic = instruction.mnemonic.lower()
+        validator = self.OPERAND_VALIDATORS.get(mnemonic)
+        if validator is None:
+            self.report('unknown-instruction', mnemonic)
+        else:
+            validator(self, mnemonic, instruction.decoded)
 
-        def is_valid_shifted_register(op):
-            parts = op.split()
-            if len(parts) != 3 or parts[1] not in {'lsl', 'lsr', 'asr', 'ror'}:
-                return False
-            return self.is_valid_register(parts[0]) and self.is_valid_immediate(parts[2])
-
-        # Instruction-specific checks
-        if mnemonic in {'mov', 'mvn', 'cmp', 'cmn', 'tst', 'teq'}:
-            if operand_count != 2:
-                self.errors.append(f"Error: '{mnemonic}' instruction requires exactly 2 operands")
-            elif not self.is_valid_register(instruction.operands[0]):
-                self.errors.append(f"Error: Invalid destination register in '{mnemonic}'")
-            elif not (self.is_valid_register(instruction.operands[1]) or 
-                    self.is_valid_immediate(instruction.operands[1]) or 
-                    is_valid_shifted_register(instruction.operands[1])):
-                self.errors.append(f"Error: Invalid source operand in '{mnemonic}'")
-
-        elif mnemonic in {'add', 'sub', 'rsb', 'adc', 'sbc', 'rsc', 'and'}:             #'orr', 'eor', 'bic'
-            if operand_count != 3:
-                self.errors.append(f"Error: '{mnemonic}' instruction requires exactly 3 operands")
-            elif not self.is_valid_register(instruction.operands[0]):
-                self.errors.append(f"Error: Invalid destination register in '{mnemonic}'")
-            elif not self.is_valid_register(instruction.operands[1]):
-                self.errors.append(f"Error: Invalid first source register in '{mnemonic}'")
-            elif not (self.is_valid_register(instruction.operands[2]) or 
-                    self.is_valid_immediate(instruction.operands[2]) or 
-                    is_valid_shifted_register(instruction.operands[2])):
-                self.errors.append(f"Error: Invalid second source operand in '{mnemonic}'")
-
-        elif mnemonic in {'mul', 'mla'}:
-            if operand_count not in {3, 4}:
-                self.errors.append(f"Error: '{mnemonic}' instruction requires 3 or 4 operands")
-            elif not all(self.is_valid_register(op) for op in instruction.operands):
-                self.errors.append(f"Error: Invalid register in '{mnemonic}'")
-
-        elif mnemonic in {'umull'}:         #, 'umlal', 'smull', 'smlal'
-            if operand_count != 4:
-                self.errors.append(f"Error: '{mnemonic}' instruction requires exactly 4 operands")
-            elif not all(self.is_valid_register(op) for op in instruction.operands):
-                self.errors.append(f"Error: Invalid register in '{mnemonic}'")
-
-        elif mnemonic in {'ldr', 'str', 'ldrb', 'strb', 'ldrh', 'strh'}:
-            if operand_count < 3:  # Need at least: register, '[', and base register
-                self.errors.append(f"Error: '{mnemonic}' instruction requires at least 3 operands")
-                return
-
-            if not self.is_valid_register(instruction.operands[0]):
-                self.errors.append(f"Error: Invalid destination register '{instruction.operands[0]}' in {mnemonic}")
-                return
-
-            if instruction.operands[1] != '[':
-                self.errors.append(f"Error: Expected '[' in {mnemonic} addressing mode")
-                return
-
-            # Find the closing bracket and exclamation mark
-            closing_bracket_index = None
-            has_exclamation = False
-            for i, op in enumerate(instruction.operands[2:], start=2):
-                if op == ']':
-                    closing_bracket_index = i
-                    if i+1 < operand_count:
-                        if instruction.operands[i+1] == '!':
-                            has_exclamation = True
-                        else:
-                            self.errors.append(f"Error: Unexpected operands after '!' in {mnemonic}")
-                    break
-
-            if closing_bracket_index is None:
-                self.errors.append(f"Error: Missing closing ']' in {mnemonic} addressing mode")
-                return
-
-            # Validate the addressing mode
-            address_operands = instruction.operands[2:closing_bracket_index]
-            if not self.is_valid_address_operands(address_operands):
-                self.errors.append(f"Error: Invalid addressing mode in {mnemonic}")
-
-            # Check for post-indexed addressing or writeback
-            # if not has_exclamation:
-            #     post_index_operands = instruction.operands[closing_bracket_index+1:]
-            #     print("post ]")
-            #     print(post_index_operands)
-            #     if not self.is_valid_post_index_operands(post_index_operands):
-            #         self.errors.append(f"Error: Invalid post-indexed addressing in {mnemonic}")
-
-
-        elif mnemonic in {'ldm', 'stm'}:
-            if operand_count < 2:
-                self.errors.append(f"Error: '{mnemonic}' instruction requires at least 2 operands")
-            elif not self.is_valid_register(instruction.operands[0]):
-                self.errors.append(f"Error: Invalid base register in '{mnemonic}'")
-            elif not all(self.is_valid_register(op) for op in instruction.operands[1:]):
-                self.errors.append(f"Error: Invalid register list in '{mnemonic}'")
-
-        elif mnemonic in {'b', 'bl', 'bx', 'blx', 'bal', 'beq', 'bne', 'bpl', 'bmi', 'bcc', 'blo', 'bcs', 'bhs', 'bvc', 'bvs', 'bgt', 'bge', 'blt', 'ble', 'bhi', 'bls'}:
-            if operand_count != 1:
-                self.errors.append(f"Error: '{mnemonic}' instruction requires exactly 1 operand")
-            elif mnemonic in {'bx', 'blx'} and not self.is_valid_register(instruction.operands[0]):
-                self.errors.append(f"Error: Invalid register in '{mnemonic}'")
-
-        elif mnemonic in {'lsl', 'lsr', 'asr', 'ror'}:
-            if operand_count != 3:
-                self.errors.append(f"Error: '{mnemonic}' instruction requires exactly 3 operands")
-            elif not all(self.is_valid_register(op) for op in instruction.operands[:2]):
-                self.errors.append(f"Error: Invalid register in '{mnemonic}'")
-            elif not self.is_valid_immediate(instruction.operands[2]):
-                self.errors.append(f"Error: Invalid shift amount in '{mnemonic}'")
-
-        elif mnemonic == 'rrx':
-            if operand_count != 2:
-                self.errors.append(f"Error: '{mnemonic}' instruction requires exactly 2 operands")
-            elif not all(self.is_valid_register(op) for op in instruction.operands):
-                self.errors.append(f"Error: Invalid register in '{mnemonic}'")
-
-        elif mnemonic in {'mrs', 'msr'}:
-            if operand_count != 2:
-                self.errors.append(f"Error: '{mnemonic}' instruction requires exactly 2 operands")
-            elif mnemonic == 'mrs' and not self.is_valid_register(instruction.operands[0]):
-                self.errors.append(f"Error: Invalid destination register in '{mnemonic}'")
-            elif mnemonic == 'msr' and instruction.operands[0] not in {'cpsr', 'spsr'}:
-                self.errors.append(f"Error: Invalid status register in '{mnemonic}'")
-
-        elif mnemonic in {'swi', 'svc', 'bkpt'}:
-            if operand_count != 1:
-                self.errors.append(f"Error: '{mnemonic}' instruction requires exactly 1 operand")
-            elif not self.is_valid_immediate(instruction.operands[0]):
-                self.errors.append(f"Error: Invalid immediate value in '{mnemonic}'")
-
+    def is_valid_shifted_register(self, op):
+        """A single 'rm lsl #n' operand token."""
+        if not isinstance(op, LabelRef):
+            return False
+        parts = op.name.split()
+        if len(parts) != 3 or parts[1] not in self.SHIFT_OPERATORS:
+            return False
+        return self.is_valid_register(decode_operand(parts[0])) and self.is_valid_immediate(decode_operand(parts[2]))
+
+    # Operand-shape validators, one per instruction class; see OPERAND_VALIDATORS
+
+    def validate_move_compare(self, mnemonic, operands):
+        if len(operands) != 2:
+            self.report('operand-count-2', mnemonic)
+        elif not self.is_valid_register(operands[0]):
+            self.report('invalid-destination', mnemonic)
+        elif not (self.is_valid_register(operands[1]) or 
+                self.is_valid_immediate(operands[1]) or 
+                self.is_valid_shifted_register(operands[1])):
+            self.report('invalid-source', mnemonic)
         else:
-            self.errors.append(f"Warning: Unknown instruction '{mnemonic}'. Unable to validate operands.")
+            self.validate_encodable_immediate(mnemonic, operands[1])
+
+    def validate_data_processing(self, mnemonic, operands):
+        if len(operands) != 3:
+            self.report('operand-count-3', mnemonic)
+        elif not self.is_valid_register(operands[0]):
+            self.report('invalid-destination', mnemonic)
+        elif not self.is_valid_register(operands[1]):
+            self.report('invalid-first-source', mnemonic)
+        elif not (self.is_valid_register(operands[2]) or 
+                self.is_valid_immediate(operands[2]) or 
+                self.is_valid_shifted_register(operands[2])):
+            self.report('invalid-second-source', mnemonic)
+        else:
+            self.validate_encodable_immediate(mnemonic, operands[2])
+
+    def validate_multiply(self, mnemonic, operands):
+        if len(operands) not in {3, 4}:
+            self.report('operand-count-3-4', mnemonic)
+        elif not all(self.is_valid_register(op) for op in operands):
+            self.report('invalid-register', mnemonic)
+
+    def validate_long_multiply(self, mnemonic, operands):
+        if len(operands) != 4:
+            self.report('operand-count-4', mnemonic)
+        elif not all(self.is_valid_register(op) for op in operands):
+            self.report('invalid-register', mnemonic)
+
+    def validate_single_transfer(self, mnemonic, operands):
+        operand_count = len(operands)
+        address = operands[1] if operand_count > 1 else None
+        is_address = isinstance(address, MemOperand)
+        # Need at least: register, '[', and base register (or ']')
+        if operand_count < (2 if is_address and (address.operands or address.closed) else 3):
+            self.report('operand-count-min-3', mnemonic)
+            return
+
+        if not self.is_valid_register(operands[0]):
+            self.report('invalid-transfer-register', str(operands[0]), mnemonic)
+            return
+
+        if not is_address:
+            self.report('expected-bracket', mnemonic)
+            return
+
+        if not address.closed:
+            self.report('missing-bracket', mnemonic)
+            return
+        if operand_count > 2 and not address.writeback:
+            self.report('operands-after-writeback', mnemonic)
+
+        # Validate the addressing mode
+        if not self.is_valid_address_operands(address.operands):
+            self.report('invalid-addressing-mode', mnemonic)
+
+    def validate_block_transfer(self, mnemonic, operands):
+        if len(operands) < 2:
+            self.report('operand-count-min-2', mnemonic)
+        elif not self.is_valid_register(operands[0]):
+            self.report('invalid-base-register', mnemonic)
+        elif not all(self.is_valid_register(op) for op in operands[1:]):
+            self.report('invalid-register-list', mnemonic)
+
+    def validate_branch(self, mnemonic, operands):
+        if len(operands) != 1:
+            self.report('operand-count-1', mnemonic)
+        elif mnemonic in {'bx', 'blx'} and not self.is_valid_register(operands[0]):
+            self.report('invalid-register', mnemonic)
+
+    def validate_shift(self, mnemonic, operands):
+        if len(operands) != 3:
+            self.report('operand-count-3', mnemonic)
+        elif not all(self.is_valid_register(op) for op in operands[:2]):
+            self.report('invalid-register', mnemonic)
+        elif not self.is_valid_immediate(operands[2]):
+            self.report('invalid-shift-amount', mnemonic)
+
+    def validate_rrx(self, mnemonic, operands):
+        if len(operands) != 2:
+            self.report('operand-count-2', mnemonic)
+        elif not all(self.is_valid_register(op) for op in operands):
+            self.report('invalid-register', mnemonic)
+
+    def validate_status_register(self, mnemonic, operands):
+        if len(operands) != 2:
+            self.report('operand-count-2', mnemonic)
+        elif mnemonic == 'mrs' and not self.is_valid_register(operands[0]):
+            self.report('invalid-destination', mnemonic)
+        elif mnemonic == 'msr' and not (isinstance(operands[0], LabelRef) and operands[0].name in {'cpsr', 'spsr'}):
+            self.report('invalid-status-register', mnemonic)
+
+    def validate_system(self, mnemonic, operands):
+        if len(operands) != 1:
+            self.report('operand-count-1', mnemonic)
+        elif not self.is_valid_immediate(operands[0]):
+            self.report('invalid-immediate', mnemonic)
+
+    # Mnemonic -> operand-shape validator, built once when the class is created
+    OPERAND_VALIDATORS = {
+        **dict.fromkeys(('mov', 'mvn', 'cmp', 'cmn', 'tst', 'teq'), validate_move_compare),
+        **dict.fromkeys(('add', 'sub', 'rsb', 'adc', 'sbc', 'rsc', 'and'), validate_data_processing),      #'orr', 'eor', 'bic'
+        **dict.fromkeys(('mul', 'mla'), validate_multiply),
+        **dict.fromkeys(('umull',), validate_long_multiply),        #, 'umlal', 'smull', 'smlal'
+        **dict.fromkeys(('ldr', 'str', 'ldrb', 'strb', 'ldrh', 'strh'), validate_single_transfer),
+        **dict.fromkeys(('ldm', 'stm'), validate_block_transfer),
+        **dict.fromkeys(('b', 'bl', 'bx', 'blx', 'bal', 'beq', 'bne', 'bpl', 'bmi', 'bcc', 'blo', 'bcs', 'bhs',
+                         'bvc', 'bvs', 'bgt', 'bge', 'blt', 'ble', 'bhi', 'bls'), validate_branch),
+        **dict.fromkeys(('lsl', 'lsr', 'asr', 'ror'), validate_shift),
+        **dict.fromkeys(('rrx',), validate_rrx),
+        **dict.fromkeys(('mrs', 'msr'), validate_status_register),
+        **dict.fromkeys(('swi', 'svc', 'bkpt'), validate_system),
+    }
             
             
     # def validate_register_usage(self, instruction: Instruction):
@@ -297,68 +453,54 @@ class SemanticAnalyzer:
                 return self.is_valid_immediate(operands[1]) or self.is_valid_register(operands[1])  # [Rn, #imm] or [Rn, Rm]
             if len(operands) == 3:
                 return (self.is_valid_register(operands[1]) and 
-                    (operands[2] in {'lsl', 'lsr', 'asr', 'ror'} or self.is_valid_immediate(operands[2])))  # [Rn, Rm, shift] or [Rn, Rm, #imm]
+                    (isinstance(operands[2], LabelRef) and operands[2].name in self.SHIFT_OPERATORS or
+                     self.is_valid_immediate(operands[2])))  # [Rn, Rm, shift] or [Rn, Rm, #imm]
         return False
 
     def validate_memory_access(self, instruction: Instruction):
-        #Call function from mem_val
-        return 
-    
-        #if instruction.mnemonic in {'ldr', 'str', 'ldrb', 'strb', 'ldrh', 'strh'}:
-        # if instruction.mnemonic in {'ldr', 'str'}:
-        #     if not self.is_aligned(instruction.operands[1], 4):
-        #         self.errors.append(f"Warning: Unaligned access in '{instruction.mnemonic}'")
-        # elif instruction.mnemonic in {'ldrh', 'strh'}:
-        #     if not self.is_aligned(instruction.operands[1], 2):
-        #         self.errors.append(f"Warning: Unaligned access in '{instruction.mnemonic}'")
-
-    # def is_aligned(self, address_operand, alignment):
-    #     # This is a simplified check. In reality, you'd need to evaluate the address expression.
-    #     if '#' in address_operand:
-    #         offset = int(address_operand.split('#')[1].rstrip(']!'))
-    #         return offset % alignment == 0
-    #     return True  # Assume aligned if we can't determine
+        if instruction.mnemonic in mem_val.MEMORY_INSTRUCTIONS:
+            mem_val.validate_memory_access(instruction.mnemonic, instruction.decoded, self.get_register_value, self.report)
 
-    def validate_label_references(self, instruction: Instruction):
-        branch_instructions = {
-            'b', 'beq', 'bne' 
-        }       #'bl', 'bx', 'blx', 'bal', 'bcs', 'bhs', 'bvc', 'bvs', 'bgt', 'bge', 'blt', 'ble', 'bhi', 'bls', 'bpl', 'bmi', 'bcc', 'blo',
-        
-        if instruction.mnemonic in branch_instructions:
-            if not instruction.operands:
-                self.errors.append(f"Error: {instruction.mnemonic} instruction requires a label operand")
-                return
+    def get_register_value(self, num: int):
+        """Value of register num before the current instruction, if constant propagation knows it."""
+        return self.register_state[num] if self.register_state is not None else None
 
-            label = instruction.operands[0]
-            
-            if label not in self.symbol_table and label not in self.external_symbols:
-                self.errors.append(f"Error: Undefined label '{label}'")
-            elif label in self.symbol_table:
-                # Check branch distance for non-register branch instructions
-                if instruction.mnemonic not in {'bx', 'blx'} or (instruction.mnemonic in {'bx', 'blx'} and not label.startswith('r')):
-                    branch_distance = self.symbol_table[label] - self.current_address
-                    
-                    # Different instructions have different range limits
-                    # if instruction.mnemonic in {'b', 'bl', 'bal'}:
-                    #     if not (-33554432 <= branch_distance <= 33554428):
-                    #         self.errors.append(f"Error: Branch to '{label}' is out of range for {instruction.mnemonic}")
-                    # else:  # Conditional branches have a smaller range
-                    #     if not (-1048576 <= branch_distance <= 1048572):
-                    #         self.errors.append(f"Error: Conditional branch to '{label}' is out of range for {instruction.mnemonic}")
-
-            # Additional checks for bx and blx
-            if instruction.mnemonic in {'bx', 'blx'}:
-                if label.startswith('r'):
-                    if label not in {'r0', 'r1', 'r2', 'r3', 'r4', 'r5', 'r6', 'r7', 'r8', 'r9', 'r10', 'r11', 'r12', 'r13', 'r14', 'r15'}:
-                        self.errors.append(f"Error: Invalid register '{label}' for {instruction.mnemonic}")
-                elif label not in self.symbol_table and label not in self.external_symbols:
-                    self.errors.append(f"Error: Invalid operand '{label}' for {instruction.mnemonic}")
+    def validate_label_references(self, instruction: Instruction):
+        if instruction.mnemonic not in self.LABEL_BRANCH_INSTRUCTIONS:
+            return
+        if not instruction.operands:
+            self.report('missing-label-operand', instruction.mnemonic)
+            return
+
+        label = instruction.operands[0]
+        if instruction.mnemonic in REGISTER_BRANCHES and label in self.VALID_REGISTERS:
+            return      # register target, checked by validate_branch
+
+        if label not in self.symbol_table:
+            if label not in self.external_symbols:
+                self.report('undefined-label', label)
+            return
+
+        # Different instructions have different range limits, measured from pc (own address + 8)
+        branch_distance = self.symbol_table[label] - (self.instruction_address + 8)
+        low, high = self.branch_range(instruction.mnemonic)
+        if not (low <= branch_distance <= high):
+            if instruction.mnemonic in self.UNCONDITIONAL_LABEL_BRANCHES:
+                self.report('branch-out-of-range', label, instruction.mnemonic)
+            else:  # Conditional branches have a smaller range
+                self.report('conditional-branch-out-of-range', label, instruction.mnemonic)
+
+    @classmethod
+    def branch_range(cls, mnemonic: str) -> Tuple[int, int]:
+        """Lowest and highest distance from pc a label branch can reach."""
+        if mnemonic in cls.UNCONDITIONAL_LABEL_BRANCHES:
+            return -33554432, 33554428
+        return -1048576, 1048572
 
     def validate_type_mismatch(self, instruction: Instruction):
         # Define instruction sets
-        arithmetic_instructions = {'add', 'sub', 'rsb', 'adc', 'sbc', 'rsc', 'mul', 'mla'}
-        logical_instructions = {'and', 'orr', 'eor', 'bic'}
-        data_processing_instructions = arithmetic_instructions.union(logical_instructions)
+        arithmetic_instructions = self.ARITHMETIC_INSTRUCTIONS
+        data_processing_instructions = self.DATA_PROCESSING_INSTRUCTIONS
         #floating_point_instructions = {'vadd', 'vsub', 'vmul', 'vdiv'}
         
         def is_register(op):
@@ -390,12 +532,12 @@ class SemanticAnalyzer:
             has_integer = any(op.startswith('r') for op in instruction.operands)
             has_float = any(op.startswith('s') or op.startswith('d') for op in instruction.operands)
             if has_integer and has_float:
-                self.errors.append(f"Error: Mixing integer and floating-point operands in '{instruction.mnemonic}'")
+                self.report('mixed-int-float', instruction.mnemonic)
         
         # Check for using floating-point registers in integer operations and vice versa
         if instruction.mnemonic in data_processing_instructions:
             if any(op.startswith('s') or op.startswith('d') for op in instruction.operands):
-                self.errors.append(f"Error: Using floating-point registers in integer operation '{instruction.mnemonic}'")
+                self.report('float-register-in-integer-op', instruction.mnemonic)
         # elif instruction.mnemonic in floating_point_instructions:
         #     if any(op.startswith('r') for op in instruction.operands):
         #         self.errors.append(f"Error: Using integer registers in floating-point operation '{instruction.mnemonic}'")
@@ -430,7 +572,7 @@ class SemanticAnalyzer:
             # Symbol visibility directives
             elif instruction.mnemonic in ['.global', '.hidden']:
                 if len(instruction.operands) < 1:
-                    self.errors.append(f"Error: {instruction.mnemonic} directive requires at least one symbol")
+                    self.report('directive-needs-symbol', instruction.mnemonic)
                 else:
                     for symbol in instruction.operands:
                         if instruction.mnemonic == '.global':
@@ -441,7 +583,7 @@ class SemanticAnalyzer:
             # External symbol directive
             elif instruction.mnemonic == '.extern':
                 if len(instruction.operands) < 1:
-                    self.errors.append("Error: .extern directive requires at least one symbol")
+                    self.report('directive-needs-symbol', '.extern')
                 else:
                     for symbol in instruction.operands:
                         self.external_symbols.add(symbol)
@@ -449,7 +591,7 @@ class SemanticAnalyzer:
             # Function attribute directive
             elif instruction.mnemonic == '.noreturn':
                 if not self.current_function:
-                    self.errors.append("Error: .noreturn directive must be within a function")
+                    self.report('noreturn-outside-function')
                 else:
                     self.current_function.no_return = True
             
@@ -468,14 +610,52 @@ class SemanticAnalyzer:
             #         # Implementation depends on how you're handling data in your assembler
             #         pass
             
-            # # Literal pool directive
-            # elif instruction.mnemonic == '.ltorg':
-            #     # Implementation depends on how you're handling literal pools in your assembler
-            #     pass
+            # Literal pool directive; LiteralPools replaces it with the pool's .word entries
+            elif instruction.mnemonic == '.ltorg':
+                pass
+
+            # Literal-pool entry
+            elif instruction.mnemonic == '.word':
+                word = decode_operand(instruction.operands[0]) if len(instruction.operands) == 1 else None
+                if not isinstance(word, Immediate) or word.value is None or not -2**31 <= word.value < 2**32:
+                    self.report('invalid-immediate', '.word')
             
             # Unrecognized directive
             else:
-                self.errors.append(f"Error: Unrecognized directive {instruction.mnemonic}")
+                self.report('unrecognized-directive', instruction.mnemonic)
+
+
+# Instruction rows, finished symbol table, declared symbols, control-flow graph and dataflow,
+# installed once per worker process
+_rows: List[Tuple[str, str, List[str]]] = []
+_symbol_table: Dict[str, int] = {}
+_symbols: Tuple[set, set, set] = (set(), set(), set())      # global, hidden and external symbols
+_cfg: ControlFlowGraph = None
+_dataflow: ConstantPropagation = None
+
+def _set_shared_state(rows: List[Tuple[str, str, List[str]]], symbol_table: Dict[str, int],
+                      symbols: Tuple[set, set, set], cfg: ControlFlowGraph, dataflow: ConstantPropagation):
+    global _rows, _symbol_table, _symbols, _cfg, _dataflow
+    _rows = rows
+    _symbol_table = symbol_table
+    _symbols = symbols
+    _cfg = cfg
+    _dataflow = dataflow
+
+def validate_chunk(bounds: Tuple[int, int]) -> List[Diagnostic]:
+    """Errors for rows[start:end] of the shared (mnemonic, condition, operands) rows, in source order."""
+    start, end = bounds
+    analyzer = SemanticAnalyzer([])
+    analyzer.symbol_table = _symbol_table
+    analyzer.global_symbols, analyzer.hidden_symbols, analyzer.external_symbols = _symbols
+    states = _dataflow.states(start, end) if _dataflow is not None else None
+    for index, (mnemonic, condition, operands) in enumerate(_rows[start:end], start):
+        analyzer.instruction_index = index
+        analyzer.instruction_address = _cfg.addresses[index]
+        if states is not None:
+            analyzer.register_state = next(states)
+        analyzer.validate_instruction(Instruction(mnemonic, condition, operands))
+    return analyzer.errors
 
 
 # if __name__ == "__main__":
@@ -0,0 +1,280 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from array import array
+from bisect import bisect_left
+from typing import List, Dict, Union, Optional, Tuple
+from enum import Enum
+from Parser import Label, Instruction
+from Operands import Operand, Register, Immediate, LabelRef, MemOperand
+from CFG import BRANCH_MNEMONICS, NO_DESTINATION
+
+class SymbolType(Enum):
+    LABEL = "LABEL"          # For branch targets
+    VARIABLE = "VARIABLE"    # For memory variables
+    CONSTANT = "CONSTANT"    # For immediate values
+    REGISTER = "REGISTER"    # For register usage
+    MEMORY = "MEMORY"        # For memory access
+
+class DataType(Enum):
+    WORD = 4      # 32-bit
+    HALFWORD = 2  # 16-bit
+    BYTE = 1      # 8-bit
+    ADDRESS = 4   # Address/pointer
+
+class LabelSymbol:
+    __slots__ = ('name', 'address', 'references')
+    type = SymbolType.LABEL
+    size = 0  # Labels don't have size
+
+    def __init__(self, name: str, address: Optional[int]):
+        self.name = name
+        self.address = address              # None while only forward references are known
+        self.references = array('I')        # addresses of the branches to this label
+
+class ConstantSymbol:
+    __slots__ = ('name', 'value', 'size', 'uses')
+    type = SymbolType.CONSTANT
+
+    def __init__(self, name: str, value: str, size: int):
+        self.name = name
+        self.value = value
+        self.size = size
+        self.uses = array('I')
+
+    @property
+    def first_use(self) -> int:
+        return self.uses[0]
+
+class MemorySymbol:
+    __slots__ = ('name', 'base_register', 'offset', 'pre_indexed', 'post_indexed', 'accesses')
+    type = SymbolType.MEMORY
+
+    def __init__(self, name: str, base_register: str, offset: int, pre_indexed: bool, post_indexed: bool):
+        self.name = name
+        self.base_register = base_register
+        self.offset = offset
+        self.pre_indexed = pre_indexed
+        self.post_indexed = post_indexed
+        self.accesses = array('I')
+
+    @property
+    def first_use(self) -> int:
+        return self.accesses[0]
+
+class RegisterUsage:
+    __slots__ = ('num', 'read_count', 'write_count', 'instructions')
+
+    def __init__(self, num: int):
+        self.num = num
+        self.read_count = 0
+        self.write_count = 0
+        self.instructions = array('I')      # addresses of the instructions that read or write it
+
+    @property
+    def first_use(self) -> int:
+        return self.instructions[0]
+
+Symbol = Union[LabelSymbol, ConstantSymbol, MemorySymbol]
+
+class SymbolTableGenerator:
+    """
+    Cross-reference database of labels, constants, memory accesses and registers.
+
+    Filled by SemanticAnalyzer while it validates (pass it as
+    SemanticAnalyzer(ast, cross_reference=...)) rather than by a separate
+    traversal. Reference lists are array('I') of instruction addresses and
+    the records are slotted, so queries are dictionary or array lookups:
+    references(name), at(address) and register_instructions(num).
+    """
+
+    def __init__(self):
+        self.symbol_table: Dict[str, Symbol] = {}
+        self.current_address = 0
+        self.INSTRUCTION_SIZE = 4
+        self.stack_offset = 0
+        self.register_usage: List[Optional[RegisterUsage]] = [None] * 16
+        self.instruction_addresses = array('I')         # ascending, one per instruction
+        self.labels_at: Dict[int, List[str]] = {}
+
+    def add_label(self, name: str, address: int):
+        symbol = self.symbol_table.get(name)
+        if symbol is None:
+            self.symbol_table[name] = LabelSymbol(name, address)
+        elif isinstance(symbol, LabelSymbol) and symbol.address is None:
+            symbol.address = address
+        else:
+            return      # duplicate definition, reported by the analyzer
+        self.labels_at.setdefault(address, []).append(name)
+
+    def add_instruction(self, mnemonic: str, operands: Tuple[Operand, ...], address: int):
+        """Record one instruction's decoded operands at address."""
+        self.current_address = address
+        self.instruction_addresses.append(address)
+        op = mnemonic.lower()
+
+        # Track register usage
+        writes_first = op not in NO_DESTINATION
+        for position, operand in enumerate(operands):
+            if isinstance(operand, Register):
+                self.use_register(operand.num, write=position == 0 and writes_first)
+            elif isinstance(operand, MemOperand):
+                for part in (operand.base, operand.offset):
+                    if isinstance(part, Register):
+                        self.use_register(part.num, write=False)
+
+        # Analyze memory operations
+        if op in ['ldr', 'str']:
+            self.analyze_memory_operation(operands)
+
+        # Track constants
+        for operand in operands:
+            if isinstance(operand, Immediate):
+                self.add_constant(operand)
+            elif isinstance(operand, MemOperand) and isinstance(operand.offset, Immediate):
+                self.add_constant(operand.offset)
+
+        # Handle branch references
+        if op in BRANCH_MNEMONICS and operands and isinstance(operands[-1], LabelRef):
+            target = self.symbol_table.get(operands[-1].name)
+            if target is None:
+                # Forward reference
+                target = self.symbol_table[operands[-1].name] = LabelSymbol(operands[-1].name, None)
+            if isinstance(target, LabelSymbol):
+                target.references.append(address)
+
+    def use_register(self, num: int, write: bool):
+        usage = self.register_usage[num]
+        if usage is None:
+            usage = self.register_usage[num] = RegisterUsage(num)
+        if write:
+            usage.write_count += 1
+        else:
+            usage.read_count += 1
+        # An instruction naming a register twice is listed once
+        if not usage.instructions or usage.instructions[-1] != self.current_address:
+            usage.instructions.append(self.current_address)
+
+    def analyze_memory_operation(self, operands: Tuple[Operand, ...]):
+        """Analyze memory access operations."""
+        position = next((i for i, operand in enumerate(operands) if isinstance(operand, MemOperand)), None)
+        if position is None or not isinstance(operands[position].base, Register):
+            return
+        address = operands[position]
+        post_indexed = position + 1 < len(operands)
+        offset_operand = operands[position + 1] if post_indexed else address.offset
+        offset = offset_operand.value if isinstance(offset_operand, Immediate) and offset_operand.value is not None else 0
+        self.add_memory_access(address.base.name, offset, address.writeback, post_indexed)
+
+    def add_constant(self, operand: Immediate):
+        """Add constant to symbol table."""
+        value = operand.text[1:]
+        const_name = f"const_{value}"
+        symbol = self.symbol_table.get(const_name)
+        if symbol is None:
+            int_val = operand.value
+            if int_val is None:
+                size = 4  # Default to word size
+            else:
+                size = 1 if -128 <= int_val <= 127 else (2 if -32768 <= int_val <= 32767 else 4)
+            symbol = self.symbol_table[const_name] = ConstantSymbol(const_name, value, size)
+        symbol.uses.append(self.current_address)
+
+    def add_memory_access(self, base_register: str, offset: int, pre_indexed: bool, post_indexed: bool):
+        """Add memory access information to symbol table."""
+        access_name = f"mem_{base_register}_{offset}"
+        symbol = self.symbol_table.get(access_name)
+        if symbol is None:
+            symbol = self.symbol_table[access_name] = MemorySymbol(access_name, base_register, offset, pre_indexed, post_indexed)
+        symbol.accesses.append(self.current_address)
+
+    def references(self, name: str) -> array:
+        """Addresses of the instructions that reference name (branches, constant uses or memory accesses)."""
+        symbol = self.symbol_table.get(name)
+        if symbol is None:
+            return array('I')
+        if isinstance(symbol, LabelSymbol):
+            return symbol.references
+        return symbol.uses if isinstance(symbol, ConstantSymbol) else symbol.accesses
+
+    def at(self, address: int) -> Tuple[List[str], Optional[int]]:
+        """Labels defined at address and the index of the instruction there (None if there is none)."""
+        index = bisect_left(self.instruction_addresses, address)
+        if index == len(self.instruction_addresses) or self.instruction_addresses[index] != address:
+            index = None
+        return self.labels_at.get(address, []), index
+
+    def register_instructions(self, num: int) -> array:
+        """Addresses of the instructions that read or write register num."""
+        usage = self.register_usage[num]
+        return usage.instructions if usage is not None else array('I')
+
+    def print_symbol_table(self):
+        """Print comprehensive symbol table."""
+        print("\n=== Comprehensive Symbol Table ===")
+
+        # Print Labels
+        print("\n--- Labels ---")
+        print(f"{'Name':<15} {'Address':<10} {'References':<30}")
+        print("-" * 55)
+        for name, info in self.symbol_table.items():
+            if info.type == SymbolType.LABEL:
+                addr = f"0x{info.address:04x}" if info.address is not None else "UNDEFINED"
+                refs = ', '.join(f"0x{ref:04x}" for ref in info.references)
+                print(f"{name:<15} {addr:<10} {refs:<30}")
+
+        # Print Constants
+        print("\n--- Constants ---")
+        print(f"{'Name':<15} {'Value':<10} {'Size':<8} {'Uses':<30}")
+        print("-" * 63)
+        for name, info in self.symbol_table.items():
+            if info.type == SymbolType.CONSTANT:
+                uses = ', '.join(f"0x{use:04x}" for use in info.uses)
+                print(f"{name:<15} {info.value:<10} {info.size:<8} {uses:<30}")
+
+        # Print Memory Accesses
+        print("\n--- Memory Accesses ---")
+        print(f"{'Name':<20} {'Base Reg':<10} {'Offset':<8} {'Index Type':<15} {'Accesses':<30}")
+        print("-" * 83)
+        for name, info in self.symbol_table.items():
+            if info.type == SymbolType.MEMORY:
+                index_type = "Pre-indexed" if info.pre_indexed else ("Post-indexed" if info.post_indexed else "Offset")
+                accesses = ', '.join(f"0x{acc:04x}" for acc in info.accesses)
+                print(f"{name:<20} {info.base_register:<10} {info.offset:<8} {index_type:<15} {accesses:<30}")
+
+        # Print Register Usage
+        print("\n--- Register Usage ---")
+        print(f"{'Register':<10} {'First Use':<12} {'Read Count':<12} {'Write Count':<12}")
+        print("-" * 46)
+        for info in self.register_usage:
+            if info is not None:
+                print(f"R{info.num:<9} 0x{info.first_use:04x}    {info.read_count:<12} {info.write_count:<12}")
+
+def process_assembly(ast: List[Union[Label, Instruction]]):
+    from Semantic_Analyzer.Semantic_Analyzer import SemanticAnalyzer
+    generator = SymbolTableGenerator()
+    SemanticAnalyzer(ast, cross_reference=generator).analyze()
+    return generator
+
+# Test the enhanced symbol table generator; run from Assembler/ as python -m Semantic_Analyzer.Symbol_Table
+def main():
+    test_ast = [
+        Instruction("mov", "", ["r0", "#5"]),
+        Instruction("add", "", ["r1", "r2", "r3"]),
+        Instruction("bne", "", ["label1"]),
+        Label("label1"),
+        Instruction("ldr", "", ["r4", "[", "r5", "]"]),
+        Instruction("cmp", "", ["r0", "#10"]),
+        Instruction("beq", "", ["exit"]),
+        Instruction("str", "", ["r1", "[", "sp", "#-4", "]", "!"]),
+        Label("exit")
+    ]
+
+    try:
+        generator = process_assembly(test_ast)
+        generator.print_symbol_table()
+    except ValueError as e:
+        print(f"Error: {e}")
+
+if __name__ == "__main__":
+    main()
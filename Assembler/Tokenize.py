@@ -93,6 +93,7 @@
 
 
 import re
+from array import array
 
 class Tokenizer:
     """
@@ -102,7 +103,12 @@ class Tokenizer:
     TOKEN_TYPES = {
         'REGISTER': r'\b(?:r1[0-5]|r[0-9]|sp|lr|pc)\b',  # Registers including sp, lr, pc
         'LABEL_DEF': r'(?:^|(?<=\n))\s*([a-zA-Z_][a-zA-Z_0-9]*):',  # Label definition with colon, including local labels
-        'DIRECTIVE': r'\b(?:.arch|.arm|.code16|.code32|.cpu|.eabi|.extern|.global|.hidden|.nocode|.noreturn|.section|.text|.data|.bss|.align|.fill|.ltorg)\b',
+        # A '.' followed by a known directive name, not preceded by a word character or another '.'.
+        # The original pattern (\b.arch|... , see the commented-out copy above) let '.' match any
+        # character and needed a word boundary before it, so real directives never matched and words
+        # such as 'marm' did. Directive tokens become Instruction nodes whose mnemonic keeps the
+        # '.' (see Parser.MNEMONIC_TOKENS); the analyzer's process_directive handles them.
+        'DIRECTIVE': r'(?<![\w.])\.(?:arch|arm|code16|code32|cpu|eabi|extern|global|hidden|nocode|noreturn|section|text|data|bss|align|fill|ltorg)\b',
         
         'INSTRUCTION': r'\b(?:' + 
                     r'(?:add|sub|rsb|adc|sbc|rsc|and|orr|eor|bic|mov|mvn)|' +  # Data processing
@@ -126,6 +132,7 @@ class Tokenizer:
                     r')\b',
                 
         'IMMEDIATE': r'#-?(?:0x[0-9a-fA-F]+|\d+)',  # Immediate values, including hexadecimal
+        'LITERAL': r'=-?(?:0x[0-9a-fA-F]+|\d+)',  # ldr rX, =value (placed in a literal pool)
 
         # 'CONDITION': r'\b(?:eq|ne|cs|cc|mi|pl|vs|vc|hi|ls|ge|lt|gt|le|al)\b',  # ARM condition codes
         # Add if required 
@@ -143,6 +150,15 @@ class Tokenizer:
     # Compile regular expressions for each token type
     TOKEN_REGEX = {token: re.compile(pattern) for token, pattern in TOKEN_TYPES.items()}
 
+    # Single alternation of every token type, tried in the same order as TOKEN_TYPES.
+    # The capture group inside LABEL_DEF is made non-capturing so that lastgroup
+    # always names the token type.
+    MASTER_REGEX = re.compile('|'.join(
+        f"(?P<{token}>{pattern.replace('([', '(?:[')})" for token, pattern in TOKEN_TYPES.items()
+    ))
+
+    SKIP_TOKENS = frozenset({'WHITESPACE', 'COMMENT'})
+
     def __init__(self, input_code):
         """
         Initialize the Tokenizer with the input code.
@@ -155,6 +171,60 @@ class Tokenizer:
         Tokenize the input code and return a list of tokens.
         """
         tokens = []
+        for line_num, line in enumerate(self.lines, 1):
+            tokens.extend(self.tokenize_line(line, line_num))
+        return tokens   # Instruction type - instruction - line no
+
+    def tokenize_stream(self):
+        """
+        Tokenize the input code into a compact TokenStream instead of a list of tuples.
+        """
+        stream = TokenStream()
+        for line_num, line in enumerate(self.lines, 1):
+            stream.extend(self.tokenize_line(line, line_num))
+        return stream
+
+    @classmethod
+    def iter_tokens(cls, fileobj):
+        """
+        Lazily tokenize a file object (or any iterable of lines), one line at a time.
+        Yields the same (type, value, line) tuples as tokenize().
+        """
+        for line_num, line in enumerate(fileobj, 1):
+            if line.endswith('\n'):
+                line = line[:-1]
+            yield from cls.tokenize_line(line, line_num)
+
+    @classmethod
+    def tokenize_line(cls, line, line_num):
+        """
+        Tokenize a single line with one master-regex match per token.
+        """
+        tokens = []
+        match = cls.MASTER_REGEX.match
+        skip = cls.SKIP_TOKENS
+        index = 0
+        end = len(line)
+        while index < end:
+            m = match(line, index)
+            if m is None:
+                print(f"Failed at line {line_num}, index {index}, char '{line[index]}'")
+                raise ValueError(f"Unexpected character at line {line_num}, index {index}: {line[index]}")
+            token_type = m.lastgroup
+            if token_type == 'LABEL_DEF':
+                tokens.append((token_type, m.group().strip()[:-1], line_num))  # Label without the colon
+                tokens.append(('COLON', ':', line_num))
+            elif token_type not in skip:
+                tokens.append((token_type, m.group(), line_num))
+            index = m.end()
+        return tokens
+
+    def tokenize_reference(self):
+        """
+        Original tokenizer: try every TOKEN_REGEX entry in turn at each position.
+        Kept as the reference implementation for benchmark.py.
+        """
+        tokens = []
         for line_num, line in enumerate(self.lines, 1):
             index = 0
             while index < len(line):
@@ -176,3 +246,74 @@ class Tokenizer:
                     raise ValueError(f"Unexpected character at line {line_num}, index {index}: {line[index]}")
         
         return tokens   # Instruction type - instruction - line no
+
+
+class TokenStream:
+    """
+    Array-backed token container.
+
+    Token types are stored as ids in an array('B'), values as ids into an
+    interned string table in an array('I'), and line numbers in an array('I'),
+    so a million tokens cost a few megabytes instead of a million tuples.
+    Indexing still returns a (type, value, line) tuple for compatibility.
+    """
+
+    TYPE_NAMES = tuple(Tokenizer.TOKEN_TYPES) + ('COLON',)
+    TYPE_IDS = {name: i for i, name in enumerate(TYPE_NAMES)}
+
+    def __init__(self):
+        self.types = array('B')
+        self.values = array('I')
+        self.lines = array('I')
+        self.strings = []           # value id -> string
+        self.string_ids = {}        # string -> value id
+
+    @classmethod
+    def from_tokens(cls, tokens):
+        """
+        Build a TokenStream from an iterable of (type, value, line) tuples.
+        """
+        stream = cls()
+        stream.extend(tokens)
+        return stream
+
+    def intern(self, value):
+        value_id = self.string_ids.get(value)
+        if value_id is None:
+            value_id = len(self.strings)
+            self.strings.append(value)
+            self.string_ids[value] = value_id
+        return value_id
+
+    def append(self, token_type, value, line_num):
+        self.types.append(self.TYPE_IDS[token_type])
+        self.values.append(self.intern(value))
+        self.lines.append(line_num)
+
+    def extend(self, tokens):
+        for token_type, value, line_num in tokens:
+            self.append(token_type, value, line_num)
+
+    def type_name(self, index):
+        return self.TYPE_NAMES[self.types[index]]
+
+    def value(self, index):
+        return self.strings[self.values[index]]
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, index):
+        return (self.TYPE_NAMES[self.types[index]], self.strings[self.values[index]], self.lines[index])
+
+    def __iter__(self):
+        names = self.TYPE_NAMES
+        strings = self.strings
+        for type_id, value_id, line_num in zip(self.types, self.values, self.lines):
+            yield (names[type_id], strings[value_id], line_num)
+
+    def nbytes(self):
+        """
+        Approximate memory held by the arrays (excluding the shared string table).
+        """
+        return sum(a.itemsize * len(a) for a in (self.types, self.values, self.lines))
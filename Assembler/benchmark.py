@@ -0,0 +1,492 @@
+"""
+Micro-benchmarks for the assembler pipeline.
+
+The bundled sample programs are concatenated (with labels renamed per copy so
+they stay unique) to build large sources, and each benchmark times the new code
+path against the one it replaces after checking that both give the same result.
+
+Run from the Assembler directory:  python benchmark.py [copies]
+"""
+import glob
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+from Tokenize import Tokenizer
+from Parser import Instruction, Parser, InstructionTable
+from FastParser import FastParser
+from Semantic_Analyzer.Semantic_Analyzer import SemanticAnalyzer
+from Code_generator import CodeGenerator
+from Operands import decode_operand
+from BatchEncoder import BatchEncoder, np
+from opcode_table import opcode_table
+
+SAMPLE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+LABEL_DEF_RE = re.compile(r'^\s*([a-zA-Z_][a-zA-Z_0-9]*):', re.MULTILINE)
+
+
+class LegacySemanticAnalyzer(SemanticAnalyzer):
+    """SemanticAnalyzer with the original per-call sets and if/elif operand checks."""
+
+    def validate_mnemonic(self, instruction: Instruction):
+        valid_mnemonics = {
+            'add', 'sub', 'rsb', 'adc', 'sbc', 'rsc', 'and', 'orr', 'eor', 'bic', 'mov', 'mvn',
+            'mul', 'mla', 'umull', 'umlal', 'smull', 'smlal',
+            'cmp', 'cmn',
+            'ldr', 'str', 'ldrb', 'strb', 'ldrh', 'strh', 'ldm', 'stm',
+            'b', 'bl', 'bx', 'blx',
+            'bal',  'beq',  'bne',  'bpl',  'bmi',  'bcc',  'blo',  'bcs',  'bhs',  'bvc',  'bcs',  'bgt','bge','blt','ble', 'bhi','bls',
+            'lsl', 'lsr', 'asr', 'ror', 'rrx',
+            'mrs', 'msr',
+            'swi', 'svc', 'bkpt',
+        }
+        if instruction.mnemonic not in valid_mnemonics:
+            self.errors.append(f"Error: Invalid mnemonic '{instruction.mnemonic}'")
+
+    def is_valid_register(self, op):
+            return op in {f'r{i}' for i in range(16)} | {'sp', 'lr', 'pc'}
+
+    def is_valid_immediate(self, op):
+        if not op.startswith('#'):
+            return False
+        try:
+            value = int(op[1:], 0)  # 0 as base allows for hex and binary literals
+            return -2**31 <= value < 2**31
+        except ValueError:
+            return False
+
+    def is_valid_address_operands(self, operands):
+        if len(operands) == 0 or not self.is_valid_register(operands[0]):
+            return False
+        if len(operands) == 1:
+            return True
+        if len(operands) == 2:
+            return self.is_valid_immediate(operands[1]) or self.is_valid_register(operands[1])
+        if len(operands) == 3:
+            return (self.is_valid_register(operands[1]) and
+                    (operands[2] in {'lsl', 'lsr', 'asr', 'ror'} or self.is_valid_immediate(operands[2])))
+        return False
+    
+    def validate_operands(self, instruction: Instruction):
+        operand_count = len(instruction.operands)
+        mnemonic = instruction.mnemonic.lower()
+
+        def is_valid_shifted_register(op):
+            parts = op.split()
+            if len(parts) != 3 or parts[1] not in {'lsl', 'lsr', 'asr', 'ror'}:
+                return False
+            return self.is_valid_register(parts[0]) and self.is_valid_immediate(parts[2])
+
+        # Instruction-specific checks
+        if mnemonic in {'mov', 'mvn', 'cmp', 'cmn', 'tst', 'teq'}:
+            if operand_count != 2:
+                self.errors.append(f"Error: '{mnemonic}' instruction requires exactly 2 operands")
+            elif not self.is_valid_register(instruction.operands[0]):
+                self.errors.append(f"Error: Invalid destination register in '{mnemonic}'")
+            elif not (self.is_valid_register(instruction.operands[1]) or 
+                    self.is_valid_immediate(instruction.operands[1]) or 
+                    is_valid_shifted_register(instruction.operands[1])):
+                self.errors.append(f"Error: Invalid source operand in '{mnemonic}'")
+
+        elif mnemonic in {'add', 'sub', 'rsb', 'adc', 'sbc', 'rsc', 'and'}:             #'orr', 'eor', 'bic'
+            if operand_count != 3:
+                self.errors.append(f"Error: '{mnemonic}' instruction requires exactly 3 operands")
+            elif not self.is_valid_register(instruction.operands[0]):
+                self.errors.append(f"Error: Invalid destination register in '{mnemonic}'")
+            elif not self.is_valid_register(instruction.operands[1]):
+                self.errors.append(f"Error: Invalid first source register in '{mnemonic}'")
+            elif not (self.is_valid_register(instruction.operands[2]) or 
+                    self.is_valid_immediate(instruction.operands[2]) or 
+                    is_valid_shifted_register(instruction.operands[2])):
+                self.errors.append(f"Error: Invalid second source operand in '{mnemonic}'")
+
+        elif mnemonic in {'mul', 'mla'}:
+            if operand_count not in {3, 4}:
+                self.errors.append(f"Error: '{mnemonic}' instruction requires 3 or 4 operands")
+            elif not all(self.is_valid_register(op) for op in instruction.operands):
+                self.errors.append(f"Error: Invalid register in '{mnemonic}'")
+
+        elif mnemonic in {'umull'}:         #, 'umlal', 'smull', 'smlal'
+            if operand_count != 4:
+                self.errors.append(f"Error: '{mnemonic}' instruction requires exactly 4 operands")
+            elif not all(self.is_valid_register(op) for op in instruction.operands):
+                self.errors.append(f"Error: Invalid register in '{mnemonic}'")
+
+        elif mnemonic in {'ldr', 'str', 'ldrb', 'strb', 'ldrh', 'strh'}:
+            if operand_count < 3:  # Need at least: register, '[', and base register
+                self.errors.append(f"Error: '{mnemonic}' instruction requires at least 3 operands")
+                return
+
+            if not self.is_valid_register(instruction.operands[0]):
+                self.errors.append(f"Error: Invalid destination register '{instruction.operands[0]}' in {mnemonic}")
+                return
+
+            if instruction.operands[1] != '[':
+                self.errors.append(f"Error: Expected '[' in {mnemonic} addressing mode")
+                return
+
+            # Find the closing bracket and exclamation mark
+            closing_bracket_index = None
+            has_exclamation = False
+            for i, op in enumerate(instruction.operands[2:], start=2):
+                if op == ']':
+                    closing_bracket_index = i
+                    if i+1 < operand_count:
+                        if instruction.operands[i+1] == '!':
+                            has_exclamation = True
+                        else:
+                            self.errors.append(f"Error: Unexpected operands after '!' in {mnemonic}")
+                    break
+
+            if closing_bracket_index is None:
+                self.errors.append(f"Error: Missing closing ']' in {mnemonic} addressing mode")
+                return
+
+            # Validate the addressing mode
+            address_operands = instruction.operands[2:closing_bracket_index]
+            if not self.is_valid_address_operands(address_operands):
+                self.errors.append(f"Error: Invalid addressing mode in {mnemonic}")
+
+            # Check for post-indexed addressing or writeback
+            # if not has_exclamation:
+            #     post_index_operands = instruction.operands[closing_bracket_index+1:]
+            #     print("post ]")
+            #     print(post_index_operands)
+            #     if not self.is_valid_post_index_operands(post_index_operands):
+            #         self.errors.append(f"Error: Invalid post-indexed addressing in {mnemonic}")
+
+
+        elif mnemonic in {'ldm', 'stm'}:
+            if operand_count < 2:
+                self.errors.append(f"Error: '{mnemonic}' instruction requires at least 2 operands")
+            elif not self.is_valid_register(instruction.operands[0]):
+                self.errors.append(f"Error: Invalid base register in '{mnemonic}'")
+            elif not all(self.is_valid_register(op) for op in instruction.operands[1:]):
+                self.errors.append(f"Error: Invalid register list in '{mnemonic}'")
+
+        elif mnemonic in {'b', 'bl', 'bx', 'blx', 'bal', 'beq', 'bne', 'bpl', 'bmi', 'bcc', 'blo', 'bcs', 'bhs', 'bvc', 'bvs', 'bgt', 'bge', 'blt', 'ble', 'bhi', 'bls'}:
+            if operand_count != 1:
+                self.errors.append(f"Error: '{mnemonic}' instruction requires exactly 1 operand")
+            elif mnemonic in {'bx', 'blx'} and not self.is_valid_register(instruction.operands[0]):
+                self.errors.append(f"Error: Invalid register in '{mnemonic}'")
+
+        elif mnemonic in {'lsl', 'lsr', 'asr', 'ror'}:
+            if operand_count != 3:
+                self.errors.append(f"Error: '{mnemonic}' instruction requires exactly 3 operands")
+            elif not all(self.is_valid_register(op) for op in instruction.operands[:2]):
+                self.errors.append(f"Error: Invalid register in '{mnemonic}'")
+            elif not self.is_valid_immediate(instruction.operands[2]):
+                self.errors.append(f"Error: Invalid shift amount in '{mnemonic}'")
+
+        elif mnemonic == 'rrx':
+            if operand_count != 2:
+                self.errors.append(f"Error: '{mnemonic}' instruction requires exactly 2 operands")
+            elif not all(self.is_valid_register(op) for op in instruction.operands):
+                self.errors.append(f"Error: Invalid register in '{mnemonic}'")
+
+        elif mnemonic in {'mrs', 'msr'}:
+            if operand_count != 2:
+                self.errors.append(f"Error: '{mnemonic}' instruction requires exactly 2 operands")
+            elif mnemonic == 'mrs' and not self.is_valid_register(instruction.operands[0]):
+                self.errors.append(f"Error: Invalid destination register in '{mnemonic}'")
+            elif mnemonic == 'msr' and instruction.operands[0] not in {'cpsr', 'spsr'}:
+                self.errors.append(f"Error: Invalid status register in '{mnemonic}'")
+
+        elif mnemonic in {'swi', 'svc', 'bkpt'}:
+            if operand_count != 1:
+                self.errors.append(f"Error: '{mnemonic}' instruction requires exactly 1 operand")
+            elif not self.is_valid_immediate(instruction.operands[0]):
+                self.errors.append(f"Error: Invalid immediate value in '{mnemonic}'")
+
+        else:
+            self.errors.append(f"Warning: Unknown instruction '{mnemonic}'. Unable to validate operands.")
+
+
+class LegacyCodeGenerator(CodeGenerator):
+    """CodeGenerator with the original if/elif encoder instead of the template table."""
+
+    def encode_instruction(self, instruction: Instruction) -> int:
+        """Original encoder: re-derives the format from list-membership tests on every call."""
+        if instruction.mnemonic == '.word':
+            return self.encode_word(instruction.operands[0])
+        mnemonic = instruction.mnemonic.upper()
+        condition = instruction.condition.upper() if instruction.condition else ''
+        full_mnemonic = f"{mnemonic}{condition}"
+        
+        if full_mnemonic not in opcode_table:
+            raise ValueError(f"Unsupported mnemonic: {full_mnemonic}")
+
+        opcode = opcode_table[full_mnemonic]
+        operand_count = len(instruction.operands)
+        
+        # Initialize instruction fields
+        itype = opcode >> 6  # Extract instruction type (bits 6-7)
+        u_ctrl = opcode & 0x3F  # Extract control signals (bits 0-5)
+        rd_addr = 0
+        rm_addr = 0
+        rn_addr = 0  # Added for third register in 3-operand instructions
+        is_imm = 0
+        value = 0
+
+        # Branch instructions (B, BL, BLX, BX)
+        if mnemonic in self.BRANCH_MNEMONICS:
+            target = instruction.operands[0]
+            if target.startswith('#'):
+                # Direct immediate value
+                is_imm = 1
+                value = self.encode_immediate(target)
+            else:
+                # Label resolution
+                if target in self.symbol_table:
+                    # Use the address from symbol table
+                    value = self.symbol_table[target] & 0x7FFF
+                    is_imm = 1
+                elif target.startswith('r'):
+                    # Register-based branch
+                    rm_addr = self.encode_register(target)
+                else:
+                    raise ValueError(f"Invalid branch target: {target}")
+
+        # System instructions (SWI, CLZ, MSR, MRS)
+        elif mnemonic in ['SWI', 'CLZ', 'MSR', 'MRS']:
+            if instruction.operands[0].startswith('#'):
+                is_imm = 1
+                value = self.encode_immediate(instruction.operands[0])
+            else:
+                rd_addr = self.encode_register(instruction.operands[0])
+
+        # Compare instructions (CMP, CMN, TEQ, TST)
+        elif mnemonic in ['CMP', 'CMN', 'TEQ', 'TST']:
+            rd_addr = self.encode_register(instruction.operands[0])
+            if instruction.operands[1].startswith('#'):
+                is_imm = 1
+                value = self.encode_immediate(instruction.operands[1])
+            else:
+                rm_addr = self.encode_register(instruction.operands[1])
+
+        # Data movement (MOV, MVN)
+        elif mnemonic in ['MOV', 'MVN']:
+            rd_addr = self.encode_register(instruction.operands[0])
+            if instruction.operands[1].startswith('#'):
+                is_imm = 1
+                value = self.encode_immediate(instruction.operands[1])
+            else:
+                rm_addr = self.encode_register(instruction.operands[1])
+
+        # Memory operations (LDR, STR)
+        elif mnemonic in ['LDR', 'STR']:
+            rd_addr = self.encode_register(instruction.operands[0])
+            if instruction.operands[1] == '[':
+                # [Rn] or [Rn, #offset]; literal-pool loads use [pc, #offset]
+                rm_addr = self.encode_base_register(instruction.operands[2])
+                if instruction.operands[3].startswith('#'):
+                    is_imm = 1
+                    value = self.encode_offset(instruction.operands[3])
+                elif instruction.operands[3] != ']':
+                    raise ValueError(f"Unsupported addressing mode in {mnemonic}")
+            elif instruction.operands[1].startswith('#'):
+                is_imm = 1
+                value = self.encode_immediate(instruction.operands[1])
+            else:
+                rm_addr = self.encode_register(instruction.operands[1])
+
+        # Basic arithmetic/logic (ADD, SUB, AND, ORR, etc.)
+        else:
+            if operand_count == 2:
+                rd_addr = self.encode_register(instruction.operands[0])
+                if instruction.operands[1].startswith('#'):
+                    is_imm = 1
+                    value = self.encode_immediate(instruction.operands[1])
+                else:
+                    rm_addr = self.encode_register(instruction.operands[1])
+            elif operand_count == 3:
+                rd_addr = self.encode_register(instruction.operands[0])
+                rn_addr = self.encode_register(instruction.operands[1])
+                if instruction.operands[2].startswith('#'):
+                    is_imm = 1
+                    value = self.encode_immediate(instruction.operands[2])
+                else:
+                    rm_addr = self.encode_register(instruction.operands[2])
+            else:
+                raise ValueError(f"{mnemonic} instruction expects 2 or 3 operands")
+            
+        # Combine all fields into final instruction
+        return (
+            (itype << 30) |           # bits [30:31] for instruction type
+            (u_ctrl << 24) |          # bits [24:29] for control signals
+            (rd_addr << 20) |         # bits [20:23] for rd register address
+            (rm_addr << 16) |         # bits [16:19] for rm register address
+            (rn_addr << 12) |         # bits [12:15] for rn register address (added)
+            (is_imm << 15) |          # bit [15] indicates if it's immediate
+            (value & 0x7FFF)           # bits [0:14] for immediate value or address
+        )
+
+    # The original helpers took operand text; the current ones take decoded operands
+    def encode_register(self, reg: str) -> int:
+        return super().encode_register(decode_operand(reg))
+
+    def encode_immediate(self, imm: str) -> int:
+        return super().encode_immediate(decode_operand(imm))
+
+    def encode_base_register(self, reg: str) -> int:
+        return super().encode_base_register(decode_operand(reg))
+
+    def encode_offset(self, imm: str) -> int:
+        return super().encode_offset(decode_operand(imm))
+
+    def encode_word(self, imm: str) -> int:
+        return super().encode_word(decode_operand(imm))
+
+
+def load_samples():
+    """Return the text of every bundled .asm sample."""
+    sources = []
+    for path in sorted(glob.glob(os.path.join(SAMPLE_DIR, '*.asm'))):
+        with open(path, 'r') as f:
+            sources.append(f.read())
+    return sources
+
+
+def scaled_source(copies: int) -> str:
+    """Concatenate the samples `copies` times, renaming labels in each copy."""
+    samples = load_samples()
+    parts = []
+    for k in range(copies):
+        for sample in samples:
+            labels = set(LABEL_DEF_RE.findall(sample))
+            if labels:
+                pattern = re.compile(r'\b(' + '|'.join(sorted(labels, key=len, reverse=True)) + r')\b')
+                sample = pattern.sub(lambda m: f"{m.group(1)}_{k}", sample)
+            parts.append(sample)
+    return '\n'.join(parts)
+
+
+def timeit(func, repeat: int = 3):
+    """Best-of-`repeat` wall time of func(), and its last result."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def report(name: str, old: float, new: float):
+    print(f"{name:<40} old {old * 1000:9.1f} ms   new {new * 1000:9.1f} ms   speedup {old / new:5.2f}x")
+
+
+def bench_tokenizer(source: str):
+    tokenizer = Tokenizer(source)
+    old, old_tokens = timeit(tokenizer.tokenize_reference)
+    new, new_tokens = timeit(tokenizer.tokenize)
+    assert old_tokens == new_tokens, "master-regex tokenizer disagrees with reference"
+    report(f"tokenize ({len(new_tokens)} tokens)", old, new)
+
+
+def traced(func):
+    """Return (bytes still allocated by func's result, result)."""
+    tracemalloc.start()
+    result = func()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, result
+
+
+def bench_token_stream(source: str):
+    tokenizer = Tokenizer(source)
+    list_bytes, tokens = traced(tokenizer.tokenize)
+    stream_bytes, stream = traced(tokenizer.tokenize_stream)
+    assert list(stream) == tokens, "TokenStream disagrees with list of tuples"
+    print(f"{'token memory':<40} list {list_bytes / 1e6:9.1f} MB   stream {stream_bytes / 1e6:7.1f} MB   ratio {list_bytes / stream_bytes:5.2f}x")
+
+    old, old_ast = timeit(lambda: Parser(tokens).parse())
+    new, new_ast = timeit(lambda: Parser(stream).parse())
+    assert repr(old_ast) == repr(new_ast), "Parser output differs for TokenStream"
+    report(f"parse ({len(new_ast)} nodes)", old, new)
+
+
+def bench_instruction_table(source: str):
+    tokens = Tokenizer(source).tokenize()
+    node_bytes, ast = traced(lambda: Parser(tokens).parse())
+    table_bytes, table = traced(lambda: InstructionTable.from_nodes(Parser.iter_nodes(tokens)))
+    assert [repr(node) for node in ast] == [repr(node) for node in table], "InstructionTable disagrees with AST"
+    print(f"{'AST memory':<40} nodes {node_bytes / 1e6:8.1f} MB   table {table_bytes / 1e6:8.1f} MB   ratio {node_bytes / table_bytes:5.2f}x")
+
+
+def bench_fast_parser(source: str):
+    old, old_ast = timeit(lambda: Parser(Tokenizer(source).tokenize()).parse())
+    new, new_ast = timeit(lambda: FastParser(source).parse())
+    assert repr(old_ast) == repr(new_ast), "FastParser disagrees with Tokenizer + Parser"
+    fast = FastParser(source)
+    fast.parse()
+    report(f"fast path ({fast.fallback_lines} fallback lines)", old, new)
+
+
+def bench_semantic_analyzer(source: str):
+    ast = Parser(Tokenizer(source).tokenize()).parse()
+    old, old_result = timeit(lambda: LegacySemanticAnalyzer(ast).analyze())
+    new, new_result = timeit(lambda: SemanticAnalyzer(ast).analyze())
+    assert [str(error) for error in old_result[0]] == [str(error) for error in new_result[0]], "table-driven validation disagrees with if/elif chain"
+    assert old_result[1] == new_result[1]
+    count = sum(1 for node in ast if isinstance(node, Instruction))
+    report(f"analyze ({count} instructions)", old, new)
+
+
+def bench_parallel_analyzer(source: str, workers: int = 4):
+    ast = Parser(Tokenizer(source).tokenize()).parse()
+    count = sum(1 for node in ast if isinstance(node, Instruction))
+    # Programs no longer than one chunk are validated serially, so split the rows across the workers
+    chunk_size = max(1, -(-count // (workers * 2)))
+    serial, serial_result = timeit(lambda: SemanticAnalyzer(ast).analyze(), repeat=1)
+    parallel, parallel_result = timeit(lambda: SemanticAnalyzer(ast).analyze(workers=workers, chunk_size=chunk_size),
+                                       repeat=1)
+    assert serial_result == parallel_result, "parallel validation disagrees with serial"
+    report(f"analyze, {workers} workers ({chunk_size}-row chunks)", serial, parallel)
+
+
+def bench_code_generator(source: str):
+    ast = Parser(Tokenizer(source).tokenize()).parse()
+    symbol_table = SemanticAnalyzer(ast).build_symbol_table()
+    old, old_code = timeit(lambda: LegacyCodeGenerator(ast, symbol_table).generate_machine_code())
+    new, new_code = timeit(lambda: CodeGenerator(ast, symbol_table).generate_machine_code())
+    assert old_code == new_code, "template encoder disagrees with if/elif chain"
+    report(f"generate_machine_code ({len(new_code)} words)", old, new)
+
+
+def bench_batch_encoder(source: str):
+    if np is None:
+        print("batch encode                             skipped (numpy not installed)")
+        return
+    ast = Parser(Tokenizer(source).tokenize()).parse()
+    symbol_table = SemanticAnalyzer(ast).build_symbol_table()
+    old, old_code = timeit(lambda: CodeGenerator(ast, symbol_table).generate_machine_code())
+    # A list AST is converted to an InstructionTable first, which costs about what the vector path saves
+    new, image = timeit(lambda: BatchEncoder(ast, symbol_table).encode())
+    assert old_code == image.tolist(), "batch encoder disagrees with CodeGenerator"
+    report(f"batch encode from list ({image.size} words)", old, new)
+    # The speedup needs the table itself, as when the parser builds it
+    table = InstructionTable.from_nodes(ast)
+    new, image = timeit(lambda: BatchEncoder(table, symbol_table).encode())
+    assert old_code == image.tolist(), "batch encoder disagrees with CodeGenerator"
+    report("batch encode from InstructionTable", old, new)
+
+
+def main():
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    source = scaled_source(copies)
+    print(f"Source: {source.count(chr(10)) + 1} lines, {len(source)} bytes")
+    bench_tokenizer(source)
+    bench_token_stream(source)
+    bench_instruction_table(source)
+    bench_fast_parser(source)
+    bench_semantic_analyzer(source)
+    bench_parallel_analyzer(source)
+    bench_code_generator(source)
+    bench_batch_encoder(source)
+
+
+if __name__ == "__main__":
+    main()
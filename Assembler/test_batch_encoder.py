@@ -0,0 +1,57 @@
+import random
+import unittest
+from Parser import Instruction, InstructionTable
+from Code_generator import CodeGenerator
+from BatchEncoder import BatchEncoder, np
+
+SYMBOL_TABLE = {'loop': 8, 'done': 0x9000}
+EXTERNAL_SYMBOLS = {'ext'}
+
+def random_instruction(rng: random.Random) -> Instruction:
+    register = lambda: f'r{rng.randint(0, 15)}'
+    return rng.choice([
+        lambda: Instruction('mov', '', [register(), rng.choice([register(), f'#{rng.randint(0, 0x7FFF)}'])]),
+        lambda: Instruction('add', '', [register(), register(), rng.choice([register(), f'#{rng.randint(0, 99)}'])]),
+        lambda: Instruction('cmp', '', [register(), register()]),
+        lambda: Instruction('ldr', '', [register(), '[', rng.choice(['r1', 'sp', 'pc']), '#4', ']']),
+        lambda: Instruction('str', '', [register(), '[', register(), ']']),
+        lambda: Instruction('b', rng.choice(['', 'gt']), [rng.choice(['loop', 'done', 'ext'])]),
+        lambda: Instruction('bl', '', [rng.choice(['loop', 'ext', register(), '#12'])]),
+        lambda: Instruction('swi', '', ['#1']),
+    ])()
+
+def encode_both(ast, symbol_table=SYMBOL_TABLE, external_symbols=EXTERNAL_SYMBOLS):
+    code_gen = CodeGenerator(ast, symbol_table, external_symbols)
+    encoder = BatchEncoder(ast, symbol_table, external_symbols)
+    return (code_gen.generate_machine_code(), code_gen.relocations), (encoder.encode().tolist(), encoder.relocations)
+
+@unittest.skipIf(np is None, "numpy not installed")
+class BatchEncoderTest(unittest.TestCase):
+    """BatchEncoder must produce the words and relocations of CodeGenerator.generate_machine_code."""
+
+    def test_random_programs(self):
+        rng = random.Random(22)
+        for _ in range(20):
+            ast = [random_instruction(rng) for _ in range(rng.randint(1, 200))]
+            expected, actual = encode_both(ast)
+            self.assertEqual(actual, expected)
+            self.assertEqual(encode_both(InstructionTable.from_nodes(ast))[1], expected)
+
+    def test_external_branch_target(self):
+        ast = [Instruction('mov', '', ['r1', '#1']), Instruction('b', '', ['ext'])]
+        expected, actual = encode_both(ast)
+        self.assertEqual(actual, expected)
+        self.assertEqual(actual[1], [(1, 'ext')])
+        with self.assertRaises(ValueError):
+            BatchEncoder(ast, {}).encode()
+
+    def test_relocations_are_recorded_by_row(self):
+        # The address and .word rows go through CodeGenerator one by one; relocations keep their rows around them
+        ast = [Instruction('ldr', '', ['r0', '[', 'pc', '#4', ']']), Instruction('bl', '', ['loop']),
+               Instruction('.word', '', ['#7']), Instruction('b', '', ['ext'])]
+        expected, actual = encode_both(ast)
+        self.assertEqual(actual, expected)
+        self.assertEqual(actual[1], [(1, 'loop'), (3, 'ext')])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import random
+import unittest
+from Tokenize import Tokenizer
+from Parser import Parser
+from Semantic_Analyzer.Semantic_Analyzer import SemanticAnalyzer
+import Incremental
+from Incremental import IncrementalSession
+
+def analyze(lines):
+    ast = Parser(Tokenizer('\n'.join(lines)).tokenize()).parse()
+    errors, symbol_table = SemanticAnalyzer(ast).analyze()
+    return errors, symbol_table
+
+LABELS = ['a', 'b', 'loop', 'done']
+
+def random_line(rng: random.Random) -> str:
+    return rng.choice([
+        f'{rng.choice(LABELS)}:',
+        f'{rng.choice(LABELS)}: mov r1, #{rng.randint(0, 9)}',
+        f'    {rng.choice(["b", "bne", "bl", "bal"])} {rng.choice(LABELS + ["ext"])}',
+        f'    mov r{rng.randint(0, 3)}, #{rng.choice([0, 1, 2, 4, 8])}',
+        f'    add r{rng.randint(0, 3)}, r{rng.randint(0, 3)}, #{rng.randint(0, 3)}',
+        f'    ldr r0, [r{rng.randint(0, 3)}]',
+        f'    strh r0, [r{rng.randint(0, 3)}, #1]',
+        '    mov r1, #1 bne a ldr r0, [r1]',
+        '    mov pc, r1',
+        '    .extern ext',
+        '    .noreturn',
+        '    mul r1',
+        '',
+    ])
+
+class IncrementalSessionTest(unittest.TestCase):
+    """After any edits, analyze() must report exactly what a full analysis of the buffer reports."""
+
+    def assert_same_as_full(self, session: IncrementalSession, lines):
+        errors, symbol_table = session.analyze()
+        expected_errors, expected_table = analyze(lines)
+        self.assertEqual(session.lines, lines)
+        self.assertEqual(errors, expected_errors)
+        self.assertEqual(dict(symbol_table), expected_table)
+        return errors
+
+    def test_random_edits(self):
+        rng = random.Random(4)
+        block_lines = Incremental.BLOCK_LINES
+        Incremental.BLOCK_LINES = 3         # split and empty blocks often
+        try:
+            lines = [random_line(rng) for _ in range(30)]
+            session = IncrementalSession('\n'.join(lines))
+            for _ in range(300):
+                start = rng.randint(0, len(lines))
+                end = min(len(lines), start + rng.choice([0, 1, 1, 3, 8]))
+                new = [random_line(rng) for _ in range(rng.choice([0, 1, 1, 2, 6]))] or [random_line(rng)]
+                session.replace_lines(start, end, new)
+                lines[start:end] = new
+                self.assert_same_as_full(session, lines)
+        finally:
+            Incremental.BLOCK_LINES = block_lines
+
+    def test_branch_back_changes_register_state(self):
+        lines = ['    mov r1, #5', 'loop:', '    ldr r0, [r1]', '    mov r1, #4', '    @ end']
+        session = IncrementalSession('\n'.join(lines))
+        self.assertEqual([error.code for error in self.assert_same_as_full(session, lines)], ['unaligned-access'])
+        for line_num, text in ((5, '    bne loop'),         # r1 is 5 or 4 at the load: not a known constant
+                               (4, '    mov r1, #5'),        # 5 on both edges
+                               (5, '    @ end')):
+            session.edit_line(line_num, text)
+            lines[line_num - 1] = text
+            codes = [error.code for error in self.assert_same_as_full(session, lines)]
+            self.assertEqual(codes, [] if text == '    bne loop' else ['unaligned-access'])
+
+    def test_extern_must_come_before_branch(self):
+        lines = ['    b ext', '    .extern ext']
+        session = IncrementalSession('\n'.join(lines))
+        self.assertEqual([error.code for error in self.assert_same_as_full(session, lines)], ['undefined-label'])
+        session.replace_lines(0, 0, ['    .extern ext'])
+        lines.insert(0, '    .extern ext')
+        self.assertEqual(self.assert_same_as_full(session, lines), [])
+
+    def test_directive_checked_without_full_analysis(self):
+        lines = ['    mov r1, #1'] * 50
+        session = IncrementalSession('\n'.join(lines))
+        session.analyze()
+        session.edit_line(20, '    .noreturn')
+        lines[19] = '    .noreturn'
+        errors = self.assert_same_as_full(session, lines)
+        self.assertEqual([(error.code, error.node) for error in errors], [('noreturn-outside-function', 19)])
+
+if __name__ == '__main__':
+    unittest.main()
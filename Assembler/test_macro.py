@@ -0,0 +1,63 @@
+import unittest
+from Parser import Label
+from Macro import MacroExpander, MacroError
+
+def expand(source: str):
+    return MacroExpander().parse(source)
+
+def describe(nodes):
+    return [f'{node.name}:' if isinstance(node, Label) else ' '.join([node.mnemonic] + node.operands) for node in nodes]
+
+class MacroExpanderTest(unittest.TestCase):
+
+    def test_parameters_are_substituted(self):
+        source = ".macro load reg, value\n    mov \\reg, #\\value\n.endm\n    load r1, 4\n    load r2, 8\n"
+        self.assertEqual(describe(expand(source)), ['mov r1 #4', 'mov r2 #8'])
+
+    def test_rept_repeats_body(self):
+        source = ".rept 3\n    add r1, r1, #1\n.endr\n    mov r0, r1\n"
+        self.assertEqual(describe(expand(source)), ['add r1 r1 #1'] * 3 + ['mov r0 r1'])
+
+    def test_expansions_are_separate_nodes(self):
+        nodes = expand(".rept 2\n    mov r1, r2\n.endr\n")
+        nodes[0].set_operand(1, 'r3')
+        self.assertEqual(describe(nodes), ['mov r1 r3', 'mov r1 r2'])
+        self.assertIsNot(nodes[0].operands, nodes[1].operands)
+
+    def test_expansion_number_gives_unique_labels(self):
+        source = (".macro wait\nspin\\@:\n    sub r0, r0, #1\n    bne spin\\@\n.endm\n"
+                  "    wait\n    wait\n.rept 2\nagain\\@:\n    b again\\@\n.endr\n")
+        lines = describe(expand(source))
+        labels = [line for line in lines if line.endswith(':')]
+        self.assertEqual(len(labels), 4)
+        self.assertEqual(len(set(labels)), 4)
+        for label in labels:
+            self.assertIn(label[:-1], ' '.join(lines).replace(label, ''))
+
+    def test_expansion_number_inside_nested_macro(self):
+        source = (".macro inner\nx\\@:\n    b x\\@\n.endm\n.macro outer\n    inner\n    inner\n.endm\n"
+                  "    outer\n    outer\n")
+        labels = [node.name for node in expand(source) if isinstance(node, Label)]
+        self.assertEqual(len(labels), 4)
+        self.assertEqual(len(set(labels)), 4)
+
+    def test_label_repeated_by_expansions_is_an_error(self):
+        with self.assertRaises(MacroError):
+            expand(".rept 2\nloop:\n    b loop\n.endr\n")
+        with self.assertRaises(MacroError):
+            expand(".macro m\nloop:\n    b loop\n.endm\n    m\n    m\n")
+
+    def test_label_from_parameter_is_not_repeated(self):
+        source = ".macro entry name\n\\name:\n    mov r0, #0\n.endm\n    entry first\n    entry second\n"
+        self.assertEqual(describe(expand(source)), ['first:', 'mov r0 #0', 'second:', 'mov r0 #0'])
+
+    def test_recursive_macro_is_an_error(self):
+        with self.assertRaises(MacroError):
+            expand(".macro m\n    m\n.endm\n    m\n")
+
+    def test_missing_end_is_an_error(self):
+        with self.assertRaises(MacroError):
+            expand(".rept 2\n    mov r1, r2\n")
+
+if __name__ == '__main__':
+    unittest.main()
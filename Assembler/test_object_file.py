@@ -0,0 +1,74 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from ObjectFile import ObjectModule, GLOBAL, LOCAL, EXTERN, VALUE_MASK, read_object
+from ReadWrite import assemble_asm_to_object
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from linker import Linker
+
+MAIN = ".global main\n.extern helper\nmain:\n    mov r1, #2\n    bl helper\n    b main\n"
+HELPER = ".global helper\nhelper:\n    mov r0, #1\nback:\n    b back\n"
+
+def describe(module: ObjectModule):
+    return (module.code, [(symbol.name, symbol.value, symbol.binding) for symbol in module.symbols],
+            [(relocation.word, relocation.symbol, relocation.type) for relocation in module.relocations])
+
+class ObjectFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def assemble(self, name: str, source: str, object_format: str = 'binary') -> str:
+        asm_file, obj_file = self.path(name + '.asm'), self.path(name + '.o')
+        with open(asm_file, 'w') as f:
+            f.write(source)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertTrue(assemble_asm_to_object(asm_file, obj_file, object_format=object_format), output.getvalue())
+        return obj_file
+
+    def test_binary_round_trip(self):
+        module = ObjectModule.from_assembly([1, 2, 0xFFFFFFFF], {'start': 0, 'loop': 8}, [(1, 'loop'), (2, 'ext')],
+                                            global_symbols=['start'], external_symbols=['ext'])
+        self.assertEqual(describe(module)[1], [('start', 0, GLOBAL), ('loop', 8, LOCAL), ('ext', 0, EXTERN)])
+        self.assertEqual(describe(ObjectModule.from_bytes(module.to_bytes())), describe(module))
+        module.write(self.path('module.o'))
+        self.assertEqual(describe(read_object(self.path('module.o'))), describe(module))
+
+    def test_text_round_trip(self):
+        module = ObjectModule.from_assembly([5, 6], {'start': 0, 'end': 4})
+        module.write(self.path('module.o'), 'text')
+        loaded = read_object(self.path('module.o'))
+        self.assertEqual(loaded.code, [5, 6])
+        self.assertEqual(loaded.symbol_table, {'start': 0, 'end': 4})
+
+    def test_assembled_object_records_linkage(self):
+        module = read_object(self.assemble('main', MAIN))
+        bindings = {symbol.name: symbol.binding for symbol in module.symbols}
+        self.assertEqual(bindings, {'main': GLOBAL, 'helper': EXTERN})
+        self.assertEqual([(relocation.word, module.symbols[relocation.symbol].name) for relocation in module.relocations],
+                         [(1, 'helper'), (2, 'main')])
+
+    def test_link(self):
+        main, helper = self.assemble('main', MAIN), self.assemble('helper', HELPER)
+        output = self.path('linked.txt')
+        with contextlib.redirect_stdout(io.StringIO()):
+            Linker().link([(main, 0x100), (helper, -1)], output)
+        with open(output) as f:
+            words = [int(line, 2) for line in f.read().split()]
+        helper_base = 0x100 + 4 * 3
+        self.assertEqual(len(words), 5)
+        self.assertEqual(words[1] & VALUE_MASK, helper_base)           # bl helper, resolved across objects
+        self.assertEqual(words[2] & VALUE_MASK, 0x100)                  # b main, relocated to main's base
+        self.assertEqual(words[4] & VALUE_MASK, helper_base + 4)        # b back, a local label
+        self.assertEqual(words[0], read_object(main).code[0])           # no relocation, unchanged
+
+if __name__ == '__main__':
+    unittest.main()
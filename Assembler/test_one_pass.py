@@ -0,0 +1,51 @@
+import contextlib
+import filecmp
+import io
+import os
+import tempfile
+import unittest
+from ReadWrite import assemble_asm_to_object
+
+DEFINITIONS = ".macro inc reg\n    add \\reg, \\reg, #1\n.endm\n"
+MAIN = ('.include "lib/defs.asm"\n    mov r1, #0\n.rept 2\n    inc r1\n.endr\n    b done\n'
+        'done:\n    mov r0, r1\n    bgt later\nlater:\n')
+
+class OnePassTest(unittest.TestCase):
+    """One-pass mode expands includes and macros and writes the object the multi-pass path writes."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name: str, text: str) -> str:
+        path = os.path.join(self.directory.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def assemble(self, asm_file: str, obj_name: str, **options):
+        obj_file = os.path.join(self.directory.name, obj_name)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            succeeded = assemble_asm_to_object(asm_file, obj_file, **options)
+        return succeeded, obj_file, output.getvalue()
+
+    def test_includes_and_macros(self):
+        self.write('lib/defs.asm', DEFINITIONS)
+        main = self.write('main.asm', MAIN)
+        for object_format in ('binary', 'text'):
+            succeeded, serial, _ = self.assemble(main, 'serial.o', object_format=object_format)
+            self.assertTrue(succeeded)
+            succeeded, one_pass, output = self.assemble(main, 'one_pass.o', object_format=object_format, one_pass=True)
+            self.assertTrue(succeeded, output)
+            self.assertTrue(filecmp.cmp(serial, one_pass, shallow=False))
+
+    def test_missing_include(self):
+        main = self.write('main.asm', '.include "missing.asm"\n    mov r0, #1\n')
+        succeeded, obj_file, output = self.assemble(main, 'main.o', one_pass=True)
+        self.assertFalse(succeeded)
+        self.assertIn("Cannot include", output)
+        self.assertFalse(os.path.exists(obj_file))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from Tokenize import Tokenizer
+from Parser import Parser, Instruction
+from Semantic_Analyzer.Semantic_Analyzer import SemanticAnalyzer
+from Code_generator import CodeGenerator
+from Operands import LabelRef, MemOperand, decode_operands
+
+def analyze(source: str):
+    errors, _ = SemanticAnalyzer(Parser(Tokenizer(source).tokenize()).parse()).analyze()
+    return [error.code for error in errors]
+
+class OperandsTest(unittest.TestCase):
+
+    def test_address_is_folded(self):
+        address = decode_operands(['r0', '[', 'r1', '#4', ']', '!'])[1]
+        self.assertIsInstance(address, MemOperand)
+        self.assertEqual((address.base.num, address.offset.value, address.closed, address.writeback), (1, 4, True, True))
+        self.assertFalse(decode_operands(['r0', '[', 'r1'])[1].closed)
+
+    def test_labels_compare_by_name(self):
+        first, second = decode_operands(['loop', 'loop'])
+        self.assertIsInstance(first, LabelRef)
+        self.assertEqual(first.name, second.name)
+
+    def test_r01_encodes_but_is_reported(self):
+        self.assertEqual(decode_operands(['r01'])[0].num, 1)
+        self.assertIsInstance(decode_operands(['r16'])[0], LabelRef)
+        code_gen = CodeGenerator([Instruction('mov', '', ['r01', 'r2'])], {})
+        self.assertEqual(code_gen.generate_machine_code(),
+                         CodeGenerator([Instruction('mov', '', ['r1', 'r2'])], {}).generate_machine_code())
+        self.assertEqual(analyze("    mov r01, r2\n"), ['invalid-destination'])
+
+    def test_operand_validators(self):
+        self.assertEqual(analyze("    mov r1, #0x101\n"), ['unencodable-immediate'])
+        self.assertEqual(analyze("    ldr r0, [r1, #4]\n    str r0, [sp]\n    msr cpsr, r1\n"), [])
+        self.assertEqual(analyze("    ldr r0, [r1\n"), ['missing-bracket'])
+        self.assertEqual(analyze("    ldr r0, r1, r2\n"), ['expected-bracket'])
+        self.assertEqual(analyze("    ldr r0, [r1], #4\n"), ['operands-after-writeback'])
+
+    def test_encode_address_and_branch(self):
+        code_gen = CodeGenerator([Instruction('ldr', '', ['r0', '[', 'pc', '#-8', ']']),
+                                  Instruction('b', '', ['ext'])], {}, external_symbols={'ext'})
+        load, branch = code_gen.generate_machine_code()
+        self.assertEqual(load & 0x7FFF, -8 & 0x7FFF)
+        self.assertEqual((load >> 16) & 0xF, 15)
+        self.assertEqual(code_gen.relocations, [(1, 'ext')])
+        with self.assertRaises(ValueError):
+            CodeGenerator([Instruction('b', '', ['nowhere'])], {}).generate_machine_code()
+
+if __name__ == '__main__':
+    unittest.main()
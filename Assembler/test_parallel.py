@@ -0,0 +1,98 @@
+import glob
+import os
+import unittest
+from Tokenize import Tokenizer
+from Parser import Parser
+from Semantic_Analyzer.Semantic_Analyzer import SemanticAnalyzer
+from Parallel import ChunkError, assemble_parallel, assemble_serial
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+def parse(source: str):
+    return Parser(Tokenizer(source).tokenize()).parse()
+
+def analyze(source: str, workers: int = None, chunk_size: int = 20000, external_symbols=(), global_symbols=()):
+    analyzer = SemanticAnalyzer(parse(source))
+    analyzer.external_symbols.update(external_symbols)
+    analyzer.global_symbols.update(global_symbols)
+    errors, symbol_table = analyzer.analyze(workers=workers, chunk_size=chunk_size)
+    return errors, symbol_table
+
+class ParallelAnalyzerTest(unittest.TestCase):
+    """analyze(workers=N) must report exactly what the serial analyze() reports."""
+
+    def assert_same_as_serial(self, source: str, **symbols):
+        serial = analyze(source, **symbols)
+        parallel = analyze(source, workers=2, chunk_size=10, **symbols)
+        self.assertEqual(serial, parallel)
+        return serial
+
+    def test_external_branch_target(self):
+        source = "    b ext\n" + "    mov r1, #1\n" * 50
+        errors, _ = self.assert_same_as_serial(source, external_symbols={'ext'})
+        self.assertEqual(errors, [])
+
+    def test_undefined_label_without_extern(self):
+        source = "    b ext\n" + "    mov r1, #1\n" * 50
+        errors, _ = self.assert_same_as_serial(source)
+        self.assertEqual([error.code for error in errors], ['undefined-label'])
+
+    def test_global_and_local_labels(self):
+        body = "".join(f"l{i}:\n    add r1, r1, #{i}\n    bne l{max(0, i - 3)}\n" for i in range(40))
+        source = "main:\n    b ext\n" + body + "    ldr r0, [r1, #2]\n    b nowhere\n"
+        errors, symbol_table = self.assert_same_as_serial(source, external_symbols={'ext'}, global_symbols={'main'})
+        self.assertEqual([error.code for error in errors], ['undefined-label'])
+        self.assertEqual(symbol_table['main'], 0)
+
+def program(blocks: int) -> str:
+    """Labelled blocks that branch forward and back across any chunk boundary, with constant memory accesses."""
+    lines = []
+    for i in range(blocks):
+        lines += [f"block{i}:", f"    mov r1, #{4 * i}", f"    add r2, r1, #{i % 3}", "    ldr r0, [r2]",
+                  f"    str r0, [r1, #{i % 5}]", "    cmp r1, r2", f"    bgt block{(i * 7) % blocks}",
+                  f"    bl block{blocks - 1 - i}"]
+    return '\n'.join(lines + ["    b block0"]) + '\n'
+
+class ParallelAssemblyTest(unittest.TestCase):
+    """assemble_parallel must return exactly what the serial pipeline returns."""
+
+    def assert_same_as_serial(self, source: str):
+        serial = assemble_serial(source)
+        self.assertEqual(assemble_parallel(source, workers=2, chunks_per_worker=4), serial)
+        return serial
+
+    def test_branches_across_chunks(self):
+        errors, symbol_table, machine_code, relocations = self.assert_same_as_serial(program(60))
+        self.assertEqual(len(machine_code), 60 * 7 + 1)
+        self.assertEqual(len(symbol_table), 60)
+        self.assertEqual(len(relocations), 60 * 2 + 1)
+        self.assertIn('unaligned-access', {error.code for error in errors})
+
+    def test_duplicate_label_in_another_chunk(self):
+        errors, _, _, _ = self.assert_same_as_serial(program(30) + "block3:\n    mov r1, #1\n")
+        self.assertIn('duplicate-label', [error.code for error in errors])
+
+    def test_encoding_failure_is_reported_like_serial(self):
+        source = program(30) + "    b nowhere\n"
+        with self.assertRaises(Exception) as serial:
+            assemble_serial(source)
+        with self.assertRaises(ChunkError) as parallel:
+            assemble_parallel(source, workers=2)
+        self.assertEqual(str(parallel.exception), str(serial.exception))
+
+    def test_samples(self):
+        for path in sorted(glob.glob(os.path.join(SAMPLE_DIR, '*.asm'))):
+            with open(path) as f:
+                source = f.read()
+            with self.subTest(sample=os.path.basename(path)):
+                try:
+                    expected = assemble_serial(source)
+                except Exception as e:
+                    with self.assertRaises(ChunkError) as parallel:
+                        assemble_parallel(source, workers=2)
+                    self.assertEqual(str(parallel.exception), str(e))
+                else:
+                    self.assertEqual(assemble_parallel(source, workers=2), expected)
+
+if __name__ == '__main__':
+    unittest.main()
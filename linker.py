@@ -1,75 +1,84 @@
+import argparse
+import os
 import sys
 from typing import Dict, List, Tuple
-import ast  # For safely parsing dictionary strings
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Assembler'))
+from ObjectFile import ObjectModule, GLOBAL, EXTERN, VALUE_MASK, read_object
 
 class Linker:
     def __init__(self):
         self.global_symbol_table: Dict[str, int] = {}
         self.base_addresses: Dict[int, int] = {}
         self.program_lengths: Dict[int, int] = {}
+        self.modules: Dict[str, ObjectModule] = {}
 
-    def read_object_file(self, filename: str) -> Tuple[List[str], Dict[str, int], int]:
+    def read_object_file(self, filename: str) -> ObjectModule:
         """
-        Read an object file and return its components.
-        Expected format:
-        - Machine code (binary)
-        #
-        - Symbol table (dictionary)
-        #
-        - Program length (integer)
+        Read an object file, binary or text (see ObjectFile), once per link.
         """
+        module = self.modules.get(filename)
+        if module is not None:
+            return module
         try:
-            with open(filename, "r") as f:
-                content = f.read().strip().split("#")
-            
-            # Parse machine code
-            machine_code = content[0].strip().split("\n")
-            
-            # Parse symbol table (as dictionary)
-            symbol_table = ast.literal_eval(content[1].strip())
-            if not isinstance(symbol_table, dict):
-                raise ValueError("Symbol table is not a valid dictionary")
-            
-            # Parse program length
-            program_length = int(content[2].strip())
-            
-            return machine_code, symbol_table, program_length
+            module = read_object(filename)
         except Exception as e:
             print(f"Error reading object file {filename}: {e}")
             sys.exit(1)
+        self.modules[filename] = module
+        return module
 
     def allocate_memory(self, programs: List[Tuple[str, int]]) -> None:
         """
         Allocate memory for each program based on their base addresses.
-        programs: List of (filename, base_address) tuples
+        programs: List of (filename, base_address) tuples; addresses are in bytes, like symbol values
         """
         current_address = 0
         for prog_id, (filename, base_addr) in enumerate(programs, 1):
-            _, _, length = self.read_object_file(filename)
+            length = len(self.read_object_file(filename).code)
             
             if base_addr == -1:  # Auto-allocate
                 base_addr = current_address
             
             self.base_addresses[prog_id] = base_addr
             self.program_lengths[prog_id] = length
-            current_address = base_addr + length
+            current_address = base_addr + 4 * length
 
     def collect_symbols(self, programs: List[Tuple[str, int]]) -> None:
         """
-        Collect all symbols from all programs and build global symbol table.
+        Collect the global symbols of all programs and build the global symbol table.
         Handle conflicts.
         """
         for prog_id, (filename, _) in enumerate(programs, 1):
-            _, symbol_table, _ = self.read_object_file(filename)
+            module = self.read_object_file(filename)
             base_addr = self.base_addresses[prog_id]
             
             # Add symbols to global table with relocation
-            for symbol, value in symbol_table.items():
-                relocated_value = value + base_addr
-                if symbol in self.global_symbol_table:
-                    print(f"Error: Symbol '{symbol}' multiply defined")
+            for symbol in module.symbols:
+                if symbol.binding != GLOBAL:
+                    continue
+                relocated_value = symbol.value + base_addr
+                if symbol.name in self.global_symbol_table:
+                    print(f"Error: Symbol '{symbol.name}' multiply defined")
+                    sys.exit(1)
+                self.global_symbol_table[symbol.name] = relocated_value
+
+    def relocate(self, module: ObjectModule, base_addr: int) -> List[int]:
+        """
+        Patch every relocated word's value field with its symbol's final address.
+        """
+        code = list(module.code)
+        for relocation in module.relocations:
+            symbol = module.symbols[relocation.symbol]
+            if symbol.binding == EXTERN:
+                if symbol.name not in self.global_symbol_table:
+                    print(f"Error: Undefined external symbol '{symbol.name}'")
                     sys.exit(1)
-                self.global_symbol_table[symbol] = relocated_value
+                address = self.global_symbol_table[symbol.name]
+            else:
+                address = symbol.value + base_addr
+            code[relocation.word] = (code[relocation.word] & ~VALUE_MASK) | (address & VALUE_MASK)
+        return code
 
     def link(self, programs: List[Tuple[str, int]], output_file: str) -> None:
         """
@@ -83,29 +92,36 @@ class Linker:
         final_code = []
         
         for prog_id, (filename, _) in enumerate(programs, 1):
-            machine_code, _, _ = self.read_object_file(filename)
+            module = self.read_object_file(filename)
             base_addr = self.base_addresses[prog_id]
-            
-            # Relocate machine code
-            for instruction in machine_code:
-                if "OFFSET" in instruction:
-                    offset = int(instruction.split("OFFSET")[1].strip())
-                    relocated_offset = offset + base_addr
-                    instruction = instruction.replace(f"OFFSET {offset}", str(relocated_offset))
-                
-                final_code.append(instruction)
+            final_code.extend(self.relocate(module, base_addr))
         
         # Write the linked code to the output file
         with open(output_file, "w") as f:
             for instruction in final_code:
-                f.write(instruction + "\n")
+                f.write(format(instruction, '032b') + "\n")
         
         print(f"Linking complete. Output written to {output_file}")
 
+def parse_program(argument: str) -> Tuple[str, int]:
+    """'prog.o' (auto-allocated) or 'prog.o@base', base in decimal or 0x hex."""
+    filename, _, base = argument.rpartition('@')
+    if not filename:
+        return argument, -1
+    return filename, int(base, 0)
+
 # Example usage
-def main():
+def main(argv: List[str] = None):
+    argv = sys.argv[1:] if argv is None else argv
     linker = Linker()
-    
+    if argv:
+        parser = argparse.ArgumentParser(description="Link object files into one program.")
+        parser.add_argument('objects', nargs='+', type=parse_program, help="object files, each optionally FILE@BASE")
+        parser.add_argument('-o', '--output', required=True, help="linked output file")
+        args = parser.parse_args(argv)
+        linker.link(args.objects, args.output)
+        return
+
     # Get input programs and their base addresses
     print("Enter number of programs to link:")
     num_programs = int(input())
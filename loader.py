@@ -1,3 +1,6 @@
+import argparse
+import sys
+
 class Loader:
     def __init__(self):
         self.memory = {}  # Simulated memory (address: instruction)
@@ -50,8 +53,19 @@ class Loader:
 
 
 # Example usage
-def main():
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
     loader = Loader()
+    if argv:
+        parser = argparse.ArgumentParser(description="Load a linked program into simulated memory.")
+        parser.add_argument('linked_file', help="linked program file")
+        parser.add_argument('-s', '--start', type=lambda text: int(text, 0), default=0, help="load address (default 0)")
+        parser.add_argument('-x', '--execute', action='store_true', help="execute the program after loading")
+        args = parser.parse_args(argv)
+        loader.load_program(args.linked_file, args.start)
+        if args.execute:
+            loader.execute(args.start)
+        return
 
     # Get the linked file and starting address from the user
     linked_file = input("Enter the linked file name: ")